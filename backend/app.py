@@ -4,18 +4,20 @@ from flask_cors import CORS
 import os
 import logging
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import create_client
+from utils.resilience import ResilientClient, init_resilience
+from utils.structured_logging import configure_logging, init_request_ids
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging: JSON records written by a background thread, sampled and rate capped
+configure_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 # Configure CORS to allow requests from any origin (for development)
-CORS(app, supports_credentials=True, resources={r"/*": {"origins": "*"}}, allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Credentials"], expose_headers=["Access-Control-Allow-Origin"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+CORS(app, supports_credentials=True, resources={r"/*": {"origins": "*"}}, allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Credentials", "Idempotency-Key", "X-Profile", "X-Request-Timeout", "X-Request-Id"], expose_headers=["Access-Control-Allow-Origin", "Retry-After", "Idempotent-Replayed", "X-Profile-Id", "X-Request-Id", "Content-Range", "X-Total-Count", "X-Group-Counts"], methods=["GET", "HEAD", "POST", "PUT", "DELETE", "OPTIONS"])
 
 # Initialize Supabase client
 supabase_url = os.getenv('SUPABASE_URL')
@@ -25,7 +27,8 @@ if not supabase_url or not supabase_key:
   logger.error("Supabase credentials not found in environment variables")
   raise ValueError("Please set SUPABASE_URL and SUPABASE_KEY environment variables")
 
-supabase: Client = create_client(supabase_url, supabase_key)
+# Every query gets a deadline and goes through a per-table circuit breaker
+supabase = ResilientClient(create_client(supabase_url, supabase_key))
 
 @app.route('/')
 def home():
@@ -39,6 +42,9 @@ from routes.mock_interview_routes import mock_interview_bp
 from routes.analytics_routes import analytics_bp
 from routes.notification_routes import notification_bp
 from routes.demo_request_routes import demo_request_bp
+from routes.dashboard_routes import dashboard_bp
+from routes.diagnostics_routes import diagnostics_bp
+from routes.batch_routes import batch_bp
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -48,6 +54,39 @@ app.register_blueprint(mock_interview_bp, url_prefix='/api/mock-interviews')
 app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
 app.register_blueprint(notification_bp, url_prefix='/api/notifications')
 app.register_blueprint(demo_request_bp, url_prefix='/api/demo-requests')
+app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
+app.register_blueprint(diagnostics_bp, url_prefix='/api/diagnostics')
+app.register_blueprint(batch_bp, url_prefix='/api/batch')
+
+# A request id on every log record and response, so a request's logs can be found together
+init_request_ids(app)
+
+# Oversized bodies are refused from Content-Length before anything is read
+from utils.request_schema import init_request_limits
+init_request_limits(app)
+
+# Deadlines for Supabase calls, and 503/504 instead of 500 when Supabase is the problem
+init_resilience(app)
+
+# Shed load before any handler work starts when the worker is saturated
+from utils.rate_limiter import init_admission_control
+init_admission_control(app)
+
+# Admin-requested and randomly sampled per-request profiling
+from utils.profiler import init_profiling
+init_profiling(app)
+
+# Per-worker memory stats, tracemalloc snapshots and per-endpoint peak allocations
+from utils.memory_diagnostics import init_memory_diagnostics
+init_memory_diagnostics(app)
+
+# Per-worker in-memory copies of the reference tables used for role and ownership checks
+from utils.reference_snapshot import init_reference_snapshot
+init_reference_snapshot(app)
+
+# Timer-wheel reminders for upcoming interviews and mock interviews
+from utils.reminder_scheduler import init_reminder_scheduler
+init_reminder_scheduler(app)
 
 # Error handling
 @app.errorhandler(404)
@@ -1,10 +1,25 @@
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from app import supabase, logger
 from utils.auth_middleware import token_required
+from utils.reference_snapshot import reference_snapshot
+from utils.singleflight import get_flight, request_key
+from utils.interview_analytics import (
+    EXPORT_DATASETS, EXPORT_FORMATS, compute_organization_analytics, export_dataset,
+    load_interview_columns, pyarrow, to_arrow_bytes, to_csv
+)
 
 analytics_bp = Blueprint('analytics', __name__)
 
+organization_analytics_flight = get_flight('organization_analytics')
+
+DEFAULT_ANALYTICS = {
+    'interview_trends': [],
+    'interviewer_performance': [],
+    'candidate_status': [],
+    'metrics': {}
+}
+
 @analytics_bp.route('/', methods=['GET'])
 @token_required
 def get_analytics(current_user):
@@ -18,11 +33,11 @@ def get_analytics(current_user):
             response = supabase.table('analytics').select('*').execute()
         elif user_role == 'organization':
             # Organizations can see their own analytics
-            org_response = supabase.table('organizations').select('id').eq('user_id', user_id).execute()
-            if not org_response.data:
+            organization = reference_snapshot.lookup('organizations', 'user_id', user_id)
+            if not organization:
                 return jsonify({"status": "error", "message": "Organization not found"}), 404
             
-            org_id = org_response.data[0]['id']
+            org_id = organization['id']
             response = supabase.table('analytics').select('*').eq('organization_id', org_id).execute()
         else:
             # Other roles cannot access analytics
@@ -34,69 +49,59 @@ def get_analytics(current_user):
         })
     
     except Exception as e:
-        logger.error(f"Error in get_analytics: {str(e)}")
+        logger.error("Error in get_analytics: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def _can_view_organization(current_user, organization_id):
+    if current_user['role'] == 'admin':
+        return True
+    if current_user['role'] == 'organization':
+        organization = reference_snapshot.lookup('organizations', 'user_id', current_user['id'])
+        return bool(organization) and organization['id'] == organization_id
+    return False
+
+def _load_organization_analytics(organization_id):
+    response = supabase.table('analytics').select('*').eq('organization_id', organization_id).execute()
+    
+    if response.data:
+        data = response.data[0]
+    else:
+        # Create the default record; when another worker got there first the
+        # insert is skipped and its row is read back instead
+        default_analytics = {'organization_id': organization_id, **DEFAULT_ANALYTICS}
+        create_response = supabase.table('analytics').upsert(
+            default_analytics, on_conflict='organization_id', ignore_duplicates=True
+        ).execute()
+        if not create_response.data:
+            create_response = supabase.table('analytics').select('*').eq('organization_id', organization_id).execute()
+        data = create_response.data[0] if create_response.data else default_analytics
+    
+    # Get additional information
+    organization = reference_snapshot.lookup('organizations', 'id', organization_id)
+    org_name = organization['name'] if organization else None
+    
+    # Interview stats, interviewer performance, candidate status and the funnel
+    # are computed in vectorized passes over the organization's interviews
+    computed = compute_organization_analytics(load_interview_columns(organization_id))
+    
+    return {
+        **data,
+        **computed,
+        'organization_name': org_name
+    }
+
 @analytics_bp.route('/<organization_id>', methods=['GET'])
 @token_required
 def get_organization_analytics(current_user, organization_id):
     try:
         # Check authorization based on user role
-        user_role = current_user['role']
-        user_id = current_user['id']
-        
-        authorized = False
-        if user_role == 'admin':
-            authorized = True
-        elif user_role == 'organization':
-            org_response = supabase.table('organizations').select('id').eq('user_id', user_id).execute()
-            if org_response.data and org_response.data[0]['id'] == organization_id:
-                authorized = True
-        
-        if not authorized:
+        if not _can_view_organization(current_user, organization_id):
             return jsonify({"status": "error", "message": "Unauthorized access"}), 403
         
-        # Get analytics for the organization
-        response = supabase.table('analytics').select('*').eq('organization_id', organization_id).execute()
-        
-        if not response.data:
-            # If no analytics record exists, create one with default values
-            default_analytics = {
-                'organization_id': organization_id,
-                'interview_trends': [],
-                'interviewer_performance': [],
-                'candidate_status': [],
-                'metrics': {}
-            }
-            
-            create_response = supabase.table('analytics').insert(default_analytics).execute()
-            data = create_response.data[0] if create_response.data else default_analytics
-        else:
-            data = response.data[0]
-        
-        # Get additional information
-        org_response = supabase.table('organizations').select('name').eq('id', organization_id).execute()
-        org_name = org_response.data[0]['name'] if org_response.data else None
-        
-        # Count interviews
-        interviews_response = supabase.table('interviews').select('id, status').eq('organization_id', organization_id).execute()
-        interviews = interviews_response.data if interviews_response.data else []
-        
-        total_interviews = len(interviews)
-        completed_interviews = sum(1 for interview in interviews if interview['status'] == 'completed')
-        scheduled_interviews = sum(1 for interview in interviews if interview['status'] == 'scheduled')
-        cancelled_interviews = sum(1 for interview in interviews if interview['status'] == 'cancelled')
-        
-        analytics_details = {
-            **data,
-            'organization_name': org_name,
-            'stats': {
-                'total_interviews': total_interviews,
-                'completed_interviews': completed_interviews,
-                'scheduled_interviews': scheduled_interviews,
-                'cancelled_interviews': cancelled_interviews
-            }
-        }
+        # Managers opening the dashboard together share one computation
+        analytics_details, _ = organization_analytics_flight.do(
+            request_key(), lambda: _load_organization_analytics(organization_id)
+        )
         
         return jsonify({
             "status": "success",
@@ -104,5 +109,33 @@ def get_organization_analytics(current_user, organization_id):
         })
     
     except Exception as e:
-        logger.error(f"Error in get_organization_analytics: {str(e)}")
+        logger.error("Error in get_organization_analytics: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@analytics_bp.route('/<organization_id>/export', methods=['GET'])
+@token_required
+def export_organization_analytics(current_user, organization_id):
+    try:
+        if not _can_view_organization(current_user, organization_id):
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        export_format = request.args.get('format', 'csv').lower()
+        dataset = request.args.get('dataset', 'interviews')
+        
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"status": "error", "message": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+        if dataset not in EXPORT_DATASETS:
+            return jsonify({"status": "error", "message": f"dataset must be one of {', '.join(EXPORT_DATASETS)}"}), 400
+        if export_format != 'csv' and pyarrow is None:
+            return jsonify({"status": "error", "message": f"{export_format} export needs pyarrow installed on the server; use format=csv"}), 501
+        
+        table = export_dataset(load_interview_columns(organization_id), dataset)
+        body = to_csv(table) if export_format == 'csv' else to_arrow_bytes(table, export_format)
+        
+        response = Response(body, mimetype=EXPORT_FORMATS[export_format])
+        response.headers['Content-Disposition'] = f"attachment; filename={dataset}-{organization_id}.{export_format}"
+        return response
+    
+    except Exception as e:
+        logger.error("Error in export_organization_analytics: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
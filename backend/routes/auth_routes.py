@@ -1,34 +1,44 @@
 
 from flask import Blueprint, request, jsonify
-import jwt
 import bcrypt
-import os
-from datetime import datetime, timedelta
-from supabase.client import ClientClass
+import click
 
 from app import supabase
+from utils.rate_limiter import rate_limit
+from utils.request_schema import Schema, Field, validate_body
+from utils.tokens import create_access_token, new_refresh_token, hash_refresh_token, ACCESS_TOKEN_TTL_MINUTES
 
 auth_bp = Blueprint('auth', __name__)
 
+# bcrypt only uses the first 72 bytes of a password
+REGISTER_SCHEMA = Schema({
+    'name': Field('string', required=True, max_length=200),
+    'email': Field('email', required=True, max_length=254),
+    'password': Field('string', required=True, max_length=72),
+    'role': Field('string', required=True, choices=['admin', 'organization', 'interviewer', 'interviewee']),
+    'organization_name': Field('string', max_length=200)
+})
+
+def _issue_tokens(user):
+    # Start a new session family with a short-lived access token and a refresh token
+    refresh_token, token_hash, expires_at = new_refresh_token()
+    supabase.table('sessions').insert({
+        'user_id': user['id'],
+        'token_hash': token_hash,
+        'expires_at': expires_at.isoformat()
+    }, returning='minimal').execute()
+    
+    return {
+        'token': create_access_token(user),
+        'refresh_token': refresh_token,
+        'expires_in': ACCESS_TOKEN_TTL_MINUTES * 60
+    }
+
 @auth_bp.route('/register', methods=['POST'])
-def register():
+@rate_limit(per_ip='5/minute', per_route='60/minute')
+@validate_body(REGISTER_SCHEMA)
+def register(data):
     try:
-        data = request.json
-        if not data:
-            return jsonify({
-                'status': 'error',
-                'message': 'No data provided'
-            }), 400
-        
-        # Check if required fields are present
-        required_fields = ['name', 'email', 'password', 'role']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'status': 'error',
-                    'message': f'Field {field} is required'
-                }), 400
-        
         # Check if email already exists
         email = data['email'].lower()
         response = supabase.table('users').select('*').eq('email', email).execute()
@@ -77,18 +87,13 @@ def register():
             interviewee_data = {'user_id': user['id']}
             supabase.table('interviewees').insert(interviewee_data).execute()
         
-        # Generate JWT token
-        token = jwt.encode({
-            'user_id': user['id'],
-            'email': user['email'],
-            'role': user['role'],
-            'exp': datetime.utcnow() + timedelta(days=1)
-        }, os.getenv('FLASK_SECRET_KEY'), algorithm='HS256')
+        # Generate access and refresh tokens
+        tokens = _issue_tokens(user)
         
         return jsonify({
             'status': 'success',
             'message': 'User registered successfully',
-            'token': token,
+            **tokens,
             'user': {
                 'id': user['id'],
                 'name': user['name'],
@@ -104,6 +109,7 @@ def register():
         }), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit(per_ip='10/minute', per_route='300/minute')
 def login():
     try:
         data = request.json
@@ -139,18 +145,13 @@ def login():
                 'message': 'Invalid credentials'
             }), 401
         
-        # Generate JWT token
-        token = jwt.encode({
-            'user_id': user['id'],
-            'email': user['email'],
-            'role': user['role'],
-            'exp': datetime.utcnow() + timedelta(days=1)
-        }, os.getenv('FLASK_SECRET_KEY'), algorithm='HS256')
+        # Generate access and refresh tokens
+        tokens = _issue_tokens(user)
         
         return jsonify({
             'status': 'success',
             'message': 'Login successful',
-            'token': token,
+            **tokens,
             'user': {
                 'id': user['id'],
                 'name': user['name'],
@@ -164,3 +165,90 @@ def login():
             'status': 'error',
             'message': str(e)
         }), 500
+
+@auth_bp.route('/refresh', methods=['POST'])
+@rate_limit(per_ip='30/minute')
+def refresh():
+    try:
+        data = request.get_json(silent=True) or {}
+        refresh_token = data.get('refresh_token')
+        
+        if not refresh_token or not isinstance(refresh_token, str):
+            return jsonify({
+                'status': 'error',
+                'message': 'Refresh token is required'
+            }), 400
+        
+        # Rotate the refresh token and load the user in one call; no password check needed
+        new_token, new_token_hash, expires_at = new_refresh_token()
+        response = supabase.rpc('rotate_session', {
+            'p_token_hash': hash_refresh_token(refresh_token),
+            'p_new_token_hash': new_token_hash,
+            'p_expires_at': expires_at.isoformat()
+        }).execute()
+        
+        result = response.data[0] if response.data else {'result': 'invalid'}
+        
+        if result['result'] != 'ok':
+            messages = {
+                'expired': 'Refresh token has expired',
+                'reused': 'Refresh token has already been used; all sessions from this login were revoked'
+            }
+            return jsonify({
+                'status': 'error',
+                'message': messages.get(result['result'], 'Invalid refresh token')
+            }), 401
+        
+        user = {
+            'id': result['user_id'],
+            'email': result['email'],
+            'role': result['role']
+        }
+        
+        return jsonify({
+            'status': 'success',
+            'token': create_access_token(user),
+            'refresh_token': new_token,
+            'expires_in': ACCESS_TOKEN_TTL_MINUTES * 60
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+def logout():
+    try:
+        data = request.get_json(silent=True) or {}
+        refresh_token = data.get('refresh_token')
+        
+        if not refresh_token or not isinstance(refresh_token, str):
+            return jsonify({
+                'status': 'error',
+                'message': 'Refresh token is required'
+            }), 400
+        
+        # Revoke every refresh token rotated from the same login
+        supabase.rpc('revoke_session_family', {
+            'p_token_hash': hash_refresh_token(refresh_token)
+        }).execute()
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Logged out successfully'
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@auth_bp.cli.command('cleanup-sessions')
+def cleanup_sessions_command():
+    """Delete expired refresh token sessions."""
+    response = supabase.rpc('delete_expired_sessions', {}).execute()
+    deleted = response.data[0]['deleted_count'] if response.data else 0
+    click.echo(f"Deleted {deleted} expired sessions")
@@ -0,0 +1,133 @@
+
+from flask import Blueprint, request, jsonify, current_app, g
+from concurrent.futures import ThreadPoolExecutor
+from flask.testing import EnvironBuilder
+import os
+import threading
+from app import logger
+from utils.auth_middleware import token_required, AUTHENTICATED_USER_ENVIRON_KEY
+from utils.rate_limiter import release_admission
+
+batch_bp = Blueprint('batch', __name__)
+
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', '20'))
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '4'))
+BATCH_METHODS = ['GET', 'POST', 'PUT', 'DELETE']
+# Headers a sub-request may set for itself; authentication comes from the batch request
+BATCH_FORWARDED_HEADERS = ['Idempotency-Key', 'X-Profile']
+# Response headers worth passing back to the client
+BATCH_RETURNED_HEADERS = ['Retry-After', 'Idempotent-Replayed', 'X-Profile-Id', 'Content-Range']
+
+# Sub-requests always run on pool threads so each gets its own app context
+_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_CONCURRENCY * 4, thread_name_prefix='batch')
+
+
+def _validate(sub_request):
+    if not isinstance(sub_request, dict):
+        return 'Each request must be an object'
+    if sub_request.get('method', 'GET').upper() not in BATCH_METHODS:
+        return f"method must be one of {', '.join(BATCH_METHODS)}"
+    path = sub_request.get('path')
+    if not isinstance(path, str) or not path.startswith('/api/'):
+        return 'path must start with /api/'
+    if path.split('?')[0].rstrip('/') == '/api/batch':
+        return 'Batch requests cannot be nested'
+    if not isinstance(sub_request.get('headers', {}), dict):
+        return 'headers must be an object'
+    return None
+
+
+def _dispatch(app, sub_request, environ_base, authorization):
+    headers = {
+        name: value for name, value in sub_request.get('headers', {}).items()
+        if name in BATCH_FORWARDED_HEADERS
+    }
+    if authorization:
+        headers['Authorization'] = authorization
+
+    builder = EnvironBuilder(
+        app=app,
+        path=sub_request['path'],
+        method=sub_request.get('method', 'GET').upper(),
+        json=sub_request.get('body'),
+        headers=headers,
+        environ_base=environ_base
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    with app.request_context(environ):
+        response = app.full_dispatch_request()
+
+    return {
+        'status': response.status_code,
+        'headers': {
+            name: response.headers[name] for name in BATCH_RETURNED_HEADERS if name in response.headers
+        },
+        'body': response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+    }
+
+
+@batch_bp.route('', methods=['POST'])
+@token_required
+def execute_batch(current_user):
+    try:
+        data = request.get_json(silent=True) or {}
+        sub_requests = data.get('requests')
+
+        if not isinstance(sub_requests, list) or not sub_requests:
+            return jsonify({"status": "error", "message": "requests must be a non-empty list"}), 400
+
+        if len(sub_requests) > BATCH_MAX_REQUESTS:
+            return jsonify({"status": "error", "message": f"At most {BATCH_MAX_REQUESTS} requests can be batched"}), 400
+
+        for index, sub_request in enumerate(sub_requests):
+            error = _validate(sub_request)
+            if error:
+                return jsonify({"status": "error", "message": f"Request {index}: {error}"}), 400
+
+        app = current_app._get_current_object()
+        # Sub-requests reuse the batch's authentication and client address
+        environ_base = {
+            'REMOTE_ADDR': request.remote_addr,
+            AUTHENTICATED_USER_ENVIRON_KEY: current_user
+        }
+        # Sub-requests log under the batch's request id
+        if g.get('request_id'):
+            environ_base['HTTP_X_REQUEST_ID'] = g.request_id
+        if 'X-Forwarded-For' in request.headers:
+            environ_base['HTTP_X_FORWARDED_FOR'] = request.headers['X-Forwarded-For']
+        authorization = request.headers.get('Authorization')
+
+        # Each sub-request takes its own admission slot, so the batch gives its slot
+        # back while it only waits on them
+        release_admission()
+
+        # At most BATCH_MAX_CONCURRENCY in flight; the next entry starts as soon as
+        # any one finishes, and results keep the request order
+        slots = threading.BoundedSemaphore(BATCH_MAX_CONCURRENCY)
+        futures = []
+        for sub_request in sub_requests:
+            slots.acquire()
+            future = _executor.submit(_dispatch, app, sub_request, environ_base, authorization)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+
+        responses = []
+        for future in futures:
+            try:
+                responses.append(future.result())
+            except Exception as e:
+                logger.error("Error in batch sub-request: %s", e)
+                responses.append({'status': 500, 'headers': {}, 'body': {"status": "error", "message": str(e)}})
+
+        return jsonify({
+            "status": "success",
+            "data": responses
+        })
+
+    except Exception as e:
+        logger.error("Error in execute_batch: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
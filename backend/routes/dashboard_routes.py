@@ -0,0 +1,200 @@
+
+from flask import Blueprint, current_app, g, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import os
+from app import supabase, logger
+from utils.auth_middleware import token_required
+from utils.list_counts import count_rows
+from utils.reference_snapshot import reference_snapshot
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+# Sections are fetched concurrently; the pool is shared by all requests in the worker
+DASHBOARD_WORKERS = int(os.getenv('DASHBOARD_WORKERS', '8'))
+DEFAULT_SECTION_LIMIT = 5
+MAX_SECTION_LIMIT = 50
+
+_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+
+# Role-specific record for each role, looked up by user_id in the reference snapshot
+ROLE_TABLES = {
+    'admin': 'admins',
+    'organization': 'organizations',
+    'interviewer': 'interviewers',
+    'interviewee': 'interviewees'
+}
+
+
+def _count(table, **filters):
+    def apply(query):
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        return query
+    return count_rows(table, 'exact', apply)
+
+
+def _profile(user_id):
+    response = supabase.table('users').select('id, name, email, role, created_at').eq('id', user_id).execute()
+    return response.data[0] if response.data else None
+
+
+def _role_record(table, user_id):
+    return (supabase.table(table).select('*').eq('user_id', user_id).execute().data or [None])[0]
+
+
+# Sections that need more than one query return a dict of parts, fetched concurrently
+def _notifications(user_id, limit):
+    return {
+        'unread_count': lambda: _count('notifications', user_id=user_id, status='unread'),
+        'recent': lambda: supabase.table('notifications').select('*')
+            .eq('user_id', user_id).order('date', desc=True).limit(limit).execute().data
+    }
+
+
+def _upcoming_interviews(column, value, limit):
+    now = datetime.now(timezone.utc).isoformat()
+    response = supabase.table('interviews').select('*') \
+        .eq(column, value).eq('status', 'scheduled').gte('date_time', now) \
+        .order('date_time').limit(limit).execute()
+    return response.data
+
+
+def _interview_stats(**filters):
+    parts = {'total_interviews': lambda: _count('interviews', **filters)}
+    for status in ['scheduled', 'completed', 'cancelled']:
+        parts[f'{status}_interviews'] = lambda status=status: _count('interviews', status=status, **filters)
+    return parts
+
+
+def _mock_interview_summary(interviewee_id, limit):
+    now = datetime.now(timezone.utc).isoformat()
+    parts = {
+        'upcoming': lambda: supabase.table('mock_interviews').select('*')
+            .eq('interviewee_id', interviewee_id).gte('date_time', now)
+            .order('date_time').limit(limit).execute().data
+    }
+    for status in ['scheduled', 'completed', 'cancelled']:
+        parts[f'{status}_count'] = lambda status=status: _count('mock_interviews', interviewee_id=interviewee_id, status=status)
+    return parts
+
+
+def _pending_demo_requests(limit):
+    return {
+        'pending_count': lambda: _count('demo_requests', status='pending'),
+        'recent': lambda: supabase.table('demo_requests').select('*')
+            .eq('status', 'pending').order('created_at', desc=True).limit(limit).execute().data
+    }
+
+
+def _role_sections(role, role_data, limit):
+    # Sections that depend on the caller's role record, as name -> callable or dict of parts
+    if role == 'admin':
+        return {
+            'demo_requests': _pending_demo_requests(limit),
+            'interview_stats': _interview_stats(),
+            'user_count': lambda: _count('users')
+        }
+    if not role_data:
+        return {}
+    if role == 'organization':
+        return {
+            'upcoming_interviews': lambda: _upcoming_interviews('organization_id', role_data['id'], limit),
+            'interview_stats': _interview_stats(organization_id=role_data['id'])
+        }
+    if role == 'interviewer':
+        return {
+            'upcoming_interviews': lambda: _upcoming_interviews('interviewer_id', role_data['id'], limit),
+            'interview_stats': _interview_stats(interviewer_id=role_data['id'])
+        }
+    if role == 'interviewee':
+        return {
+            'upcoming_interviews': lambda: _upcoming_interviews('interviewee_id', role_data['id'], limit),
+            'mock_interviews': _mock_interview_summary(role_data['id'], limit)
+        }
+    return {}
+
+
+def _run_section(app, deadline, fn):
+    # Pool threads have no app context of their own, so each section runs in one
+    # carrying the request's deadline for the resilience layer to enforce
+    with app.app_context():
+        g.deadline = deadline
+        return fn()
+
+
+def _gather(sections):
+    # A failing section is reported in errors instead of failing the whole dashboard
+    app = current_app._get_current_object()
+    deadline = g.get('deadline')
+    futures = {}
+    for name, fn in sections.items():
+        parts = fn if isinstance(fn, dict) else {None: fn}
+        for part, part_fn in parts.items():
+            futures[(name, part)] = _executor.submit(_run_section, app, deadline, part_fn)
+
+    results, errors = {}, {}
+    for (name, part), future in futures.items():
+        try:
+            value = future.result()
+        except Exception as e:
+            if name not in errors:
+                logger.error("Error loading dashboard section %s: %s", name, e)
+                errors[name] = str(e)
+            results[name] = None
+            continue
+        if name in errors:
+            continue
+        if part is None:
+            results[name] = value
+        else:
+            results.setdefault(name, {})[part] = value
+    return results, errors
+
+
+@dashboard_bp.route('', methods=['GET'])
+@token_required
+def get_dashboard(current_user):
+    try:
+        user_role = current_user['role']
+        user_id = current_user['id']
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_SECTION_LIMIT))
+        except ValueError:
+            return jsonify({"status": "error", "message": "limit must be an integer"}), 400
+        limit = max(1, min(limit, MAX_SECTION_LIMIT))
+
+        # Optional comma separated list of sections to return
+        wanted = set(request.args['sections'].split(',')) if request.args.get('sections') else None
+
+        # The role record's id keys the role sections; the snapshot has it without a
+        # query, so every section can be fetched in a single concurrent round
+        role_table = ROLE_TABLES.get(user_role)
+        role_record = reference_snapshot.lookup(role_table, 'user_id', user_id) if role_table else None
+
+        sections = {
+            'profile': lambda: _profile(user_id),
+            'notifications': _notifications(user_id, limit)
+        }
+        if role_table:
+            # The full record, with the columns the snapshot does not keep
+            sections['role_data'] = lambda: _role_record(role_table, user_id) if role_record else None
+        sections.update(_role_sections(user_role, role_record, limit))
+        if wanted:
+            sections = {name: fn for name, fn in sections.items() if name in wanted}
+
+        results, errors = _gather(sections)
+
+        return jsonify({
+            "status": "success",
+            "data": {
+                "role": user_role,
+                **results
+            },
+            "errors": errors
+        })
+
+    except Exception as e:
+        logger.error("Error in get_dashboard: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
@@ -1,9 +1,34 @@
 from flask import Blueprint, request, jsonify
 from app import supabase, logger
-from utils.auth_middleware import token_required
+from utils.auth_middleware import token_required, roles_required
+from utils.rate_limiter import rate_limit
+from utils.idempotency import idempotent
+from utils.reference_snapshot import reference_snapshot
+from utils.request_schema import Schema, Field, validate_body
+from utils.list_counts import parse_count_request, respond_with_counts
 
 demo_request_bp = Blueprint('demo_requests', __name__)
 
+DEMO_REQUEST_STATUSES = ['pending', 'approved', 'rejected']
+DEMO_REQUEST_COUNT_GROUPS = {'status': DEMO_REQUEST_STATUSES}
+
+# Public endpoint: new requests always start as pending and unlinked to an account
+CREATE_DEMO_REQUEST_SCHEMA = Schema({
+  'name': Field('string', required=True, max_length=200),
+  'email': Field('email', required=True, max_length=254),
+  'company_name': Field('string', required=True, max_length=200),
+  'message': Field('string', max_length=5000),
+  'additional_info': Field('string', max_length=5000)
+})
+UPDATE_DEMO_REQUEST_SCHEMA = Schema({
+  'name': Field('string', required=True, max_length=200),
+  'email': Field('email', required=True, max_length=254),
+  'company_name': Field('string', max_length=200),
+  'message': Field('string', max_length=5000),
+  'status': Field('string', required=True, choices=DEMO_REQUEST_STATUSES),
+  'user_id': Field('uuid')
+}, partial=True, ignored=['id', 'created_at', 'updated_at'])
+
 @demo_request_bp.route('/', methods=['GET'])
 @token_required
 def get_demo_requests(current_user):
@@ -12,6 +37,14 @@ def get_demo_requests(current_user):
     if current_user['role'] != 'admin':
       return jsonify({"status": "error", "message": "Unauthorized access"}), 403
     
+    # HEAD or ?count= returns totals only
+    try:
+      count, group_by = parse_count_request(request.args, request.method, DEMO_REQUEST_COUNT_GROUPS)
+    except ValueError as e:
+      return jsonify({"status": "error", "message": str(e)}), 400
+    if count:
+      return respond_with_counts('demo_requests', count, group_by, DEMO_REQUEST_COUNT_GROUPS)
+    
     response = supabase.table('demo_requests').select('*').order('created_at', desc=True).execute()
     
     return jsonify({
@@ -20,47 +53,36 @@ def get_demo_requests(current_user):
     })
   
   except Exception as e:
-    logger.error(f"Error in get_demo_requests: {str(e)}")
+    logger.error("Error in get_demo_requests: %s", e)
     return jsonify({"status": "error", "message": str(e)}), 500
 
 @demo_request_bp.route('/', methods=['POST'])
-def create_demo_request():
+@rate_limit(per_ip='3/minute', per_route='60/minute')
+@validate_body(CREATE_DEMO_REQUEST_SCHEMA)
+@idempotent
+def create_demo_request(data):
   try:
-    data = request.get_json()
-    logger.info(f"Received demo request data: {data}")
-    
-    # Validate required fields
-    required_fields = ['name', 'email', 'company_name']
-    missing_fields = [field for field in required_fields if field not in data or not data[field]]
-    
-    if missing_fields:
-      logger.warning(f"Missing required fields: {', '.join(missing_fields)}")
-      return jsonify({"status": "error", "message": f"Missing required fields: {', '.join(missing_fields)}"}), 400
+    logger.info("Received demo request", extra={'payload': data})
     
-    # Set default status if not provided
-    if 'status' not in data:
-      data['status'] = 'pending'
-    
-    logger.info(f"Inserting demo request into Supabase: {data}")
+    data['status'] = 'pending'
     
     # Create demo request
     response = supabase.table('demo_requests').insert(data).execute()
-    logger.info(f"Supabase response: {response}")
     
     if not response.data:
       return jsonify({"status": "error", "message": "Failed to create demo request"}), 500
+    logger.info("Stored demo request", extra={'demo_request_id': response.data[0].get('id')})
     
     try:
       # Create notification for admins
-      admin_response = supabase.table('users').select('id').eq('role', 'admin').execute()
-      for admin in admin_response.data:
+      for admin in reference_snapshot.rows('admin_users'):
         notification_data = {
           'user_id': admin['id'],
           'message': f"New demo request from {data['name']} ({data['email']})"
         }
         supabase.table('notifications').insert(notification_data).execute()
     except Exception as notify_error:
-      logger.error(f"Error creating admin notification: {str(notify_error)}")
+      logger.error("Error creating admin notification: %s", notify_error)
       # Continue execution even if notification fails
     
     return jsonify({
@@ -70,52 +92,35 @@ def create_demo_request():
     }), 201
   
   except Exception as e:
-    logger.error(f"Error in create_demo_request: {str(e)}")
+    logger.error("Error in create_demo_request: %s", e)
     return jsonify({"status": "error", "message": str(e)}), 500
 
 # Update endpoint to handle a single demo request by ID
 @demo_request_bp.route('/<demo_request_id>', methods=['PUT'])
 @token_required
-def update_demo_request(current_user, demo_request_id):
+@roles_required('admin')
+@validate_body(UPDATE_DEMO_REQUEST_SCHEMA)
+def update_demo_request(current_user, demo_request_id, data):
   try:
-    # Only admins can update demo requests
-    if current_user['role'] != 'admin':
-      return jsonify({"status": "error", "message": "Unauthorized access"}), 403
-    
-    data = request.get_json()
-    
-    # Protect fields that shouldn't be updated
-    if 'id' in data:
-      del data['id']
-    
-    # Get the demo request
-    demo_request_response = supabase.table('demo_requests').select('*').eq('id', demo_request_id).execute()
-    
-    if not demo_request_response.data:
-      return jsonify({"status": "error", "message": "Demo request not found"}), 404
-    
-    demo_request = demo_request_response.data[0]
-    
-    # Update demo request
-    response = supabase.table('demo_requests').update(data).eq('id', demo_request_id).execute()
-    
-    if not response.data:
-      return jsonify({"status": "error", "message": "Failed to update demo request"}), 500
-    
-    # Create notification for the user if they have an account and status is updated
-    if 'status' in data and demo_request['user_id']:
+    # Notify the requester if they have an account and status is updated
+    notification_message = None
+    if 'status' in data:
       status_message = {
         'approved': 'Your demo request has been approved.',
         'rejected': 'Your demo request has been rejected.',
         'pending': 'Your demo request status has been updated.'
       }
-      
-      notification_data = {
-        'user_id': demo_request['user_id'],
-        'message': status_message.get(data['status'], 'Your demo request status has been updated.')
-      }
-      
-      supabase.table('notifications').insert(notification_data).execute()
+      notification_message = status_message.get(data['status'], 'Your demo request status has been updated.')
+    
+    # Update demo request and create the notification in one round-trip
+    response = supabase.rpc('update_demo_request', {
+      'p_id': demo_request_id,
+      'p_changes': data,
+      'p_notification_message': notification_message
+    }).execute()
+    
+    if not response.data:
+      return jsonify({"status": "error", "message": "Demo request not found"}), 404
     
     return jsonify({
       "status": "success",
@@ -124,7 +129,7 @@ def update_demo_request(current_user, demo_request_id):
     })
   
   except Exception as e:
-    logger.error(f"Error in update_demo_request: {str(e)}")
+    logger.error("Error in update_demo_request: %s", e)
     return jsonify({"status": "error", "message": str(e)}), 500
 
 # Add OPTIONS method to handle preflight requests explicitly
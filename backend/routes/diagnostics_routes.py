@@ -0,0 +1,262 @@
+
+from flask import Blueprint, request, jsonify, send_from_directory
+import json
+import os
+import re
+import tracemalloc
+from app import logger
+from utils.auth_middleware import token_required
+from utils.profiler import PROFILE_DIR
+from utils.reference_snapshot import reference_snapshot
+from utils.resilience import get_resilience_metrics
+from utils.singleflight import get_coalescing_metrics
+from utils.memory_diagnostics import (
+    GROUP_BY, MEMORY_TOP_N, diff_snapshots, endpoint_peaks, list_snapshots, load_snapshot,
+    process_memory, publish_worker_stats, set_tracing, summarize_snapshot, take_snapshot, worker_reports
+)
+
+diagnostics_bp = Blueprint('diagnostics', __name__)
+
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+@diagnostics_bp.route('/profiles', methods=['GET'])
+@token_required
+def get_profiles(current_user):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        profiles = []
+        if os.path.isdir(PROFILE_DIR):
+            for entry in os.scandir(PROFILE_DIR):
+                if not entry.name.endswith('.json'):
+                    continue
+                with open(entry.path) as f:
+                    report = json.load(f)
+                profiles.append({
+                    'id': report['id'],
+                    'profiler': report['profiler'],
+                    'method': report['method'],
+                    'path': report['path'],
+                    'status_code': report['status_code'],
+                    'wall_seconds': report['wall_seconds'],
+                    'time_split_seconds': report['time_split_seconds'],
+                    'created_at': entry.stat().st_mtime
+                })
+        
+        profiles.sort(key=lambda p: p['created_at'], reverse=True)
+        
+        return jsonify({
+            "status": "success",
+            "data": profiles
+        })
+    
+    except Exception as e:
+        logger.error("Error in get_profiles: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@diagnostics_bp.route('/profiles/<profile_id>', methods=['GET'])
+@token_required
+def get_profile(current_user, profile_id):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return jsonify({"status": "error", "message": "Profile not found"}), 404
+        
+        # The JSON report, or the raw cProfile stats for pstats/snakeviz with ?format=prof
+        suffix = '.prof' if request.args.get('format') == 'prof' else '.json'
+        path = os.path.join(PROFILE_DIR, profile_id + suffix)
+        if not os.path.isfile(path):
+            return jsonify({"status": "error", "message": "Profile not found"}), 404
+        
+        return send_from_directory(os.path.abspath(PROFILE_DIR), profile_id + suffix, as_attachment=True)
+    
+    except Exception as e:
+        logger.error("Error in get_profile: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@diagnostics_bp.route('/snapshots', methods=['GET'])
+@token_required
+def get_snapshots(current_user):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        return jsonify({
+            "status": "success",
+            "data": reference_snapshot.stats()
+        })
+    
+    except Exception as e:
+        logger.error("Error in get_snapshots: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@diagnostics_bp.route('/supabase', methods=['GET'])
+@token_required
+def get_supabase_health(current_user):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        return jsonify({
+            "status": "success",
+            "data": {**get_resilience_metrics(), 'coalescing': get_coalescing_metrics()}
+        })
+    
+    except Exception as e:
+        logger.error("Error in get_supabase_health: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+def _snapshot_options():
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+    try:
+        top = int(request.args.get('top', MEMORY_TOP_N))
+    except ValueError:
+        raise ValueError('top must be an integer')
+    return group_by, max(1, min(top, 500))
+
+@diagnostics_bp.route('/memory', methods=['GET'])
+@token_required
+def get_memory(current_user):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        # The worker serving this request, plus what every live worker last published
+        publish_worker_stats(force=True)
+        
+        return jsonify({
+            "status": "success",
+            "data": {
+                "worker": {**process_memory(count_objects=True), "endpoints": endpoint_peaks()},
+                "workers": worker_reports()
+            }
+        })
+    
+    except Exception as e:
+        logger.error("Error in get_memory: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@diagnostics_bp.route('/memory/tracing', methods=['POST'])
+@token_required
+def update_memory_tracing(current_user):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data.get('enabled'), bool):
+            return jsonify({"status": "error", "message": "enabled must be true or false"}), 400
+        frames = data.get('frames', 1)
+        if not isinstance(frames, int) or frames < 1 or frames > 50:
+            return jsonify({"status": "error", "message": "frames must be between 1 and 50"}), 400
+        
+        # Only affects the worker that serves this request
+        set_tracing(data['enabled'], frames)
+        
+        return jsonify({
+            "status": "success",
+            "data": process_memory()
+        })
+    
+    except Exception as e:
+        logger.error("Error in update_memory_tracing: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@diagnostics_bp.route('/memory/snapshots', methods=['GET'])
+@token_required
+def get_memory_snapshots(current_user):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        return jsonify({
+            "status": "success",
+            "data": list_snapshots()
+        })
+    
+    except Exception as e:
+        logger.error("Error in get_memory_snapshots: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@diagnostics_bp.route('/memory/snapshots', methods=['POST'])
+@token_required
+def create_memory_snapshot(current_user):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        if not tracemalloc.is_tracing():
+            return jsonify({"status": "error", "message": "Memory tracing is off in this worker; enable it first"}), 409
+        
+        try:
+            group_by, top = _snapshot_options()
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
+        return jsonify({
+            "status": "success",
+            "data": take_snapshot(group_by, top)
+        }), 201
+    
+    except Exception as e:
+        logger.error("Error in create_memory_snapshot: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@diagnostics_bp.route('/memory/snapshots/<snapshot_id>', methods=['GET'])
+@token_required
+def get_memory_snapshot(current_user, snapshot_id):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        try:
+            group_by, top = _snapshot_options()
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
+        snapshot = load_snapshot(snapshot_id)
+        if snapshot is None:
+            return jsonify({"status": "error", "message": "Snapshot not found"}), 404
+        
+        return jsonify({
+            "status": "success",
+            "data": {"id": snapshot_id, **summarize_snapshot(snapshot, group_by, top)}
+        })
+    
+    except Exception as e:
+        logger.error("Error in get_memory_snapshot: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@diagnostics_bp.route('/memory/snapshots/<snapshot_id>/diff/<other_id>', methods=['GET'])
+@token_required
+def diff_memory_snapshots(current_user, snapshot_id, other_id):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        try:
+            group_by, top = _snapshot_options()
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
+        old, new = load_snapshot(snapshot_id), load_snapshot(other_id)
+        if old is None or new is None:
+            return jsonify({"status": "error", "message": "Snapshot not found"}), 404
+        
+        # Snapshots of different processes do not describe the same heap
+        if snapshot_id.split('-')[0] != other_id.split('-')[0]:
+            return jsonify({"status": "error", "message": "Snapshots must come from the same worker"}), 400
+        
+        return jsonify({
+            "status": "success",
+            "data": {"from": snapshot_id, "to": other_id, **diff_snapshots(old, new, group_by, top)}
+        })
+    
+    except Exception as e:
+        logger.error("Error in diff_memory_snapshots: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
@@ -1,27 +1,116 @@
 
 from flask import Blueprint, request, jsonify
 from utils.auth_middleware import token_required
+from utils.idempotency import idempotent
+from utils.reminder_scheduler import notify_booking_changed
+from utils.request_schema import Schema, Field, validate_body
+from utils.list_counts import parse_count_request, respond_with_counts
+from utils.timestamps import parse_timestamp
 from app import supabase
 
 interview_bp = Blueprint('interviews', __name__)
 
+# Columns returned to clients; search_vector is only used for filtering
+INTERVIEW_COLUMNS = ','.join([
+    'id', 'organization_id', 'interviewer_id', 'interviewee_id', 'candidate_name', 'position_title',
+    'department', 'required_skill', 'date_time', 'status', 'feedback', 'open_since', 'created_at', 'updated_at'
+])
+
+# Exact-match filters accepted as query parameters
+INTERVIEW_FILTERS = ['interviewer_id', 'interviewee_id', 'organization_id', 'position_title', 'required_skill']
+INTERVIEW_SORT_COLUMNS = ['date_time', 'created_at', 'updated_at', 'candidate_name', 'status']
+INTERVIEW_COUNT_GROUPS = {'status': ['scheduled', 'completed', 'cancelled']}
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Columns a client may set when scheduling an interview
+SCHEDULE_INTERVIEW_SCHEMA = Schema({
+    'candidate_id': Field('uuid', required=True),
+    'interviewer_id': Field('uuid', required=True),
+    'requirement_id': Field('uuid', required=True),
+    'scheduled_at': Field('datetime', required=True),
+    'status': Field('string', max_length=32)
+})
+
+def _parse_datetime(value, name):
+    try:
+        return parse_timestamp(value).isoformat()
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date or datetime')
+
+def _parse_int(value, name, default, minimum, maximum):
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+    if number < minimum or number > maximum:
+        raise ValueError(f'{name} must be between {minimum} and {maximum}')
+    return number
+
+def apply_interview_filters(query, args):
+    """Add the search parameters' filters to query, raising ValueError on bad input."""
+    # status accepts a comma separated list
+    status = args.get('status')
+    if status:
+        statuses = [s for s in status.split(',') if s]
+        query = query.eq('status', statuses[0]) if len(statuses) == 1 else query.in_('status', statuses)
+    
+    for column in INTERVIEW_FILTERS:
+        if args.get(column):
+            query = query.eq(column, args[column])
+    
+    # Date range on the scheduled time, inclusive start and exclusive end
+    if args.get('scheduled_from'):
+        query = query.gte('date_time', _parse_datetime(args['scheduled_from'], 'scheduled_from'))
+    if args.get('scheduled_to'):
+        query = query.lt('date_time', _parse_datetime(args['scheduled_to'], 'scheduled_to'))
+    
+    # Candidate name prefix, served by the trigram index
+    candidate = (args.get('candidate') or '').replace('*', '').replace('%', '').strip()
+    if candidate:
+        query = query.ilike('candidate_name', f'{candidate}*')
+    
+    # Full-text search over candidate, position and feedback text
+    if args.get('q'):
+        query = query.filter('search_vector', 'wfts(english)', args['q'])
+    return query
+
+def build_interview_search(args):
+    """Build the interviews query for the search parameters, raising ValueError on bad input."""
+    query = apply_interview_filters(supabase.table('interviews').select(INTERVIEW_COLUMNS), args)
+    
+    # sort=-date_time sorts descending; id keeps pages stable between requests
+    sort = args.get('sort', '-date_time')
+    column = sort.lstrip('-')
+    if column not in INTERVIEW_SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {', '.join(INTERVIEW_SORT_COLUMNS)}, optionally prefixed with '-'")
+    direction = '.desc' if sort.startswith('-') else ''
+    query = query.order(f'{column}{direction},id')
+    
+    limit = _parse_int(args.get('limit'), 'limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    offset = _parse_int(args.get('offset'), 'offset', 0, 0, 10 ** 9)
+    return query.range(offset, offset + limit)
+
 @interview_bp.route('/', methods=['GET'])
 @token_required
 def get_interviews(current_user):
     try:
-        # Handle query parameters
-        status = request.args.get('status')
-        interviewer_id = request.args.get('interviewer_id')
-        
-        # Start building the query
-        query = supabase.table('interviews').select('*')
-        
-        # Apply filters if provided
-        if status:
-            query = query.eq('status', status)
-        
-        if interviewer_id:
-            query = query.eq('interviewer_id', interviewer_id)
+        # Build the query from the search parameters; HEAD or ?count= returns totals only
+        try:
+            count, group_by = parse_count_request(request.args, request.method, INTERVIEW_COUNT_GROUPS)
+            if count:
+                return respond_with_counts(
+                    'interviews', count, group_by, INTERVIEW_COUNT_GROUPS,
+                    lambda query: apply_interview_filters(query, request.args)
+                )
+            query = build_interview_search(request.args)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
         
         # Execute the query
         response = query.execute()
@@ -41,7 +130,7 @@ def get_interviews(current_user):
 @token_required
 def get_interview(current_user, interview_id):
     try:
-        response = supabase.table('interviews').select('*').eq('id', interview_id).execute()
+        response = supabase.table('interviews').select(INTERVIEW_COLUMNS).eq('id', interview_id).execute()
         
         if not response.data or len(response.data) == 0:
             return jsonify({
@@ -62,24 +151,16 @@ def get_interview(current_user, interview_id):
 
 @interview_bp.route('/', methods=['POST'])
 @token_required
-def schedule_interview(current_user):
+@validate_body(SCHEDULE_INTERVIEW_SCHEMA)
+@idempotent
+def schedule_interview(current_user, data):
     try:
-        data = request.json
-        
-        # Validate input
-        required_fields = ['candidate_id', 'interviewer_id', 'requirement_id', 'scheduled_at']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'status': 'error',
-                    'message': f'Field {field} is required'
-                }), 400
-        
         # Set status to Scheduled by default
         data['status'] = data.get('status', 'Scheduled')
         
         # Insert into database
         response = supabase.table('interviews_schedule').insert(data).execute()
+        notify_booking_changed('interview', response.data[0])
         
         return jsonify({
             'status': 'success',
@@ -115,6 +196,8 @@ def update_interview_status(current_user, interview_id):
                 'message': 'Interview not found or could not be updated'
             }), 404
         
+        notify_booking_changed('interview', response.data[0])
+        
         return jsonify({
             'status': 'success',
             'message': 'Interview status updated successfully',
@@ -152,6 +235,8 @@ def add_feedback(current_user, interview_id):
                 'message': 'Interview not found or could not be updated'
             }), 404
         
+        notify_booking_changed('interview', response.data[0])
+        
         return jsonify({
             'status': 'success',
             'message': 'Feedback added successfully',
@@ -1,10 +1,47 @@
 
 from flask import Blueprint, request, jsonify
+from datetime import datetime, timezone
+import click
+import json
 from app import supabase, logger
-from utils.auth_middleware import token_required
+from utils.auth_middleware import token_required, roles_required
+from utils.idempotency import idempotent
+from utils.request_schema import Schema, Field, validate_body
+from utils.reference_snapshot import reference_snapshot
+from utils.timestamps import parse_timestamp
+from utils.reminder_scheduler import notify_booking_changed
+from utils.mock_interview_matching import MATCHING_BATCH_LIMIT, parse_duration_minutes, parse_skills, run_matching
 
 mock_interview_bp = Blueprint('mock_interviews', __name__)
 
+# Most availability windows an interviewer can submit at once
+MAX_AVAILABILITY_WINDOWS = 500
+
+# Durations are stored as text, so numbers are accepted and stored as e.g. '60'
+DURATION_FIELD = Field(('string', 'integer'), required=True, max_length=32, check=parse_duration_minutes,
+                       coerce=str, message='duration must be a length of time such as 60, "45 min" or "1 hour"')
+CREATE_MOCK_INTERVIEW_SCHEMA = Schema({
+    'interviewee_id': Field('uuid', required=True),
+    'technology': Field('string', required=True, max_length=200),
+    'duration': DURATION_FIELD,
+    'date_time': Field('datetime', required=True)
+})
+# The interviewee is fixed and the interviewer is set by the matching engine
+UPDATE_MOCK_INTERVIEW_SCHEMA = Schema({
+    'technology': Field('string', required=True, max_length=200),
+    'duration': DURATION_FIELD,
+    'date_time': Field('datetime', required=True),
+    'status': Field('string', required=True, choices=['scheduled', 'completed', 'cancelled']),
+    'payment_status': Field('string', required=True, choices=['pending', 'completed'])
+}, partial=True, ignored=['id', 'interviewee_id', 'interviewer_id', 'created_at', 'updated_at'])
+
+def _parse_time(value, name):
+    try:
+        parsed = parse_timestamp(value)
+    except (AttributeError, ValueError):
+        raise ValueError(f'{name} must be an ISO 8601 datetime')
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
 @mock_interview_bp.route('/', methods=['GET'])
 @token_required
 def get_mock_interviews(current_user):
@@ -18,11 +55,11 @@ def get_mock_interviews(current_user):
             response = supabase.table('mock_interviews').select('*').execute()
         elif user_role == 'interviewee':
             # Interviewees can see their own mock interviews
-            interviewee_response = supabase.table('interviewees').select('id').eq('user_id', user_id).execute()
-            if not interviewee_response.data:
+            interviewee = reference_snapshot.lookup('interviewees', 'user_id', user_id)
+            if not interviewee:
                 return jsonify({"status": "error", "message": "Interviewee not found"}), 404
             
-            interviewee_id = interviewee_response.data[0]['id']
+            interviewee_id = interviewee['id']
             response = supabase.table('mock_interviews').select('*').eq('interviewee_id', interviewee_id).execute()
         else:
             # Other roles cannot access mock interviews
@@ -34,7 +71,7 @@ def get_mock_interviews(current_user):
         })
     
     except Exception as e:
-        logger.error(f"Error in get_mock_interviews: {str(e)}")
+        logger.error("Error in get_mock_interviews: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @mock_interview_bp.route('/<mock_interview_id>', methods=['GET'])
@@ -57,18 +94,18 @@ def get_mock_interview(current_user, mock_interview_id):
         if user_role == 'admin':
             authorized = True
         elif user_role == 'interviewee':
-            interviewee_response = supabase.table('interviewees').select('id').eq('user_id', user_id).execute()
-            if interviewee_response.data and interviewee_response.data[0]['id'] == mock_interview['interviewee_id']:
+            interviewee = reference_snapshot.lookup('interviewees', 'user_id', user_id)
+            if interviewee and interviewee['id'] == mock_interview['interviewee_id']:
                 authorized = True
         
         if not authorized:
             return jsonify({"status": "error", "message": "Unauthorized access"}), 403
         
         # Get interviewee name
-        interviewee_response = supabase.table('interviewees').select('user_id').eq('id', mock_interview['interviewee_id']).execute()
+        interviewee = reference_snapshot.lookup('interviewees', 'id', mock_interview['interviewee_id'])
         interviewee_info = None
-        if interviewee_response.data:
-            user_response = supabase.table('users').select('name').eq('id', interviewee_response.data[0]['user_id']).execute()
+        if interviewee:
+            user_response = supabase.table('users').select('name').eq('id', interviewee['user_id']).execute()
             interviewee_info = user_response.data[0] if user_response.data else None
         
         mock_interview_details = {
@@ -82,29 +119,20 @@ def get_mock_interview(current_user, mock_interview_id):
         })
     
     except Exception as e:
-        logger.error(f"Error in get_mock_interview: {str(e)}")
+        logger.error("Error in get_mock_interview: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @mock_interview_bp.route('/', methods=['POST'])
 @token_required
-def create_mock_interview(current_user):
+@roles_required('interviewee', 'admin')
+@validate_body(CREATE_MOCK_INTERVIEW_SCHEMA)
+@idempotent
+def create_mock_interview(current_user, data):
     try:
-        # Only interviewees can schedule mock interviews
-        if current_user['role'] != 'interviewee' and current_user['role'] != 'admin':
-            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
-        
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['interviewee_id', 'technology', 'duration', 'date_time']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"status": "error", "message": f"Missing required field: {field}"}), 400
-        
         # If interviewee user, ensure they only schedule for themselves
         if current_user['role'] == 'interviewee':
-            interviewee_response = supabase.table('interviewees').select('id').eq('user_id', current_user['id']).execute()
-            if not interviewee_response.data or interviewee_response.data[0]['id'] != data['interviewee_id']:
+            interviewee = reference_snapshot.lookup('interviewees', 'user_id', current_user['id'])
+            if not interviewee or interviewee['id'] != data['interviewee_id']:
                 return jsonify({"status": "error", "message": "Unauthorized access"}), 403
         
         # Create mock interview
@@ -116,6 +144,7 @@ def create_mock_interview(current_user):
         # Update interviewee scheduled_mock_interviews count
         interviewee = supabase.table('interviewees').select('*').eq('id', data['interviewee_id']).execute().data[0]
         supabase.table('interviewees').update({'scheduled_mock_interviews': interviewee['scheduled_mock_interviews'] + 1}).eq('id', data['interviewee_id']).execute()
+        notify_booking_changed('mock_interview', response.data[0])
         
         return jsonify({
             "status": "success",
@@ -124,63 +153,171 @@ def create_mock_interview(current_user):
         }), 201
     
     except Exception as e:
-        logger.error(f"Error in create_mock_interview: {str(e)}")
+        logger.error("Error in create_mock_interview: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @mock_interview_bp.route('/<mock_interview_id>', methods=['PUT'])
 @token_required
-def update_mock_interview(current_user, mock_interview_id):
+@roles_required('admin', 'interviewee')
+@validate_body(UPDATE_MOCK_INTERVIEW_SCHEMA)
+def update_mock_interview(current_user, mock_interview_id, data):
     try:
-        # Get the mock interview
-        mock_interview_response = supabase.table('mock_interviews').select('*').eq('id', mock_interview_id).execute()
+        user_role = current_user['role']
+        user_id = current_user['id']
         
-        if not mock_interview_response.data:
+        # Ownership check, update and interviewee stats all happen in one round-trip;
+        # the function decrements scheduled_mock_interviews on the transition to 'completed'
+        response = supabase.rpc('update_mock_interview', {
+            'p_id': mock_interview_id,
+            'p_changes': data,
+            'p_user_id': None if user_role == 'admin' else user_id
+        }).execute()
+        
+        if not response.data:
             return jsonify({"status": "error", "message": "Mock interview not found"}), 404
         
-        mock_interview = mock_interview_response.data[0]
+        result = response.data[0]
         
-        # Check authorization based on user role
-        user_role = current_user['role']
-        user_id = current_user['id']
+        if not result['authorized']:
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
         
-        authorized = False
-        if user_role == 'admin':
-            authorized = True
-        elif user_role == 'interviewee':
-            interviewee_response = supabase.table('interviewees').select('id').eq('user_id', user_id).execute()
-            if interviewee_response.data and interviewee_response.data[0]['id'] == mock_interview['interviewee_id']:
-                authorized = True
+        notify_booking_changed('mock_interview', result['mock_interview'])
         
-        if not authorized:
+        return jsonify({
+            "status": "success",
+            "message": "Mock interview updated successfully",
+            "data": result['mock_interview']
+        })
+    
+    except Exception as e:
+        logger.error("Error in update_mock_interview: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@mock_interview_bp.route('/match', methods=['POST'])
+@token_required
+def match_mock_interviews(current_user):
+    try:
+        # Only admins can run the matching engine
+        if current_user['role'] != 'admin':
             return jsonify({"status": "error", "message": "Unauthorized access"}), 403
         
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         
-        # Protect fields that shouldn't be updated
-        if 'id' in data:
-            del data['id']
-        if 'interviewee_id' in data:
-            del data['interviewee_id']
+        try:
+            limit = data.get('limit', MATCHING_BATCH_LIMIT)
+            if not isinstance(limit, int):
+                raise ValueError('limit must be an integer')
+            start = _parse_time(data['from'], 'from') if data.get('from') else None
+            end = _parse_time(data['to'], 'to') if data.get('to') else None
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
         
-        # Update mock interview
-        response = supabase.table('mock_interviews').update(data).eq('id', mock_interview_id).execute()
+        if limit < 1 or limit > MATCHING_BATCH_LIMIT:
+            return jsonify({"status": "error", "message": f"limit must be between 1 and {MATCHING_BATCH_LIMIT}"}), 400
         
-        if not response.data:
-            return jsonify({"status": "error", "message": "Failed to update mock interview"}), 500
+        result = run_matching(dry_run=bool(data.get('dry_run')), limit=limit, start=start, end=end)
         
-        # Update interviewee stats if status is changed to 'completed'
-        if 'status' in data and data['status'] == 'completed' and mock_interview['status'] != 'completed':
-            interviewee = supabase.table('interviewees').select('*').eq('id', mock_interview['interviewee_id']).execute().data[0]
-            supabase.table('interviewees').update({
-                'scheduled_mock_interviews': max(0, interviewee['scheduled_mock_interviews'] - 1)
-            }).eq('id', mock_interview['interviewee_id']).execute()
+        return jsonify({
+            "status": "success",
+            "data": result
+        })
+    
+    except Exception as e:
+        logger.error("Error in match_mock_interviews: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@mock_interview_bp.route('/availability', methods=['GET'])
+@token_required
+def get_availability(current_user):
+    try:
+        if current_user['role'] != 'interviewer':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        interviewer = reference_snapshot.lookup('interviewers', 'user_id', current_user['id'])
+        if not interviewer:
+            return jsonify({"status": "error", "message": "Interviewer not found"}), 404
+        
+        skills_response = supabase.table('interviewers').select('skills').eq('id', interviewer['id']).execute()
+        windows_response = supabase.table('interviewer_availability').select('id,starts_at,ends_at') \
+            .eq('interviewer_id', interviewer['id']).gt('ends_at', datetime.now(timezone.utc).isoformat()) \
+            .order('starts_at').execute()
         
         return jsonify({
             "status": "success",
-            "message": "Mock interview updated successfully",
-            "data": response.data[0]
+            "data": {
+                "skills": skills_response.data[0]['skills'] if skills_response.data else [],
+                "windows": windows_response.data
+            }
         })
     
     except Exception as e:
-        logger.error(f"Error in update_mock_interview: {str(e)}")
+        logger.error("Error in get_availability: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
+
+@mock_interview_bp.route('/availability', methods=['PUT'])
+@token_required
+def update_availability(current_user):
+    try:
+        # Interviewers set the technologies they interview on and their upcoming windows
+        if current_user['role'] != 'interviewer':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        interviewer = reference_snapshot.lookup('interviewers', 'user_id', current_user['id'])
+        if not interviewer:
+            return jsonify({"status": "error", "message": "Interviewer not found"}), 404
+        
+        data = request.get_json(silent=True) or {}
+        
+        if 'skills' in data and not isinstance(data['skills'], list):
+            return jsonify({"status": "error", "message": "skills must be a list"}), 400
+        
+        rows = None
+        if 'windows' in data:
+            windows = data['windows']
+            if not isinstance(windows, list) or len(windows) > MAX_AVAILABILITY_WINDOWS:
+                return jsonify({"status": "error", "message": f"windows must be a list of at most {MAX_AVAILABILITY_WINDOWS} entries"}), 400
+            
+            rows = []
+            try:
+                for window in windows:
+                    starts_at = _parse_time(window.get('starts_at'), 'starts_at')
+                    ends_at = _parse_time(window.get('ends_at'), 'ends_at')
+                    if ends_at <= starts_at:
+                        raise ValueError('ends_at must be after starts_at')
+                    rows.append({
+                        'interviewer_id': interviewer['id'],
+                        'starts_at': starts_at.isoformat(),
+                        'ends_at': ends_at.isoformat()
+                    })
+            except (AttributeError, ValueError) as e:
+                message = str(e) if isinstance(e, ValueError) else 'windows must contain starts_at and ends_at'
+                return jsonify({"status": "error", "message": message}), 400
+        
+        if 'skills' in data:
+            supabase.table('interviewers').update({'skills': sorted(parse_skills(data['skills']))}) \
+                .eq('id', interviewer['id']).execute()
+        
+        if rows is not None:
+            # The submitted windows replace every upcoming window
+            supabase.table('interviewer_availability').delete(returning='minimal') \
+                .eq('interviewer_id', interviewer['id']).gt('ends_at', datetime.now(timezone.utc).isoformat()).execute()
+            if rows:
+                supabase.table('interviewer_availability').insert(rows, returning='minimal').execute()
+        
+        return jsonify({
+            "status": "success",
+            "message": "Availability updated successfully"
+        })
+    
+    except Exception as e:
+        logger.error("Error in update_availability: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@mock_interview_bp.cli.command('match')
+@click.option('--dry-run', is_flag=True, help='Report the assignments without storing them.')
+@click.option('--limit', type=int, default=MATCHING_BATCH_LIMIT, help='Most pending mock interviews to match.')
+def match_command(dry_run, limit):
+    """Assign interviewers to pending mock interviews."""
+    result = run_matching(dry_run=dry_run, limit=limit)
+    summary = {key: value for key, value in result.items() if key not in ('assignments', 'unmatched_requests')}
+    click.echo(json.dumps(summary, indent=2))
@@ -1,18 +1,64 @@
 
 from flask import Blueprint, request, jsonify
+import click
+import json
 from app import supabase, logger
-from utils.auth_middleware import token_required
+from utils.auth_middleware import token_required, roles_required
+from utils.idempotency import idempotent
+from utils.request_schema import Schema, Field, validate_body, UUID_PATTERN
+from utils.list_counts import parse_count_request, respond_with_counts
+from utils.notification_retention import get_retention_metrics, start_retention_run, archive_notifications, compact_archive
 
 notification_bp = Blueprint('notifications', __name__)
 
+# Upper bound on ids accepted by a single batch read-state update
+MAX_BATCH_IDS = 1000
+
+NOTIFICATION_STATUSES = ['unread', 'read']
+NOTIFICATION_COUNT_GROUPS = {'status': NOTIFICATION_STATUSES}
+CREATE_NOTIFICATION_SCHEMA = Schema({
+    'user_id': Field('uuid', required=True),
+    'message': Field('string', required=True, max_length=2000),
+    'status': Field('string', choices=NOTIFICATION_STATUSES)
+})
+# Recipients and dates are fixed once a notification exists
+UPDATE_NOTIFICATION_SCHEMA = Schema({
+    'message': Field('string', required=True, max_length=2000),
+    'status': Field('string', choices=NOTIFICATION_STATUSES)
+}, partial=True, ignored=['id', 'user_id', 'date', 'created_at', 'updated_at'])
+# Ids must be UUIDs, or Postgres rejects the whole statement
+MARK_READ_SCHEMA = Schema({
+    'ids': Field('array', max_length=MAX_BATCH_IDS,
+                 check=lambda ids: all(isinstance(i, str) and UUID_PATTERN.match(i) for i in ids),
+                 message="ids must be a list of notification ids"),
+    'before': Field('datetime'),
+    'status': Field('string', choices=NOTIFICATION_STATUSES)
+}, max_bytes=64 * 1024)
+
 @notification_bp.route('/', methods=['GET'])
 @token_required
 def get_notifications(current_user):
     try:
         user_id = current_user['id']
         
+        status = request.args.get('status')
+        if status is not None and status not in NOTIFICATION_STATUSES:
+            return jsonify({"status": "error", "message": f"status must be one of {', '.join(NOTIFICATION_STATUSES)}"}), 400
+        
+        def apply_filters(query):
+            query = query.eq('user_id', user_id)
+            return query.eq('status', status) if status else query
+        
+        # HEAD or ?count= returns totals only, e.g. the unread badge
+        try:
+            count, group_by = parse_count_request(request.args, request.method, NOTIFICATION_COUNT_GROUPS)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        if count:
+            return respond_with_counts('notifications', count, group_by, NOTIFICATION_COUNT_GROUPS, apply_filters)
+        
         # Get notifications for the user
-        response = supabase.table('notifications').select('*').eq('user_id', user_id).order('date', desc=True).execute()
+        response = apply_filters(supabase.table('notifications').select('*')).order('date', desc=True).execute()
         
         return jsonify({
             "status": "success",
@@ -20,25 +66,16 @@ def get_notifications(current_user):
         })
     
     except Exception as e:
-        logger.error(f"Error in get_notifications: {str(e)}")
+        logger.error("Error in get_notifications: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @notification_bp.route('/', methods=['POST'])
 @token_required
-def create_notification(current_user):
+@roles_required('admin', 'organization')
+@validate_body(CREATE_NOTIFICATION_SCHEMA)
+@idempotent
+def create_notification(current_user, data):
     try:
-        # Only admins and organizations can create notifications (except for themselves)
-        if current_user['role'] != 'admin' and current_user['role'] != 'organization':
-            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
-        
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['user_id', 'message']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"status": "error", "message": f"Missing required field: {field}"}), 400
-        
         # Create notification
         response = supabase.table('notifications').insert(data).execute()
         
@@ -52,42 +89,25 @@ def create_notification(current_user):
         }), 201
     
     except Exception as e:
-        logger.error(f"Error in create_notification: {str(e)}")
+        logger.error("Error in create_notification: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @notification_bp.route('/<notification_id>', methods=['PUT'])
 @token_required
-def update_notification(current_user, notification_id):
+@validate_body(UPDATE_NOTIFICATION_SCHEMA)
+def update_notification(current_user, notification_id, data):
     try:
         user_id = current_user['id']
         
-        # Get the notification
-        notification_response = supabase.table('notifications').select('*').eq('id', notification_id).execute()
-        
-        if not notification_response.data:
-            return jsonify({"status": "error", "message": "Notification not found"}), 404
-        
-        notification = notification_response.data[0]
-        
-        # Check if the notification belongs to the user
-        if notification['user_id'] != user_id and current_user['role'] != 'admin':
-            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
-        
-        data = request.get_json()
+        # Update notification, checking ownership in the same statement
+        query = supabase.table('notifications').update(data).eq('id', notification_id)
+        if current_user['role'] != 'admin':
+            query = query.eq('user_id', user_id)
         
-        # Protect fields that shouldn't be updated
-        if 'id' in data:
-            del data['id']
-        if 'user_id' in data:
-            del data['user_id']
-        if 'date' in data:
-            del data['date']
-        
-        # Update notification
-        response = supabase.table('notifications').update(data).eq('id', notification_id).execute()
+        response = query.execute()
         
         if not response.data:
-            return jsonify({"status": "error", "message": "Failed to update notification"}), 500
+            return jsonify({"status": "error", "message": "Notification not found"}), 404
         
         return jsonify({
             "status": "success",
@@ -96,7 +116,45 @@ def update_notification(current_user, notification_id):
         })
     
     except Exception as e:
-        logger.error(f"Error in update_notification: {str(e)}")
+        logger.error("Error in update_notification: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+def _mark_notifications(user_id, ids=None, before=None, status='read'):
+    # One UPDATE that returns only the number of changed rows
+    response = supabase.rpc('mark_notifications_read', {
+        'p_user_id': user_id,
+        'p_ids': ids,
+        'p_before': before,
+        'p_status': status
+    }).execute()
+    
+    return response.data[0]['updated_count'] if response.data else 0
+
+@notification_bp.route('/read', methods=['PUT'])
+@token_required
+@validate_body(MARK_READ_SCHEMA)
+def mark_as_read(current_user, data):
+    try:
+        ids = data.get('ids')
+        before = data.get('before')
+        status = data.get('status', 'read')
+        
+        if ids is None and before is None:
+            return jsonify({"status": "error", "message": "Either ids or before is required"}), 400
+        
+        if ids == []:
+            count = 0
+        else:
+            count = _mark_notifications(current_user['id'], ids=ids, before=before, status=status)
+        
+        return jsonify({
+            "status": "success",
+            "message": f"Notifications marked as {status}",
+            "count": count
+        })
+    
+    except Exception as e:
+        logger.error("Error in mark_as_read: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @notification_bp.route('/read-all', methods=['PUT'])
@@ -106,14 +164,68 @@ def mark_all_as_read(current_user):
         user_id = current_user['id']
         
         # Mark all notifications as read
-        response = supabase.table('notifications').update({'status': 'read'}).eq('user_id', user_id).eq('status', 'unread').execute()
+        count = _mark_notifications(user_id)
         
         return jsonify({
             "status": "success",
             "message": "All notifications marked as read",
-            "count": len(response.data) if response.data else 0
+            "count": count
+        })
+    
+    except Exception as e:
+        logger.error("Error in mark_all_as_read: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@notification_bp.route('/retention', methods=['GET'])
+@token_required
+def get_retention_status(current_user):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        return jsonify({
+            "status": "success",
+            "data": get_retention_metrics()
         })
     
     except Exception as e:
-        logger.error(f"Error in mark_all_as_read: {str(e)}")
+        logger.error("Error in get_retention_status: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@notification_bp.route('/retention/run', methods=['POST'])
+@token_required
+def run_retention(current_user):
+    try:
+        if current_user['role'] != 'admin':
+            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
+        
+        data = request.get_json(silent=True) or {}
+        
+        max_batches = data.get('max_batches')
+        if max_batches is not None and (not isinstance(max_batches, int) or isinstance(max_batches, bool) or max_batches < 1):
+            return jsonify({"status": "error", "message": "max_batches must be a positive integer"}), 400
+        
+        if not start_retention_run(max_batches=max_batches):
+            return jsonify({"status": "error", "message": "A retention run is already in progress"}), 409
+        
+        return jsonify({
+            "status": "success",
+            "message": "Retention run started"
+        }), 202
+    
+    except Exception as e:
+        logger.error("Error in run_retention: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
+
+@notification_bp.cli.command('archive')
+@click.option('--max-batches', type=int, default=None, help='Stop after this many chunks.')
+def archive_command(max_batches):
+    """Move read notifications past their TTL out of the notifications table."""
+    rows_archived = archive_notifications(max_batches=max_batches)
+    click.echo(f"Archived {rows_archived} notifications")
+
+@notification_bp.cli.command('compact')
+def compact_command():
+    """Compact the notification archive and drop months past archive retention."""
+    compact_archive()
+    click.echo(json.dumps(get_retention_metrics()['compaction'], indent=2))
@@ -1,10 +1,16 @@
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, jsonify
 from app import supabase, logger
-from utils.auth_middleware import token_required
+from utils.auth_middleware import token_required, owner_or_roles_required
+from utils.request_schema import Schema, Field, validate_body
 
 user_bp = Blueprint('users', __name__)
 
+# Email, role and password have their own flows; only the profile can be edited here
+UPDATE_USER_SCHEMA = Schema({
+    'name': Field('string', required=True, max_length=200)
+}, partial=True, ignored=['id', 'email', 'role', 'password_hash', 'created_at', 'updated_at'])
+
 @user_bp.route('/', methods=['GET'])
 @token_required
 def get_users(current_user):
@@ -21,7 +27,7 @@ def get_users(current_user):
         })
     
     except Exception as e:
-        logger.error(f"Error in get_users: {str(e)}")
+        logger.error("Error in get_users: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @user_bp.route('/<user_id>', methods=['GET'])
@@ -70,29 +76,15 @@ def get_user(current_user, user_id):
         })
     
     except Exception as e:
-        logger.error(f"Error in get_user: {str(e)}")
+        logger.error("Error in get_user: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @user_bp.route('/<user_id>', methods=['PUT'])
 @token_required
-def update_user(current_user, user_id):
+@owner_or_roles_required('user_id', 'admin')
+@validate_body(UPDATE_USER_SCHEMA)
+def update_user(current_user, user_id, data):
     try:
-        # Users can only update their own profile unless they are an admin
-        if current_user['id'] != user_id and current_user['role'] != 'admin':
-            return jsonify({"status": "error", "message": "Unauthorized access"}), 403
-        
-        data = request.get_json()
-        
-        # Remove fields that shouldn't be updated
-        if 'id' in data:
-            del data['id']
-        if 'email' in data:
-            del data['email']
-        if 'role' in data:
-            del data['role']
-        if 'password_hash' in data:
-            del data['password_hash']
-        
         # Update user
         response = supabase.table('users').update(data).eq('id', user_id).execute()
         
@@ -106,5 +98,5 @@ def update_user(current_user, user_id):
         })
     
     except Exception as e:
-        logger.error(f"Error in update_user: {str(e)}")
+        logger.error("Error in update_user: %s", e)
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -0,0 +1,133 @@
+import threading
+import unittest
+from unittest import mock
+from flask import Flask, jsonify, request
+import app
+from routes import batch_routes
+from utils import rate_limiter
+from utils.auth_middleware import token_required, AUTHENTICATED_USER_ENVIRON_KEY
+from utils.rate_limiter import AdmissionController
+
+USER = {'id': '11111111-1111-4111-8111-111111111111', 'email': 'user@example.com', 'role': 'interviewer'}
+
+def make_app():
+  # The batch blueprint on an app of its own, with routes the tests control
+  test_app = Flask(__name__)
+  test_app.register_blueprint(batch_routes.batch_bp, url_prefix='/api/batch')
+  rate_limiter.init_admission_control(test_app)
+  test_app.events = {}
+
+  @test_app.route('/api/whoami', methods=['GET'])
+  @token_required
+  def whoami(current_user):
+    return jsonify({"user": current_user['id'], "authorization": request.headers.get('Authorization')})
+
+  @test_app.route('/api/wait/<name>', methods=['GET'])
+  @token_required
+  def wait(current_user, name):
+    if not test_app.events.setdefault(name, threading.Event()).wait(1):
+      return jsonify({"name": name}), 504
+    return jsonify({"name": name})
+
+  @test_app.route('/api/release/<name>', methods=['GET'])
+  @token_required
+  def release(current_user, name):
+    test_app.events.setdefault(name, threading.Event()).set()
+    return jsonify({"name": name})
+
+  @test_app.route('/api/fail', methods=['POST'])
+  @token_required
+  def fail(current_user):
+    raise RuntimeError('handler blew up')
+
+  @test_app.route('/api/public', methods=['POST'])
+  @rate_limiter.rate_limit(per_route='1000/minute')
+  def public():
+    return jsonify({"status": "success"})
+
+  return test_app
+
+class TestBatch(unittest.TestCase):
+  def setUp(self):
+    self.controller = AdmissionController(max_in_flight=8, max_public_in_flight=3)
+    patcher = mock.patch.object(rate_limiter, 'admission_controller', self.controller)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    self.app = make_app()
+
+  def batch(self, requests, headers=None):
+    return self.app.test_client().post('/api/batch', json={'requests': requests}, headers=headers,
+                                       environ_base={AUTHENTICATED_USER_ENVIRON_KEY: USER})
+
+  def test_results_keep_request_order(self):
+    """Test results come back in request order even when a later entry finishes first."""
+    response = self.batch([
+      {'path': '/api/wait/a'},
+      {'path': '/api/release/a'},
+      {'path': '/api/whoami'}
+    ])
+
+    data = response.get_json()['data']
+    self.assertEqual([entry['body'].get('name') for entry in data[:2]], ['a', 'a'])
+    self.assertEqual(data[2]['body']['user'], USER['id'])
+
+  def test_slow_entry_does_not_stall_the_others(self):
+    """Test later entries start as soon as a slot frees, not when a whole wave is done."""
+    with mock.patch.object(batch_routes, 'BATCH_MAX_CONCURRENCY', 2):
+      # Entry 0 only finishes once entry 3 runs; with waves of two, entry 3 would wait for entry 0
+      response = self.batch([
+        {'path': '/api/wait/slow'},
+        {'path': '/api/whoami'},
+        {'path': '/api/whoami'},
+        {'path': '/api/release/slow'}
+      ])
+
+    self.assertEqual([entry['status'] for entry in response.get_json()['data']], [200] * 4)
+    self.assertTrue(self.app.events['slow'].is_set())
+
+  def test_entries_fail_independently(self):
+    """Test a failing or missing entry gets its own status while the rest succeed."""
+    self.app.config['PROPAGATE_EXCEPTIONS'] = True
+    response = self.batch([
+      {'method': 'POST', 'path': '/api/fail'},
+      {'path': '/api/missing'},
+      {'path': '/api/whoami'}
+    ])
+
+    self.assertEqual(response.status_code, 200)
+    data = response.get_json()['data']
+    self.assertEqual([entry['status'] for entry in data], [500, 404, 200])
+    self.assertEqual(data[0]['body']['message'], 'handler blew up')
+
+  def test_size_and_shape_limits(self):
+    """Test empty, oversized, nested and malformed batches are rejected."""
+    too_many = [{'path': '/api/whoami'}] * (batch_routes.BATCH_MAX_REQUESTS + 1)
+    for requests in [[], too_many, [{'path': '/api/batch'}], [{'path': '/other'}], [{'method': 'PATCH', 'path': '/api/whoami'}]]:
+      with self.subTest(requests=requests[:1]):
+        self.assertEqual(self.batch(requests).status_code, 400)
+
+  def test_authentication_is_passed_down(self):
+    """Test sub-requests run as the batch's user and only see allowed headers."""
+    response = self.batch(
+      [{'path': '/api/whoami', 'headers': {'Authorization': 'Bearer forged', 'Idempotency-Key': 'k'}}],
+      headers={'Authorization': 'Bearer outer'}
+    )
+
+    body = response.get_json()['data'][0]['body']
+    self.assertEqual(body, {'user': USER['id'], 'authorization': 'Bearer outer'})
+
+  def test_sub_requests_are_admitted(self):
+    """Test each sub-request takes an admission slot, and public ones the public cap."""
+    self.controller.public_in_flight = self.controller.max_public_in_flight
+    self.controller.in_flight = self.controller.max_public_in_flight
+
+    response = self.batch([{'method': 'POST', 'path': '/api/public'}, {'path': '/api/whoami'}])
+
+    data = response.get_json()['data']
+    self.assertEqual([entry['status'] for entry in data], [429, 200])
+    self.assertIn('Retry-After', data[0]['headers'])
+    # Every slot taken by the batch and its sub-requests was given back
+    self.assertEqual(self.controller.in_flight, self.controller.max_public_in_flight)
+
+if __name__ == '__main__':
+  unittest.main()
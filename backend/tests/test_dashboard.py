@@ -0,0 +1,135 @@
+import threading
+import time
+import unittest
+from unittest import mock
+from flask import g
+import app
+from routes import dashboard_routes
+from utils import list_counts
+from utils.auth_middleware import AUTHENTICATED_USER_ENVIRON_KEY
+
+ORGANIZATION = {'id': '11111111-1111-4111-8111-111111111111', 'email': 'org@example.com', 'role': 'organization'}
+
+class FakeQuery:
+  # Records the table and eq filters; execute() asks the test's handler for the result
+  def __init__(self, handler, table):
+    self.handler = handler
+    self.table = table
+    self.filters = {}
+    self.rows = None
+
+  def eq(self, column, value):
+    self.filters[column] = value
+    return self
+
+  def limit(self, rows):
+    self.rows = rows
+    return self
+
+  def __getattr__(self, name):
+    return lambda *args, **kwargs: self
+
+  def execute(self):
+    return self.handler(self.table, self.filters)
+
+class FakeSupabase:
+  def __init__(self, handler):
+    self.handler = handler
+    self.queries = []
+
+  def table(self, name):
+    query = FakeQuery(self.handler, name)
+    self.queries.append(query)
+    return query
+
+class TestDashboard(unittest.TestCase):
+  def setUp(self):
+    patcher = mock.patch.object(dashboard_routes.reference_snapshot, 'lookup', return_value={'id': 'org-1', 'user_id': ORGANIZATION['id']})
+    self.lookup = patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def get(self, handler, query='', headers=None):
+    client = FakeSupabase(handler)
+    self.queries = client.queries
+    with mock.patch.object(dashboard_routes, 'supabase', client), mock.patch.object(list_counts, 'supabase', client):
+      return app.app.test_client().get(f'/api/dashboard{query}', headers=headers,
+                                        environ_base={AUTHENTICATED_USER_ENVIRON_KEY: ORGANIZATION})
+
+  def ok(self, table, filters):
+    return mock.Mock(data=[{'table': table}], count=len(filters))
+
+  def test_role_sections_use_the_snapshot_record(self):
+    """Test role sections are keyed by the snapshot's role record and every count is returned."""
+    response = self.get(self.ok)
+
+    data = response.get_json()['data']
+    self.lookup.assert_called_once_with('organizations', 'user_id', ORGANIZATION['id'])
+    self.assertEqual(data['interview_stats'], {
+      'total_interviews': 1, 'scheduled_interviews': 2, 'completed_interviews': 2, 'cancelled_interviews': 2
+    })
+    self.assertEqual(data['notifications']['unread_count'], 2)
+    self.assertEqual(data['role_data'], {'table': 'organizations'})
+    # Counts fetch no rows, only the Content-Range total
+    unread = [query for query in self.queries if query.filters.get('status') == 'unread']
+    self.assertEqual([query.rows for query in unread], [0])
+    self.assertEqual(response.get_json()['errors'], {})
+
+  def test_failing_section_does_not_fail_the_dashboard(self):
+    """Test a section whose query fails is null with an error while the others are returned."""
+    def handler(table, filters):
+      if table == 'notifications':
+        raise RuntimeError('notifications unavailable')
+      return self.ok(table, filters)
+
+    response = self.get(handler)
+
+    self.assertEqual(response.status_code, 200)
+    body = response.get_json()
+    self.assertIsNone(body['data']['notifications'])
+    self.assertEqual(body['errors'], {'notifications': 'notifications unavailable'})
+    self.assertEqual(body['data']['profile'], {'table': 'users'})
+
+  def test_one_failing_part_nulls_its_section_only(self):
+    """Test a failed count inside interview stats nulls that section but not its siblings."""
+    def handler(table, filters):
+      if table == 'interviews' and filters.get('status') == 'cancelled':
+        raise RuntimeError('count failed')
+      return self.ok(table, filters)
+
+    body = self.get(handler).get_json()
+
+    self.assertIsNone(body['data']['interview_stats'])
+    self.assertEqual(list(body['errors']), ['interview_stats'])
+    self.assertIsNotNone(body['data']['upcoming_interviews'])
+
+  def test_counts_run_concurrently(self):
+    """Test the interview stats counts are in flight at the same time."""
+    # Four counts: total and one per status. Run one after another, they would break the barrier
+    barrier = threading.Barrier(4, timeout=2)
+
+    def count(table, **filters):
+      barrier.wait()
+      return 1
+
+    with mock.patch.object(dashboard_routes, '_count', count):
+      body = self.get(self.ok, '?sections=interview_stats').get_json()
+
+    self.assertEqual(body['errors'], {})
+    self.assertEqual(body['data']['interview_stats']['cancelled_interviews'], 1)
+
+  def test_sections_run_under_the_request_deadline(self):
+    """Test section threads see the deadline set from X-Request-Timeout."""
+    seen = []
+
+    def profile(user_id):
+      seen.append(g.get('deadline') - time.monotonic())
+      return {}
+
+    with mock.patch.object(dashboard_routes, '_profile', profile):
+      self.get(self.ok, '?sections=profile', headers={'X-Request-Timeout': '2'})
+
+    self.assertEqual(len(seen), 1)
+    self.assertLessEqual(seen[0], 2)
+
+if __name__ == '__main__':
+  unittest.main()
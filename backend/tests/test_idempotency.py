@@ -0,0 +1,162 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from flask import Flask, g, jsonify, request
+import app
+from utils import idempotency
+from utils.idempotency import MemoryIdempotencyStore, SQLiteIdempotencyStore, NEW, REPLAY, IN_PROGRESS, MISMATCH
+
+def make_app(handler):
+  test_app = Flask(__name__)
+
+  @test_app.before_request
+  def set_user():
+    user_id = request.headers.get('X-Test-User')
+    g.current_user = {'id': user_id} if user_id else None
+
+  @test_app.route('/items', methods=['POST'])
+  @idempotency.idempotent
+  def create_item():
+    return handler()
+
+  return test_app
+
+class TestIdempotency(unittest.TestCase):
+  def setUp(self):
+    self.store = MemoryIdempotencyStore()
+    patcher = mock.patch.object(idempotency, 'idempotency_store', self.store)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    self.calls = 0
+
+  def create(self):
+    self.calls += 1
+    return jsonify({"status": "success", "data": {"n": self.calls}}), 201
+
+  def test_retry_replays_stored_response(self):
+    """Test a retried key returns the first response without running the handler again."""
+    client = make_app(self.create).test_client()
+    headers = {'Idempotency-Key': 'k1', 'X-Test-User': 'u1'}
+
+    first = client.post('/items', json={'a': 1}, headers=headers)
+    second = client.post('/items', json={'a': 1}, headers=headers)
+
+    self.assertEqual(self.calls, 1)
+    self.assertEqual(second.status_code, 201)
+    self.assertEqual(second.get_json(), first.get_json())
+    self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+    self.assertNotIn('Idempotent-Replayed', first.headers)
+
+  def test_concurrent_retry_gets_409(self):
+    """Test a retry arriving while the first request runs is told to come back later."""
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+      started.set()
+      release.wait(5)
+      return self.create()
+
+    test_app = make_app(slow)
+    headers = {'Idempotency-Key': 'k1', 'X-Test-User': 'u1'}
+    first = threading.Thread(target=lambda: test_app.test_client().post('/items', json={}, headers=headers))
+    first.start()
+    started.wait(5)
+    try:
+      response = test_app.test_client().post('/items', json={}, headers=headers)
+    finally:
+      release.set()
+      first.join(5)
+
+    self.assertEqual(response.status_code, 409)
+    self.assertEqual(response.headers['Retry-After'], '1')
+    self.assertEqual(self.calls, 1)
+
+  def test_same_key_different_body_is_rejected(self):
+    """Test reusing a key for a different body returns 422."""
+    client = make_app(self.create).test_client()
+    headers = {'Idempotency-Key': 'k1', 'X-Test-User': 'u1'}
+
+    client.post('/items', json={'a': 1}, headers=headers)
+    response = client.post('/items', json={'a': 2}, headers=headers)
+
+    self.assertEqual(response.status_code, 422)
+    self.assertEqual(self.calls, 1)
+
+  def test_keys_are_scoped_to_the_caller(self):
+    """Test two users, or a user and an anonymous caller, can use the same key."""
+    client = make_app(self.create).test_client()
+
+    client.post('/items', json={}, headers={'Idempotency-Key': 'k1', 'X-Test-User': 'u1'})
+    other_user = client.post('/items', json={}, headers={'Idempotency-Key': 'k1', 'X-Test-User': 'u2'})
+    anonymous = client.post('/items', json={}, headers={'Idempotency-Key': 'k1'})
+
+    self.assertEqual(self.calls, 3)
+    self.assertNotIn('Idempotent-Replayed', other_user.headers)
+    self.assertNotIn('Idempotent-Replayed', anonymous.headers)
+
+  def test_server_errors_are_not_stored(self):
+    """Test a retry after a 5xx runs the handler again."""
+    status_codes = iter([500, 201])
+    client = make_app(lambda: (jsonify({"status": "n/a"}), next(status_codes))).test_client()
+    headers = {'Idempotency-Key': 'k1'}
+
+    self.assertEqual(client.post('/items', json={}, headers=headers).status_code, 500)
+    self.assertEqual(client.post('/items', json={}, headers=headers).status_code, 201)
+
+class TestMemoryIdempotencyStore(unittest.TestCase):
+  def test_keys_expire_after_ttl(self):
+    """Test a key can be reused once its TTL has passed."""
+    store = MemoryIdempotencyStore(ttl=10)
+    store.begin('k', 'f1', now=0)
+    store.complete('k', (201, b'{}', 'application/json'))
+
+    self.assertEqual(store.begin('k', 'f1', now=9)[0], REPLAY)
+    self.assertEqual(store.begin('k', 'f2', now=10)[0], NEW)
+
+  def test_least_recently_used_key_is_evicted(self):
+    """Test the store keeps at most max_keys, dropping the least recently used."""
+    store = MemoryIdempotencyStore(ttl=100, max_keys=2)
+    store.begin('a', 'f', now=0)
+    store.begin('b', 'f', now=0)
+    # Touching 'a' makes 'b' the least recently used
+    self.assertEqual(store.begin('a', 'f', now=1)[0], IN_PROGRESS)
+    store.begin('c', 'f', now=2)
+
+    self.assertEqual(store.begin('a', 'f', now=3)[0], IN_PROGRESS)
+    self.assertEqual(store.begin('b', 'f', now=3)[0], NEW)
+
+class TestSQLiteIdempotencyStore(unittest.TestCase):
+  def setUp(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    self.path = os.path.join(directory.name, 'idempotency.db')
+
+  def test_states_and_replay(self):
+    """Test the SQLite store reports new, in-progress, mismatched and replayed keys."""
+    store = SQLiteIdempotencyStore(self.path, ttl=10)
+
+    self.assertEqual(store.begin('k', 'f1', now=0), (NEW, None))
+    self.assertEqual(store.begin('k', 'f1', now=1), (IN_PROGRESS, None))
+    self.assertEqual(store.begin('k', 'f2', now=1), (MISMATCH, None))
+    store.complete('k', (201, b'{"ok": true}', 'application/json'))
+    self.assertEqual(store.begin('k', 'f1', now=2), (REPLAY, (201, b'{"ok": true}', 'application/json')))
+    self.assertEqual(store.begin('k', 'f2', now=10)[0], NEW)
+
+  def test_sweep_removes_expired_and_excess_keys(self):
+    """Test the periodic sweep drops expired keys and the oldest beyond max_keys."""
+    store = SQLiteIdempotencyStore(self.path, ttl=10, max_keys=2)
+    store.SWEEP_EVERY = 5
+    store.begin('old', 'f', now=0)
+    store.begin('a', 'f', now=20)
+    store.begin('b', 'f', now=21)
+    store.begin('c', 'f', now=22)
+    # The fifth call sweeps before inserting 'd'
+    store.begin('d', 'f', now=23)
+
+    keys = [row[0] for row in store._connection().execute('SELECT key FROM idempotency_keys ORDER BY key')]
+    self.assertEqual(keys, ['b', 'c', 'd'])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,62 @@
+
+import unittest
+import app
+from utils.interview_analytics import (
+  InterviewColumns, candidate_funnel, candidate_status, compute_organization_analytics, export_dataset,
+  interviewer_performance, to_csv
+)
+
+HOUR = 3600.0
+
+def make_columns():
+  # interviewer, candidate, status, scheduled at, feedback at
+  rows = [
+    ('iv1', 'c1', 'completed', 0, 2 * HOUR),
+    ('iv1', 'c1', 'scheduled', 10 * HOUR, None),
+    ('iv1', 'c2', 'completed', 0, 4 * HOUR),
+    ('iv1', 'c3', 'cancelled', 0, None),
+    ('iv2', 'c4', 'completed', 0, 10 * HOUR),
+    ('iv2', 'c4', 'cancelled', 5 * HOUR, None),
+    (None, 'c5', 'scheduled', 0, None)
+  ]
+  return InterviewColumns(*[list(column) for column in zip(*rows)])
+
+class TestInterviewAnalytics(unittest.TestCase):
+  def test_interviewer_performance(self):
+    """Test completion rates and time-to-feedback percentiles per interviewer."""
+    performance = {entry['interviewer_id']: entry for entry in interviewer_performance(make_columns())}
+
+    self.assertEqual(set(performance), {'iv1', 'iv2'})
+    self.assertEqual(performance['iv1']['total_interviews'], 4)
+    self.assertAlmostEqual(performance['iv1']['completion_rate'], 2 / 3, places=4)
+    self.assertEqual(performance['iv1']['time_to_feedback_hours'], {'count': 2, 'mean': 3.0, 'p50': 3.0, 'p90': 3.8})
+    self.assertEqual(performance['iv2']['completion_rate'], 0.5)
+    self.assertEqual(performance['iv2']['time_to_feedback_hours']['p90'], 10.0)
+
+  def test_candidate_status_uses_latest_interview(self):
+    """Test each candidate is counted once, by their latest interview."""
+    counts = {entry['status']: entry['count'] for entry in candidate_status(make_columns())}
+    self.assertEqual(counts, {'scheduled': 2, 'completed': 1, 'cancelled': 2})
+
+  def test_funnel(self):
+    """Test funnel stages count distinct candidates and their conversion."""
+    funnel = candidate_funnel(make_columns())
+    self.assertEqual([stage['candidates'] for stage in funnel], [5, 3, 3])
+    self.assertEqual(funnel[1]['conversion_rate'], 0.6)
+
+  def test_empty_organization(self):
+    """Test an organization without interviews gets zeroed analytics."""
+    analytics = compute_organization_analytics(InterviewColumns([], [], [], [], []))
+    self.assertEqual(analytics['stats']['total_interviews'], 0)
+    self.assertEqual(analytics['interviewer_performance'], [])
+
+  def test_csv_export(self):
+    """Test the interviews export writes one row per interview with ISO timestamps."""
+    lines = ''.join(to_csv(export_dataset(make_columns(), 'interviews'))).splitlines()
+    self.assertEqual(lines[0], 'interviewer_id,interviewee_id,status,scheduled_at,feedback_at')
+    self.assertEqual(lines[1], 'iv1,c1,completed,1970-01-01T00:00:00Z,1970-01-01T02:00:00Z')
+    self.assertEqual(lines[-1], ',c5,scheduled,1970-01-01T00:00:00Z,')
+    self.assertEqual(len(lines), 8)
+
+if __name__ == '__main__':
+  unittest.main()
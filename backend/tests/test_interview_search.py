@@ -0,0 +1,68 @@
+
+import unittest
+from unittest import mock
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Import the app first so the route modules are loaded in their usual order
+import app
+from routes import interview_routes
+from routes.interview_routes import build_interview_search
+
+def plan_nodes(plan):
+  yield plan
+  for child in plan.get('Plans', []):
+    yield from plan_nodes(child)
+
+class TestInterviewSearchFilters(unittest.TestCase):
+  def test_date_range_accepts_trimmed_fractions(self):
+    """Test date filters take any ISO 8601 datetime PostgREST returns, on every Python version."""
+    client = mock.MagicMock()
+    query = client.table.return_value.select.return_value
+    query.gte.return_value = query
+
+    with mock.patch.object(interview_routes, 'supabase', client):
+      build_interview_search({'scheduled_from': '2026-10-19T10:00:00.12+00:00', 'scheduled_to': '2026-10-20'})
+
+    query.gte.assert_called_once_with('date_time', '2026-10-19T10:00:00.120000+00:00')
+    query.lt.assert_called_once_with('date_time', '2026-10-20T00:00:00')
+
+  def test_invalid_date_is_rejected(self):
+    """Test a date filter that is not ISO 8601 raises ValueError naming the parameter."""
+    with mock.patch.object(interview_routes, 'supabase', mock.MagicMock()):
+      with self.assertRaisesRegex(ValueError, 'scheduled_from'):
+        build_interview_search({'scheduled_from': 'yesterday'})
+
+@unittest.skipUnless(
+  os.getenv('EXPLAIN_TESTS') == '1',
+  'Set EXPLAIN_TESTS=1 against a seeded database with PostgREST db-plan-enabled'
+)
+class TestInterviewSearchPlans(unittest.TestCase):
+  searches = [
+    {},
+    {'organization_id': '00000000-0000-0000-0000-000000000000', 'scheduled_from': '2024-01-01', 'scheduled_to': '2024-02-01'},
+    {'interviewer_id': '00000000-0000-0000-0000-000000000000', 'status': 'scheduled'},
+    {'interviewee_id': '00000000-0000-0000-0000-000000000000'},
+    {'status': 'completed', 'scheduled_from': '2024-01-01'},
+    {'candidate': 'Jo'},
+    {'q': 'python senior'}
+  ]
+
+  def test_searches_use_indexes(self):
+    """Test no interview search falls back to a sequential scan of interviews."""
+    for search in self.searches:
+      with self.subTest(search=search):
+        response = build_interview_search(search).explain(format='json').execute()
+        plan = response.data[0]['Plan']
+
+        seq_scans = [
+          node for node in plan_nodes(plan)
+          if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == 'interviews'
+        ]
+        self.assertEqual(seq_scans, [], f"Sequential scan for search {search}")
+
+if __name__ == "__main__":
+  unittest.main()
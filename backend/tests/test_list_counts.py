@@ -0,0 +1,103 @@
+
+import threading
+import unittest
+from unittest import mock
+from flask import g
+import app
+from utils import list_counts
+
+GROUPS = {'status': ['unread', 'read']}
+ROWS = [
+  {'user_id': 'u1', 'status': 'unread'},
+  {'user_id': 'u1', 'status': 'read'},
+  {'user_id': 'u1', 'status': 'read'},
+  {'user_id': 'u2', 'status': 'unread'},
+  {'user_id': 'u2', 'status': 'read'}
+]
+
+class FakeQuery:
+  def __init__(self, client, rows):
+    self.client = client
+    self.rows = rows
+
+  def eq(self, column, value):
+    return FakeQuery(self.client, [row for row in self.rows if row[column] == value])
+
+  def limit(self, limit):
+    self.client.limits.append(limit)
+    return self
+
+  def execute(self):
+    return mock.Mock(data=[], count=len(self.rows))
+
+class FakeSupabase:
+  def __init__(self, rows):
+    self.rows = rows
+    self.selects = []
+    self.limits = []
+
+  def table(self, name):
+    return self
+
+  def select(self, columns, count=None):
+    self.selects.append((columns, count))
+    return FakeQuery(self, self.rows)
+
+class TestListCounts(unittest.TestCase):
+  def test_parse_count_request(self):
+    """Test HEAD and ?count= ask for totals and plain GETs list rows."""
+    self.assertEqual(list_counts.parse_count_request({}, 'GET', GROUPS), (None, None))
+    self.assertEqual(list_counts.parse_count_request({}, 'HEAD', GROUPS), ('exact', None))
+    self.assertEqual(
+      list_counts.parse_count_request({'count': 'planned', 'group_by': 'status'}, 'GET', GROUPS),
+      ('planned', 'status')
+    )
+    with self.assertRaises(ValueError):
+      list_counts.parse_count_request({'count': 'all'}, 'GET', GROUPS)
+    with self.assertRaises(ValueError):
+      list_counts.parse_count_request({'count': 'exact', 'group_by': 'user_id'}, 'GET', GROUPS)
+
+  def test_grouped_counts_fetch_no_rows(self):
+    """Test each group is counted with a zero-row query and totals are returned in headers."""
+    client = FakeSupabase(ROWS)
+
+    with mock.patch.object(list_counts, 'supabase', client), app.app.test_request_context():
+      response = list_counts.respond_with_counts('notifications', 'exact', 'status', GROUPS)
+
+    self.assertEqual(client.selects, [('id', 'exact')] * 2)
+    self.assertEqual(client.limits, [0, 0])
+    self.assertEqual(response.get_json()['data'], {'count': 5, 'count_method': 'exact', 'groups': {'unread': 2, 'read': 3}})
+    self.assertEqual(response.headers['Content-Range'], '*/5')
+    self.assertEqual(response.headers['X-Group-Counts'], 'unread=2,read=3')
+
+  def test_grouped_totals_match_filtered_counts(self):
+    """Test the groups add up to the ungrouped count under the same filters."""
+    client = FakeSupabase(ROWS)
+    only_u1 = lambda query: query.eq('user_id', 'u1')
+
+    with mock.patch.object(list_counts, 'supabase', client), app.app.test_request_context():
+      groups = list_counts.count_groups('notifications', 'exact', 'status', GROUPS['status'], only_u1)
+      total = list_counts.count_rows('notifications', 'exact', only_u1)
+
+    self.assertEqual(groups, {'unread': 1, 'read': 2})
+    self.assertEqual(sum(groups.values()), total)
+
+  def test_groups_are_counted_concurrently(self):
+    """Test every group's query is in flight at once, under the request's deadline."""
+    barrier = threading.Barrier(len(GROUPS['status']), timeout=5)
+    deadlines = []
+
+    def count_rows(table, count, apply_filters=None):
+      deadlines.append(g.get('deadline'))
+      barrier.wait()
+      return 1
+
+    with mock.patch.object(list_counts, 'count_rows', count_rows), app.app.test_request_context():
+      g.deadline = 123.0
+      groups = list_counts.count_groups('notifications', 'exact', 'status', GROUPS['status'])
+
+    self.assertEqual(groups, {'unread': 1, 'read': 1})
+    self.assertEqual(deadlines, [123.0, 123.0])
+
+if __name__ == '__main__':
+  unittest.main()
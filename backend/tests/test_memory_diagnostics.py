@@ -0,0 +1,117 @@
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import app
+from utils import memory_diagnostics as memory
+
+class TestMemoryDiagnostics(unittest.TestCase):
+  def setUp(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    self.directory = directory.name
+    patcher = mock.patch.object(memory, 'MEMORY_SNAPSHOT_DIR', self.directory)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    self.addCleanup(memory.set_tracing, False)
+
+  def test_snapshot_diff_shows_growth(self):
+    """Test a diff of two snapshots points at the line that allocated in between."""
+    memory.set_tracing(True)
+    before = memory.take_snapshot()
+    retained = [bytearray(1024) for _ in range(200)]
+    after = memory.take_snapshot()
+
+    diff = memory.diff_snapshots(memory.load_snapshot(before['id']), memory.load_snapshot(after['id']))
+    self.assertGreaterEqual(diff['size_diff_bytes'], 200 * 1024)
+    self.assertIn('test_memory_diagnostics.py', diff['top'][0]['location'])
+    self.assertEqual(len(retained), 200)
+
+  def test_load_snapshot_rejects_unknown_ids(self):
+    """Test ids that are malformed or have no file are not loaded."""
+    self.assertIsNone(memory.load_snapshot('../../etc/passwd'))
+    self.assertIsNone(memory.load_snapshot(f"{os.getpid()}-0123456789ab"))
+
+  def test_snapshots_are_pruned_per_worker(self):
+    """Test only the newest snapshots of this worker are kept."""
+    memory.set_tracing(True)
+    with mock.patch.object(memory, 'MEMORY_MAX_SNAPSHOTS', 2):
+      for _ in range(4):
+        memory.take_snapshot(top=1)
+    self.assertEqual(len(memory.list_snapshots()), 2)
+
+  def test_published_stats_are_reported(self):
+    """Test a worker's published stats are listed and those of dead workers removed."""
+    memory.publish_worker_stats(force=True)
+    dead = os.path.join(self.directory, 'workers', '999999999.json')
+    with open(dead, 'w') as f:
+      f.write('{}')
+
+    reports = memory.worker_reports()
+    self.assertEqual([report['pid'] for report in reports], [os.getpid()])
+    self.assertFalse(os.path.exists(dead))
+
+  def test_unreadable_reports_are_skipped(self):
+    """Test a torn or vanished report file is left out instead of failing the listing."""
+    memory.publish_worker_stats(force=True)
+    torn = os.path.join(self.directory, 'workers', '1.json')
+    with open(torn, 'w') as f:
+      f.write('{"pid": 1, "rss')
+    real_open = open
+
+    def open_racing_removal(path, *args, **kwargs):
+      if path == torn:
+        raise FileNotFoundError(path)
+      return real_open(path, *args, **kwargs)
+
+    self.assertEqual([report['pid'] for report in memory.worker_reports()], [os.getpid()])
+    with mock.patch('builtins.open', open_racing_removal):
+      self.assertEqual([report['pid'] for report in memory.worker_reports()], [os.getpid()])
+
+  def test_concurrent_publishes_write_whole_reports(self):
+    """Test threads publishing at once each write their own temporary file and leave a valid report."""
+    errors = []
+
+    def publish():
+      try:
+        for _ in range(20):
+          memory.publish_worker_stats(force=True)
+      except OSError as e:
+        errors.append(e)
+
+    threads = [threading.Thread(target=publish) for _ in range(8)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join(10)
+
+    self.assertEqual(errors, [])
+    workers = os.path.join(self.directory, 'workers')
+    self.assertEqual(os.listdir(workers), [f"{os.getpid()}.json"])
+    with open(os.path.join(workers, f"{os.getpid()}.json")) as f:
+      self.assertEqual(json.load(f)['pid'], os.getpid())
+
+  def test_report_interval_is_checked_once(self):
+    """Test only one of several requests arriving together publishes within the interval."""
+    barrier = threading.Barrier(8, timeout=5)
+    with mock.patch.object(memory, '_last_report', time.monotonic() - 7200), \
+         mock.patch.object(memory, 'MEMORY_REPORT_SECONDS', 3600), \
+         mock.patch.object(memory, 'process_memory', return_value={'pid': os.getpid()}) as process_memory:
+      def publish():
+        barrier.wait()
+        memory.publish_worker_stats()
+
+      threads = [threading.Thread(target=publish) for _ in range(8)]
+      for thread in threads:
+        thread.start()
+      for thread in threads:
+        thread.join(10)
+
+    self.assertEqual(process_memory.call_count, 1)
+
+if __name__ == '__main__':
+  unittest.main()
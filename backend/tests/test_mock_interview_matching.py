@@ -0,0 +1,84 @@
+
+import unittest
+import app
+from utils.mock_interview_matching import MatchingEngine, parse_duration_minutes
+
+def window(interviewer_id, starts_at, ends_at):
+  return {'interviewer_id': interviewer_id, 'starts_at': starts_at, 'ends_at': ends_at}
+
+def request(mock_interview_id, technology, date_time, duration='60'):
+  return {'id': mock_interview_id, 'technology': technology, 'date_time': date_time, 'duration': duration}
+
+class TestMockInterviewMatching(unittest.TestCase):
+  def test_parse_duration(self):
+    """Test the duration formats clients send are read as minutes."""
+    self.assertEqual(parse_duration_minutes('45'), 45)
+    self.assertEqual(parse_duration_minutes('1 hour'), 60)
+    self.assertEqual(parse_duration_minutes('1h30m'), 90)
+    self.assertIsNone(parse_duration_minutes('soon'))
+
+  def test_matches_skill_and_availability(self):
+    """Test a request goes to an interviewer with the skill whose window covers it."""
+    engine = MatchingEngine(
+      [{'id': 'iv1', 'skills': ['Python']}, {'id': 'iv2', 'skills': ['react']}],
+      [window('iv1', '2026-11-02T09:00:00+00:00', '2026-11-02T12:00:00+00:00'),
+       window('iv2', '2026-11-02T09:00:00+00:00', '2026-11-02T12:00:00+00:00')],
+      []
+    )
+    assignments, unmatched = engine.match([
+      request('m1', 'python', '2026-11-02T10:00:00+00:00'),
+      request('m2', 'Python', '2026-11-02T11:30:00+00:00'),
+      request('m3', 'Go', '2026-11-02T10:00:00+00:00')
+    ])
+
+    self.assertEqual([(a['mock_interview_id'], a['interviewer_id']) for a in assignments], [('m1', 'iv1')])
+    self.assertEqual({u['mock_interview_id']: u['reason'] for u in unmatched},
+                     {'m2': 'no_availability', 'm3': 'no_skilled_interviewer'})
+
+  def test_postgrest_timestamps_with_trimmed_fractions(self):
+    """Test availability and booking times with a 5-digit fraction are matched."""
+    engine = MatchingEngine(
+      [{'id': 'iv1', 'skills': ['python']}],
+      [window('iv1', '2026-11-02T09:00:00.12345+00:00', '2026-11-02T12:00:00Z')],
+      []
+    )
+    assignments, unmatched = engine.match([request('m1', 'python', '2026-11-02T10:00:00.5+00:00')])
+
+    self.assertEqual([a['interviewer_id'] for a in assignments], ['iv1'])
+    self.assertEqual(unmatched, [])
+
+  def test_no_double_booking_and_load_balancing(self):
+    """Test overlapping requests go to different interviewers and load is spread."""
+    interviewers = [{'id': 'iv1', 'skills': ['python']}, {'id': 'iv2', 'skills': ['python']}]
+    windows = [window(i['id'], '2026-11-02T09:00:00+00:00', '2026-11-02T17:00:00+00:00') for i in interviewers]
+    existing = [{'interviewer_id': 'iv1', 'date_time': '2026-11-02T09:00:00+00:00', 'duration': '60'}]
+    engine = MatchingEngine(interviewers, windows, existing)
+
+    assignments, unmatched = engine.match([
+      request('m1', 'python', '2026-11-02T13:00:00+00:00'),
+      request('m2', 'python', '2026-11-02T13:30:00+00:00'),
+      request('m3', 'python', '2026-11-02T15:00:00+00:00')
+    ])
+
+    assigned = {a['mock_interview_id']: a['interviewer_id'] for a in assignments}
+    self.assertEqual(unmatched, [])
+    self.assertNotEqual(assigned['m1'], assigned['m2'])
+    # iv1 already had a booking, so the first free request goes to iv2
+    self.assertEqual(assigned['m1'], 'iv2')
+
+  def test_daily_cap(self):
+    """Test an interviewer is not given more than the daily cap."""
+    engine = MatchingEngine(
+      [{'id': 'iv1', 'skills': ['python']}],
+      [window('iv1', '2026-11-02T00:00:00+00:00', '2026-11-03T00:00:00+00:00')],
+      [],
+      max_per_day=2
+    )
+    assignments, unmatched = engine.match([
+      request(f'm{hour}', 'python', f'2026-11-02T{hour:02d}:00:00+00:00') for hour in range(8, 12)
+    ])
+    self.assertEqual(len(assignments), 2)
+    self.assertEqual(len(unmatched), 2)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+import app
+from routes import notification_routes
+from utils.auth_middleware import AUTHENTICATED_USER_ENVIRON_KEY
+
+USER = {'id': '11111111-1111-4111-8111-111111111111', 'email': 'user@example.com', 'role': 'interviewee'}
+NOTIFICATION_ID = '22222222-2222-4222-8222-222222222222'
+
+class TestMarkAsRead(unittest.TestCase):
+  def setUp(self):
+    self.client = app.app.test_client()
+    self.supabase = mock.MagicMock()
+    self.supabase.rpc.return_value.execute.return_value = mock.Mock(data=[{'updated_count': 2}])
+    patcher = mock.patch.object(notification_routes, 'supabase', self.supabase)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def put(self, body):
+    return self.client.put('/api/notifications/read', json=body, environ_base={AUTHENTICATED_USER_ENVIRON_KEY: USER})
+
+  def test_marks_ids_in_one_call(self):
+    """Test a list of ids is marked with one RPC returning only the count."""
+    response = self.put({'ids': [NOTIFICATION_ID]})
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json()['count'], 2)
+    self.supabase.rpc.assert_called_once_with('mark_notifications_read', {
+      'p_user_id': USER['id'], 'p_ids': [NOTIFICATION_ID], 'p_before': None, 'p_status': 'read'
+    })
+
+  def test_marks_everything_before_a_timestamp(self):
+    """Test before and status are passed through to the RPC."""
+    response = self.put({'before': '2026-05-01T10:00:00Z', 'status': 'unread'})
+
+    self.assertEqual(response.status_code, 200)
+    self.supabase.rpc.assert_called_once_with('mark_notifications_read', {
+      'p_user_id': USER['id'], 'p_ids': None, 'p_before': '2026-05-01T10:00:00Z', 'p_status': 'unread'
+    })
+
+  def test_invalid_input_is_rejected_before_the_database(self):
+    """Test bad ids, timestamps, statuses and oversized batches get a 400 without an RPC."""
+    for body in [
+      {},
+      {'ids': ['not-a-uuid']},
+      {'ids': NOTIFICATION_ID},
+      {'ids': [NOTIFICATION_ID] * (notification_routes.MAX_BATCH_IDS + 1)},
+      {'before': 'yesterday'},
+      {'ids': [NOTIFICATION_ID], 'status': 'archived'}
+    ]:
+      with self.subTest(body=body):
+        self.assertEqual(self.put(body).status_code, 400)
+    self.supabase.rpc.assert_not_called()
+
+  def test_full_batch_is_accepted(self):
+    """Test exactly MAX_BATCH_IDS ids fit in one request."""
+    response = self.put({'ids': [NOTIFICATION_ID] * notification_routes.MAX_BATCH_IDS})
+
+    self.assertEqual(response.status_code, 200)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,141 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+import app
+from routes import notification_routes
+from utils import notification_retention as retention
+from utils.auth_middleware import AUTHENTICATED_USER_ENVIRON_KEY
+
+ADMIN = {'id': '11111111-1111-4111-8111-111111111111', 'email': 'admin@example.com', 'role': 'admin'}
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+def write_chunk(directory, name, rows):
+  with gzip.open(os.path.join(directory, name), 'wt', encoding='utf-8') as f:
+    for row in rows:
+      f.write(json.dumps(row) + '\n')
+
+def read_rows(path):
+  with gzip.open(path, 'rt', encoding='utf-8') as f:
+    return [json.loads(line) for line in f]
+
+class TestArchive(unittest.TestCase):
+  def setUp(self):
+    self.supabase = mock.MagicMock()
+    patcher = mock.patch.object(retention, 'supabase', self.supabase)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def test_table_archive_moves_chunks_until_a_short_one(self):
+    """Test chunks are moved until one comes back smaller than the batch size."""
+    self.supabase.rpc.return_value.execute.side_effect = [
+      mock.Mock(data=[{'moved_count': 2}]), mock.Mock(data=[{'moved_count': 1}])
+    ]
+    with mock.patch.object(retention, 'NOTIFICATION_ARCHIVE_TARGET', 'table'), \
+        mock.patch.object(retention, 'NOTIFICATION_ARCHIVE_BATCH_SIZE', 2):
+      self.assertEqual(retention.archive_notifications(now=NOW), 3)
+
+    self.assertEqual(self.supabase.rpc.call_count, 2)
+    self.assertEqual(self.supabase.rpc.call_args[0][1]['p_batch_size'], 2)
+    metrics = retention.get_retention_metrics()['archive']
+    self.assertEqual((metrics['batches'], metrics['rows_archived']), (2, 3))
+    self.assertIsNotNone(metrics['finished_at'])
+
+  def test_max_batches_stops_early(self):
+    """Test a run stops after max_batches full chunks."""
+    self.supabase.rpc.return_value.execute.return_value = mock.Mock(data=[{'moved_count': 2}])
+    with mock.patch.object(retention, 'NOTIFICATION_ARCHIVE_TARGET', 'table'), \
+        mock.patch.object(retention, 'NOTIFICATION_ARCHIVE_BATCH_SIZE', 2):
+      self.assertEqual(retention.archive_notifications(now=NOW, max_batches=3), 6)
+
+  def test_file_archive_writes_before_deleting(self):
+    """Test rows are written to a gzipped chunk and then deleted by id."""
+    rows = [{'id': 'n1', 'date': '2026-01-05T00:00:00+00:00'}, {'id': 'n2', 'date': '2026-01-06T00:00:00+00:00'}]
+    query = self.supabase.table.return_value.select.return_value
+    for method in ['eq', 'lt', 'order', 'limit']:
+      getattr(query, method).return_value = query
+    query.execute.return_value = mock.Mock(data=rows)
+
+    with tempfile.TemporaryDirectory() as directory, \
+        mock.patch.object(retention, 'NOTIFICATION_ARCHIVE_TARGET', 'files'), \
+        mock.patch.object(retention, 'NOTIFICATION_ARCHIVE_DIR', directory), \
+        mock.patch.object(retention, 'NOTIFICATION_ARCHIVE_BATCH_SIZE', 10):
+      self.assertEqual(retention.archive_notifications(now=NOW), 2)
+      chunks = os.listdir(directory)
+      self.assertEqual(len(chunks), 1)
+      self.assertEqual(read_rows(os.path.join(directory, chunks[0])), rows)
+
+    self.supabase.table.return_value.delete.return_value.in_.assert_called_once_with('id', ['n1', 'n2'])
+
+class TestCompaction(unittest.TestCase):
+  def test_chunks_fold_into_months_and_old_months_are_dropped(self):
+    """Test chunk files are merged per month and months past archive retention removed."""
+    with tempfile.TemporaryDirectory() as directory, \
+        mock.patch.object(retention, 'NOTIFICATION_ARCHIVE_TARGET', 'files'), \
+        mock.patch.object(retention, 'NOTIFICATION_ARCHIVE_DIR', directory), \
+        mock.patch.object(retention, 'NOTIFICATION_ARCHIVE_RETENTION_DAYS', 365):
+      write_chunk(directory, 'chunk-1.jsonl.gz', [
+        {'id': 'n1', 'date': '2026-01-05T00:00:00+00:00'}, {'id': 'n2', 'date': '2026-02-01T00:00:00+00:00'}
+      ])
+      write_chunk(directory, 'chunk-2.jsonl.gz', [{'id': 'n3', 'date': '2026-01-20T00:00:00+00:00'}])
+      write_chunk(directory, 'notifications-2025-08.jsonl.gz', [{'id': 'n0', 'date': '2025-08-01T00:00:00+00:00'}])
+
+      retention.compact_archive(now=NOW)
+
+      self.assertEqual(sorted(os.listdir(directory)), ['notifications-2026-01.jsonl.gz', 'notifications-2026-02.jsonl.gz'])
+      self.assertEqual([row['id'] for row in read_rows(os.path.join(directory, 'notifications-2026-01.jsonl.gz'))], ['n1', 'n3'])
+
+    metrics = retention.get_retention_metrics()['compaction']
+    self.assertEqual(metrics['rows_compacted'], 3)
+    self.assertEqual(metrics['files_dropped'], ['notifications-2025-08.jsonl.gz'])
+
+class TestRetentionRun(unittest.TestCase):
+  def setUp(self):
+    self.client = app.app.test_client()
+
+  def post(self, body, user=ADMIN):
+    return self.client.post('/api/notifications/retention/run', json=body, environ_base={AUTHENTICATED_USER_ENVIRON_KEY: user})
+
+  def test_only_one_run_at_a_time(self):
+    """Test a second start is refused while a run is going and allowed once it ends."""
+    release = threading.Event()
+    with mock.patch.object(retention, 'archive_notifications', side_effect=lambda max_batches: release.wait(5)), \
+        mock.patch.object(retention, 'compact_archive'):
+      self.assertTrue(retention.start_retention_run())
+      self.assertFalse(retention.start_retention_run())
+      self.assertFalse(retention.run_retention())
+      release.set()
+      for thread in threading.enumerate():
+        if thread.name == 'notification-retention':
+          thread.join(5)
+      self.assertTrue(retention.run_retention())
+
+    self.assertFalse(retention.get_retention_metrics()['running'])
+
+  def test_concurrent_requests_get_409(self):
+    """Test the route answers 409 when a run is already in progress."""
+    with mock.patch.object(notification_routes, 'start_retention_run', side_effect=[True, False]):
+      self.assertEqual(self.post({}).status_code, 202)
+      self.assertEqual(self.post({}).status_code, 409)
+
+  def test_max_batches_must_be_a_positive_integer(self):
+    """Test bad max_batches values are rejected before a run starts."""
+    with mock.patch.object(notification_routes, 'start_retention_run') as start:
+      for value in ['5', -1, 0, 1.5, True]:
+        with self.subTest(value=value):
+          self.assertEqual(self.post({'max_batches': value}).status_code, 400)
+      start.assert_not_called()
+
+      self.assertEqual(self.post({'max_batches': 5}).status_code, 202)
+      start.assert_called_once_with(max_batches=5)
+
+  def test_admin_only(self):
+    """Test non-admins cannot start a run."""
+    self.assertEqual(self.post({}, user={**ADMIN, 'role': 'organization'}).status_code, 403)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,65 @@
+import threading
+import unittest
+from unittest import mock
+import app
+from utils import profiler
+from utils.profiler import DeterministicProfiler, ProfilerBusy, SamplingProfiler
+
+ADMIN = {'id': '11111111-1111-4111-8111-111111111111', 'email': 'admin@example.com', 'role': 'admin'}
+
+class TestProfiler(unittest.TestCase):
+  def test_one_cprofile_per_process(self):
+    """Test a second cProfile profile is refused until the first stops, from any thread."""
+    first = DeterministicProfiler()
+    first.start()
+    try:
+      with self.assertRaises(ProfilerBusy):
+        DeterministicProfiler().start()
+
+      errors = []
+      def start_elsewhere():
+        try:
+          DeterministicProfiler().start()
+        except ProfilerBusy as e:
+          errors.append(e)
+      thread = threading.Thread(target=start_elsewhere)
+      thread.start()
+      thread.join()
+      self.assertEqual(len(errors), 1)
+    finally:
+      first.stop()
+
+    second = DeterministicProfiler()
+    second.start()
+    second.stop()
+    # Stopping twice must not release a lock held by someone else
+    second.stop()
+    self.assertFalse(profiler._cprofile_lock.locked())
+
+  def test_sampling_profiles_can_overlap(self):
+    """Test the sampling profiler is not limited to one at a time."""
+    first, second = SamplingProfiler(), SamplingProfiler()
+    first.start()
+    second.start()
+    first.stop()
+    second.stop()
+
+  def test_requested_profile_while_busy_is_409(self):
+    """Test an admin asking for a profile while one is running gets a 409."""
+    client = app.app.test_client()
+    running = DeterministicProfiler()
+    with mock.patch.object(profiler, 'get_token_user', return_value=ADMIN), \
+        mock.patch.object(profiler, 'store_profile'):
+      running.start()
+      try:
+        response = client.get('/', headers={'X-Profile': '1'})
+      finally:
+        running.stop()
+      self.assertEqual(response.status_code, 409)
+
+      response = client.get('/', headers={'X-Profile': '1'})
+      self.assertEqual(response.status_code, 200)
+      self.assertIn('X-Profile-Id', response.headers)
+
+if __name__ == '__main__':
+  unittest.main()
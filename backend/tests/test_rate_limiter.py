@@ -0,0 +1,53 @@
+
+import unittest
+from utils.rate_limiter import MemoryBucketStore, AdmissionController, parse_rate
+
+class TestRateLimiter(unittest.TestCase):
+  def test_parse_rate(self):
+    """Test rates are parsed into capacity and refill per second."""
+    self.assertEqual(parse_rate('5/minute'), (5, 5 / 60))
+    self.assertEqual(parse_rate('2/seconds'), (2, 2.0))
+
+  def test_bucket_refills_over_time(self):
+    """Test a drained bucket rejects with a retry hint and refills later."""
+    store = MemoryBucketStore()
+    limits = [('ip:1.2.3.4:login', 2, 1.0)]
+
+    self.assertTrue(store.consume(limits, now=0)[0])
+    self.assertTrue(store.consume(limits, now=0)[0])
+
+    allowed, retry_after = store.consume(limits, now=0.5)
+    self.assertFalse(allowed)
+    self.assertAlmostEqual(retry_after, 0.5)
+
+    self.assertTrue(store.consume(limits, now=1.0)[0])
+
+  def test_rejection_does_not_spend_other_buckets(self):
+    """Test tokens are only taken when every bucket can pay."""
+    store = MemoryBucketStore()
+    ip_bucket = ('ip:1.2.3.4:login', 5, 1.0)
+    route_bucket = ('route:login', 1, 1.0)
+
+    self.assertTrue(store.consume([ip_bucket, route_bucket], now=0)[0])
+    self.assertFalse(store.consume([ip_bucket, route_bucket], now=0)[0])
+
+    # The IP bucket still holds the 4 tokens it had after the first request
+    for _ in range(4):
+      self.assertTrue(store.consume([ip_bucket], now=0)[0])
+    self.assertFalse(store.consume([ip_bucket], now=0)[0])
+
+  def test_admission_reserves_capacity_for_authenticated_traffic(self):
+    """Test public requests cannot take the slots kept for authenticated ones."""
+    controller = AdmissionController(max_in_flight=3, max_public_in_flight=1)
+
+    self.assertTrue(controller.try_acquire(public=True))
+    self.assertFalse(controller.try_acquire(public=True))
+    self.assertTrue(controller.try_acquire(public=False))
+    self.assertTrue(controller.try_acquire(public=False))
+    self.assertFalse(controller.try_acquire(public=False))
+
+    controller.release(public=True)
+    self.assertTrue(controller.try_acquire(public=True))
+
+if __name__ == "__main__":
+  unittest.main()
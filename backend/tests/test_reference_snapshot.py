@@ -0,0 +1,95 @@
+
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+import app
+from utils import reference_snapshot as snapshots
+
+def table_returning(*pages):
+  # Every chained query method returns the same query, whose execute() yields the pages in turn
+  query = mock.MagicMock()
+  for method in ['select', 'eq', 'gte', 'order', 'range', 'limit']:
+    getattr(query, method).return_value = query
+  query.execute.side_effect = [mock.Mock(data=page) for page in pages]
+  client = mock.MagicMock()
+  client.table.return_value = query
+  return client, query
+
+class TestReferenceSnapshot(unittest.TestCase):
+  def test_load_and_lookup_by_index(self):
+    """Test rows are served by id and user_id once the table is loaded."""
+    snapshot = snapshots.TableSnapshot('interviewees', 'interviewees', ['id', 'user_id', 'updated_at'], ['user_id'])
+    client, _ = table_returning([{'id': 'e1', 'user_id': 'u1', 'updated_at': '2026-01-01T00:00:00+00:00'}])
+    with mock.patch.object(snapshots, 'supabase', client):
+      snapshot.load()
+
+    self.assertTrue(snapshot.is_fresh())
+    self.assertEqual(snapshot.get('user_id', 'u1')['id'], 'e1')
+    self.assertEqual(snapshot.get('id', 'e1')['user_id'], 'u1')
+    self.assertIsNone(snapshot.get('user_id', 'u2'))
+
+  def test_poll_applies_changes_and_drops_rows_leaving_the_filter(self):
+    """Test a changed row replaces its old index entry and a demoted admin is removed."""
+    snapshot = snapshots.TableSnapshot('admin_users', 'users', ['id', 'role', 'updated_at'], [], {'role': 'admin'})
+    client, _ = table_returning(
+      [{'id': 'u1', 'role': 'admin', 'updated_at': '2026-01-01T00:00:00+00:00'}],
+      [{'id': 'u1', 'role': 'interviewer', 'updated_at': '2026-01-02T00:00:00+00:00'}],
+      []
+    )
+    with mock.patch.object(snapshots, 'supabase', client):
+      snapshot.load()
+      self.assertEqual(len(snapshot.all()), 1)
+      snapshot.poll()
+
+    self.assertEqual(snapshot.all(), [])
+    self.assertEqual(snapshot.high_water.isoformat(), '2026-01-02T00:00:00+00:00')
+
+  def test_poll_drops_deleted_rows(self):
+    """Test a tombstone in reference_deletions removes the row and its index entry."""
+    snapshot = snapshots.TableSnapshot('interviewees', 'interviewees', ['id', 'user_id', 'updated_at'], ['user_id'])
+    client, query = table_returning(
+      [{'id': 'e1', 'user_id': 'u1', 'updated_at': '2026-01-01T00:00:00+00:00'}],
+      [],
+      [{'row_id': 'e1', 'deleted_at': '2026-01-02T00:00:00.12345+00:00'}]
+    )
+    with mock.patch.object(snapshots, 'supabase', client):
+      snapshot.load()
+      snapshot.poll()
+
+    client.table.assert_called_with('reference_deletions')
+    query.eq.assert_called_with('table_name', 'interviewees')
+    self.assertIsNone(snapshot.get('user_id', 'u1'))
+    self.assertIsNone(snapshot.get('id', 'e1'))
+    self.assertEqual(snapshot.metrics['deletions'], 1)
+
+  def test_poll_rereads_an_overlap_before_the_mark(self):
+    """Test polls start SNAPSHOT_POLL_OVERLAP_SECONDS early, so rows committed late are still seen."""
+    snapshot = snapshots.TableSnapshot('interviewees', 'interviewees', ['id', 'user_id', 'updated_at'], ['user_id'])
+    snapshot.high_water = snapshot.deletions_high_water = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    # Committed after the mark was taken, but stamped with its transaction's earlier start time
+    late = {'id': 'e2', 'user_id': 'u2', 'updated_at': '2026-01-01T11:59:30.12345+00:00'}
+    newer = {'id': 'e3', 'user_id': 'u3', 'updated_at': '2026-01-01T12:00:05.12345+00:00'}
+    client, query = table_returning([late, newer], [])
+    with mock.patch.object(snapshots, 'supabase', client), mock.patch.object(snapshots, 'SNAPSHOT_POLL_OVERLAP_SECONDS', 60):
+      snapshot.poll()
+
+    query.gte.assert_any_call('updated_at', '2026-01-01T11:59:00+00:00')
+    self.assertEqual(snapshot.get('user_id', 'u2')['id'], 'e2')
+    # Trimmed fractions parse on every Python version, and the mark never moves backwards
+    self.assertEqual(snapshot.high_water, datetime(2026, 1, 1, 12, 0, 5, 123450, tzinfo=timezone.utc))
+    self.assertEqual(snapshot.deletions_high_water, datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc))
+
+  def test_stale_snapshot_falls_back_to_database(self):
+    """Test lookups bypass a snapshot that has not been refreshed."""
+    reference = snapshots.ReferenceSnapshot({
+      'organizations': {'table': 'organizations', 'columns': ['id', 'user_id', 'name'], 'indexes': ['user_id']}
+    })
+    client, query = table_returning([{'id': 'o1', 'user_id': 'u1', 'name': 'Acme'}])
+    with mock.patch.object(snapshots, 'supabase', client):
+      self.assertEqual(reference.lookup('organizations', 'user_id', 'u1')['name'], 'Acme')
+
+    query.eq.assert_called_with('user_id', 'u1')
+    self.assertEqual(reference.tables['organizations'].metrics['stale_reads'], 1)
+
+if __name__ == '__main__':
+  unittest.main()
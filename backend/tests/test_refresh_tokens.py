@@ -0,0 +1,160 @@
+import os
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+import jwt
+import app
+from routes import auth_routes
+from utils import rate_limiter
+from utils.tokens import hash_refresh_token
+
+USER = {'id': '11111111-1111-4111-8111-111111111111', 'email': 'user@example.com', 'role': 'interviewer'}
+
+class FakeSessions:
+  """The sessions table and its functions from the refresh_sessions migration, in memory."""
+
+  def __init__(self):
+    self.sessions = []
+    self.calls = []
+
+  def _parse(self, value):
+    return datetime.fromisoformat(value)
+
+  def table(self, name):
+    assert name == 'sessions'
+    return self
+
+  def insert(self, row, returning=None):
+    self.sessions.append({**row, 'family_id': uuid.uuid4(), 'expires_at': self._parse(row['expires_at']), 'revoked_at': None})
+    return self
+
+  def rpc(self, fn, params):
+    self.calls.append(fn)
+    self._pending = getattr(self, fn)(**params)
+    return self
+
+  def execute(self):
+    data, self._pending = getattr(self, '_pending', None), None
+    return mock.Mock(data=data)
+
+  def _by_hash(self, token_hash):
+    return next((s for s in self.sessions if s['token_hash'] == token_hash), None)
+
+  def _revoke_family(self, family_id):
+    now = datetime.now(timezone.utc)
+    revoked = [s for s in self.sessions if s['family_id'] == family_id and s['revoked_at'] is None]
+    for session in revoked:
+      session['revoked_at'] = now
+    return len(revoked)
+
+  def rotate_session(self, p_token_hash, p_new_token_hash, p_expires_at):
+    session = self._by_hash(p_token_hash)
+    if session is None:
+      return [{'result': 'invalid'}]
+    if session['revoked_at'] is not None:
+      self._revoke_family(session['family_id'])
+      return [{'result': 'reused'}]
+    if session['expires_at'] <= datetime.now(timezone.utc):
+      return [{'result': 'expired'}]
+    session['revoked_at'] = datetime.now(timezone.utc)
+    self.sessions.append({
+      'user_id': session['user_id'], 'family_id': session['family_id'], 'token_hash': p_new_token_hash,
+      'expires_at': self._parse(p_expires_at), 'revoked_at': None
+    })
+    return [{'user_id': USER['id'], 'email': USER['email'], 'role': USER['role'], 'result': 'ok'}]
+
+  def revoke_session_family(self, p_token_hash):
+    session = self._by_hash(p_token_hash)
+    return [{'revoked_count': self._revoke_family(session['family_id']) if session else 0}]
+
+  def delete_expired_sessions(self):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=1)
+    kept = [s for s in self.sessions if s['expires_at'] >= cutoff]
+    deleted, self.sessions = len(self.sessions) - len(kept), kept
+    return [{'deleted_count': deleted}]
+
+class TestRefreshTokens(unittest.TestCase):
+  def setUp(self):
+    self.fake = FakeSessions()
+    for patcher in [
+      mock.patch.object(auth_routes, 'supabase', self.fake),
+      mock.patch.object(rate_limiter, 'RATE_LIMIT_ENABLED', False),
+      mock.patch.dict(os.environ, {'FLASK_SECRET_KEY': 'test-secret'})
+    ]:
+      patcher.start()
+      self.addCleanup(patcher.stop)
+    self.client = app.app.test_client()
+
+  def login(self):
+    with app.app.app_context():
+      return auth_routes._issue_tokens(USER)
+
+  def refresh(self, refresh_token):
+    return self.client.post('/api/auth/refresh', json={'refresh_token': refresh_token})
+
+  def test_rotation_issues_a_new_pair(self):
+    """Test a refresh returns a new access token and a different refresh token."""
+    tokens = self.login()
+    response = self.refresh(tokens['refresh_token'])
+
+    self.assertEqual(response.status_code, 200)
+    body = response.get_json()
+    self.assertNotEqual(body['refresh_token'], tokens['refresh_token'])
+    claims = jwt.decode(body['token'], 'test-secret', algorithms=['HS256'])
+    self.assertEqual((claims['user_id'], claims['type']), (USER['id'], 'access'))
+    # Only the hash is stored
+    self.assertIsNotNone(self.fake._by_hash(hash_refresh_token(body['refresh_token'])))
+    self.assertEqual(self.refresh(body['refresh_token']).status_code, 200)
+
+  def test_replaying_a_rotated_token_revokes_the_family(self):
+    """Test reusing a rotated token fails and also invalidates the token that replaced it."""
+    tokens = self.login()
+    rotated = self.refresh(tokens['refresh_token']).get_json()['refresh_token']
+
+    replay = self.refresh(tokens['refresh_token'])
+    self.assertEqual(replay.status_code, 401)
+    self.assertIn('already been used', replay.get_json()['message'])
+    self.assertEqual(self.refresh(rotated).status_code, 401)
+
+  def test_other_logins_survive_a_revoked_family(self):
+    """Test revoking one login's family leaves the user's other sessions alone."""
+    first, second = self.login(), self.login()
+    self.refresh(first['refresh_token'])
+    self.refresh(first['refresh_token'])
+
+    self.assertEqual(self.refresh(second['refresh_token']).status_code, 200)
+
+  def test_expired_and_unknown_tokens_are_rejected(self):
+    """Test expired, unknown and missing refresh tokens get a 401 or 400."""
+    tokens = self.login()
+    self.fake.sessions[0]['expires_at'] = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+    expired = self.refresh(tokens['refresh_token'])
+    self.assertEqual(expired.status_code, 401)
+    self.assertEqual(expired.get_json()['message'], 'Refresh token has expired')
+    self.assertEqual(self.refresh('not-a-token').status_code, 401)
+    self.assertEqual(self.client.post('/api/auth/refresh', json={}).status_code, 400)
+
+  def test_logout_revokes_the_token(self):
+    """Test a refresh token stops working after logout."""
+    tokens = self.login()
+    response = self.client.post('/api/auth/logout', json={'refresh_token': tokens['refresh_token']})
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(self.refresh(tokens['refresh_token']).status_code, 401)
+
+  def test_cleanup_sessions_command(self):
+    """Test the cleanup command deletes sessions expired for over a day and reports the count."""
+    self.login()
+    self.login()
+    self.fake.sessions[0]['expires_at'] = datetime.now(timezone.utc) - timedelta(days=2)
+
+    result = app.app.test_cli_runner().invoke(args=['auth', 'cleanup-sessions'])
+
+    self.assertEqual(result.exit_code, 0, result.output)
+    self.assertIn('Deleted 1 expired sessions', result.output)
+    self.assertEqual(len(self.fake.sessions), 1)
+
+if __name__ == '__main__':
+  unittest.main()
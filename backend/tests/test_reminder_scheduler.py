@@ -0,0 +1,94 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+import app
+from utils import reminder_scheduler
+from utils.reminder_scheduler import ReminderScheduler
+from utils.timestamps import parse_timestamp
+
+class FakeQuery:
+  # Applies gte, order and range to in-memory rows the way PostgREST would
+  def __init__(self, rows):
+    self.rows = list(rows)
+
+  def select(self, columns):
+    return self
+
+  def gte(self, column, value):
+    return FakeQuery([row for row in self.rows if parse_timestamp(row[column]) >= parse_timestamp(value)])
+
+  def order(self, columns):
+    names = columns.split(',')
+    return FakeQuery(sorted(self.rows, key=lambda row: tuple(
+      parse_timestamp(row[name]) if name.endswith('_at') else row[name] for name in names
+    )))
+
+  def range(self, start, end):
+    return FakeQuery(self.rows[start:end])
+
+  def execute(self):
+    return mock.Mock(data=self.rows)
+
+class FakeSupabase:
+  def __init__(self):
+    self.tables = {'interviews_schedule': [], 'mock_interviews': []}
+
+  def table(self, name):
+    return FakeQuery(self.tables[name])
+
+def booking(booking_id, updated_at, fraction=''):
+  starts_at = datetime.now(timezone.utc) + timedelta(hours=3)
+  return {
+    'id': booking_id,
+    'status': 'scheduled',
+    'interviewee_id': 'e1',
+    'date_time': starts_at.strftime('%Y-%m-%dT%H:%M:%S') + fraction + '+00:00',
+    'updated_at': updated_at.isoformat()
+  }
+
+class TestReminderScheduler(unittest.TestCase):
+  def setUp(self):
+    self.client = FakeSupabase()
+    patcher = mock.patch.object(reminder_scheduler, 'supabase', self.client)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    self.scheduler = ReminderScheduler(offsets=[60], tick=1)
+
+  def test_poll_handles_trimmed_fractional_seconds(self):
+    """Test a changed booking whose timestamps have a 5-digit fraction is scheduled and advances the mark."""
+    row = booking('m1', datetime(2026, 5, 1, 10, tzinfo=timezone.utc), fraction='.12345')
+    row['updated_at'] = '2026-05-01T10:00:00.12345+00:00'
+    self.client.tables['mock_interviews'].append(row)
+
+    self.scheduler.poll_changes(datetime(2026, 5, 1, tzinfo=timezone.utc))
+
+    self.assertEqual(self.scheduler.metrics['pending_reminders'], 1)
+    self.assertEqual(self.scheduler._high_water['mock_interview'], datetime(2026, 5, 1, 10, 0, 0, 123450, timezone.utc))
+
+  def test_late_commit_is_picked_up_by_the_next_poll(self):
+    """Test a booking committed after a poll, with an updated_at before the mark, still gets its reminder."""
+    now = datetime(2026, 5, 1, 10, tzinfo=timezone.utc)
+    self.client.tables['mock_interviews'].append(booking('m1', now))
+    self.scheduler.poll_changes(now)
+
+    # A transaction that started 30 seconds earlier commits only now
+    self.client.tables['mock_interviews'].append(booking('m2', now - timedelta(seconds=30)))
+    self.scheduler.poll_changes(now)
+
+    self.assertIn(('mock_interview', 'm2'), self.scheduler._booking_keys)
+    self.assertEqual(self.scheduler.metrics['pending_reminders'], 2)
+    self.assertEqual(self.scheduler._high_water['mock_interview'], now)
+
+  def test_rows_sharing_a_time_across_pages_are_all_read(self):
+    """Test every change is applied when more rows than a page share one updated_at."""
+    now = datetime(2026, 5, 1, 10, tzinfo=timezone.utc)
+    self.client.tables['mock_interviews'].extend(booking(f'm{i}', now) for i in range(5))
+
+    with mock.patch.object(reminder_scheduler, 'REMINDER_PAGE_SIZE', 2):
+      self.scheduler.poll_changes(now - timedelta(minutes=5))
+
+    self.assertEqual(self.scheduler.metrics['pending_reminders'], 5)
+    self.assertEqual(self.scheduler.metrics['changes_applied'], 5)
+
+if __name__ == '__main__':
+  unittest.main()
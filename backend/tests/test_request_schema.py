@@ -0,0 +1,102 @@
+
+import unittest
+import app
+from utils.auth_middleware import AUTHENTICATED_USER_ENVIRON_KEY
+from utils.request_schema import Schema, Field
+
+SCHEMA = Schema({
+  'user_id': Field('uuid', required=True),
+  'message': Field('string', required=True, max_length=10),
+  'count': Field('integer', minimum=1),
+  'duration': Field(('string', 'integer'), coerce=str),
+  'status': Field('string', choices=['unread', 'read'])
+})
+
+class TestRequestSchema(unittest.TestCase):
+  def test_valid_body_is_passed_through(self):
+    """Test a valid body comes back with only its fields, coerced where asked."""
+    data, errors = SCHEMA.validate({
+      'user_id': '6f1c2a9e-1b2c-4d3e-8f90-0123456789ab',
+      'message': 'hi',
+      'duration': 45
+    })
+    self.assertEqual(errors, [])
+    self.assertEqual(data['duration'], '45')
+    self.assertNotIn('status', data)
+
+  def test_rejects_missing_unknown_and_invalid_fields(self):
+    """Test every problem with a body is reported, not just the first."""
+    _, errors = SCHEMA.validate({'message': 'x' * 11, 'count': True, 'status': 'gone', 'is_admin': True})
+    self.assertEqual(errors[0], 'Missing required field: user_id')
+    self.assertIn('Unknown fields: is_admin', errors)
+    self.assertIn('message must be at most 10 characters', errors)
+    self.assertIn('count must be an integer', errors)
+    self.assertIn('status must be one of read, unread', errors)
+
+  def test_blank_required_string_is_missing(self):
+    """Test a required string of only whitespace counts as missing."""
+    _, errors = SCHEMA.validate({'user_id': '6f1c2a9e-1b2c-4d3e-8f90-0123456789ab', 'message': '  '})
+    self.assertEqual(errors, ['Missing required field: message'])
+
+  def test_partial_schema(self):
+    """Test updates need no required fields, may not null them and drop ignored fields quietly."""
+    schema = Schema({'name': Field('string', required=True), 'bio': Field('string')}, partial=True, ignored=['id'])
+
+    self.assertEqual(schema.validate({'id': 'x', 'bio': None}), ({'bio': None}, []))
+    self.assertEqual(schema.validate({'name': None})[1], ['name cannot be null'])
+    self.assertEqual(schema.validate({'id': 'x'})[1], ['No fields to update'])
+    self.assertEqual(schema.validate({})[1], ['No fields to update'])
+    self.assertEqual(schema.validate({'name': None, 'id': 'x'})[1], ['name cannot be null'])
+
+  def test_datetime_accepts_trimmed_fractions(self):
+    """Test datetimes are parsed the same way as PostgREST timestamps, on every Python version."""
+    schema = Schema({'at': Field('datetime')})
+
+    self.assertEqual(schema.validate({'at': '2026-10-19T10:00:00.12345Z'})[1], [])
+    self.assertEqual(schema.validate({'at': 'tomorrow'})[1], ['at must be an ISO 8601 datetime'])
+
+class TestValidateBody(unittest.TestCase):
+  def setUp(self):
+    self.client = app.app.test_client()
+
+  def test_oversized_body_is_refused_before_parsing(self):
+    """Test a body over the schema's limit gets 413 even when it is not JSON."""
+    response = self.client.post('/api/auth/register', data='x' * 20000, content_type='application/json')
+    self.assertEqual(response.status_code, 413)
+
+  def test_invalid_body_gets_400(self):
+    """Test malformed JSON and schema errors are rejected with 400."""
+    response = self.client.post('/api/auth/register', data='{"name":', content_type='application/json')
+    self.assertEqual(response.status_code, 400)
+
+    response = self.client.post('/api/auth/register', json={'name': 'Ada', 'email': 'ada', 'password': 'p', 'role': 'admin'})
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(response.get_json()['errors'], ['email must be an email address'])
+
+  def test_interview_ids_must_be_uuids(self):
+    """Test scheduling an interview rejects ids that are not UUIDs before touching the database."""
+    user = {'id': '11111111-1111-4111-8111-111111111111', 'email': 'org@example.com', 'role': 'organization'}
+    response = self.client.post('/api/interviews/', json={
+      'candidate_id': '1; drop table interviews',
+      'interviewer_id': '22222222-2222-4222-8222-222222222222',
+      'requirement_id': 'abc',
+      'scheduled_at': '2026-10-20T10:00:00Z'
+    }, environ_base={AUTHENTICATED_USER_ENVIRON_KEY: user})
+
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(response.get_json()['errors'], ['candidate_id must be a UUID', 'requirement_id must be a UUID'])
+
+  def test_ownership_is_checked_before_the_body(self):
+    """Test updating someone else's profile gets 403 whatever the body, and the owner gets the body errors."""
+    user = {'id': '11111111-1111-4111-8111-111111111111', 'email': 'ee@example.com', 'role': 'interviewee'}
+    other = '/api/users/22222222-2222-4222-8222-222222222222'
+    environ = {AUTHENTICATED_USER_ENVIRON_KEY: user}
+
+    self.assertEqual(self.client.put(other, json={'role': 'admin'}, environ_base=environ).status_code, 403)
+    self.assertEqual(self.client.put(other, json={'name': 'x' * 20000}, environ_base=environ).status_code, 403)
+    response = self.client.put(f"/api/users/{user['id']}", json={'role': 'admin'}, environ_base=environ)
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(response.get_json()['message'], 'No fields to update')
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,47 @@
+
+import unittest
+from unittest import mock
+from utils import resilience
+from utils.resilience import CircuitBreaker
+
+class TestCircuitBreaker(unittest.TestCase):
+  def test_trips_when_failure_rate_spikes(self):
+    """Test the breaker opens once enough calls in the window have failed."""
+    breaker = CircuitBreaker('users.select')
+    for _ in range(resilience.BREAKER_MIN_CALLS - 1):
+      breaker.record(False)
+    self.assertEqual(breaker.state, 'closed')
+
+    breaker.record(False)
+    self.assertEqual(breaker.state, 'open')
+    self.assertIsNotNone(breaker.allow())
+    self.assertEqual(breaker.metrics['rejected'], 1)
+
+  def test_failures_below_threshold_keep_it_closed(self):
+    """Test occasional failures among successes do not trip the breaker."""
+    breaker = CircuitBreaker('users.select')
+    for i in range(100):
+      breaker.record(i % 4 != 0)
+    self.assertEqual(breaker.state, 'closed')
+
+  def test_half_open_lets_one_probe_through(self):
+    """Test after the cooldown a single probe decides whether the circuit closes."""
+    breaker = CircuitBreaker('users.select')
+    for _ in range(resilience.BREAKER_MIN_CALLS):
+      breaker.record(False)
+
+    with mock.patch.object(resilience, 'BREAKER_OPEN_SECONDS', 0):
+      self.assertIsNone(breaker.allow())
+      self.assertEqual(breaker.state, 'half_open')
+      self.assertIsNotNone(breaker.allow())
+
+      breaker.record(False)
+      self.assertEqual(breaker.state, 'open')
+      self.assertEqual(breaker.metrics['trips'], 2)
+
+      self.assertIsNone(breaker.allow())
+      breaker.record(True, 0.01)
+      self.assertEqual(breaker.state, 'closed')
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,68 @@
+
+import threading
+import unittest
+import app
+from utils.singleflight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+  def run_concurrently(self, flight, key, fn, callers):
+    results = [None] * callers
+    def call(index):
+      try:
+        results[index] = flight.do(key, fn)
+      except Exception as e:
+        results[index] = e
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+    for thread in threads:
+      thread.start()
+    return threads, results
+
+  def test_concurrent_callers_share_one_execution(self):
+    """Test callers arriving while a call is in flight get its result without running it again."""
+    flight = SingleFlight('test')
+    release = threading.Event()
+    executions = []
+    def fn():
+      executions.append(1)
+      release.wait(5)
+      return {'value': 42}
+
+    threads, results = self.run_concurrently(flight, 'key', fn, 8)
+    while flight.stats()['waiting'] < 7:
+      threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+      thread.join()
+
+    self.assertEqual(len(executions), 1)
+    self.assertTrue(all(result[0] == {'value': 42} for result in results))
+    self.assertEqual(sorted(shared for _, shared in results), [False] + [True] * 7)
+    self.assertEqual(flight.stats()['in_flight'], 0)
+
+  def test_errors_are_shared_and_not_remembered(self):
+    """Test waiters get the leader's exception and the next call runs afresh."""
+    flight = SingleFlight('test')
+    release = threading.Event()
+    def failing():
+      release.wait(5)
+      raise ValueError('boom')
+
+    threads, results = self.run_concurrently(flight, 'key', failing, 3)
+    while flight.stats()['waiting'] < 2:
+      threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+      thread.join()
+
+    self.assertTrue(all(isinstance(result, ValueError) for result in results))
+    self.assertEqual(flight.do('key', lambda: 'fresh'), ('fresh', False))
+
+  def test_different_keys_run_separately(self):
+    """Test calls with different keys are not coalesced."""
+    flight = SingleFlight('test')
+    self.assertEqual(flight.do('a', lambda: 1), (1, False))
+    self.assertEqual(flight.do('b', lambda: 2), (2, False))
+    self.assertEqual(flight.stats()['executions'], 2)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+from unittest import mock
+import app
+from routes import demo_request_routes, mock_interview_routes
+from utils.auth_middleware import AUTHENTICATED_USER_ENVIRON_KEY
+
+ADMIN = {'id': '11111111-1111-4111-8111-111111111111', 'email': 'admin@example.com', 'role': 'admin'}
+INTERVIEWEE = {'id': '22222222-2222-4222-8222-222222222222', 'email': 'ee@example.com', 'role': 'interviewee'}
+ROW_ID = '33333333-3333-4333-8333-333333333333'
+
+def rpc_returning(data):
+  client = mock.MagicMock()
+  client.rpc.return_value.execute.return_value = mock.Mock(data=data)
+  return client
+
+class TestUpdateDemoRequest(unittest.TestCase):
+  def put(self, client, body, user=ADMIN):
+    with mock.patch.object(demo_request_routes, 'supabase', client):
+      return app.app.test_client().put(f'/api/demo-requests/{ROW_ID}', json=body, environ_base={AUTHENTICATED_USER_ENVIRON_KEY: user})
+
+  def test_status_change_notifies_in_the_same_call(self):
+    """Test a status change sends the patch and the requester's notification in one RPC."""
+    client = rpc_returning([{'id': ROW_ID, 'status': 'approved'}])
+    response = self.put(client, {'status': 'approved'})
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json()['data']['status'], 'approved')
+    client.rpc.assert_called_once_with('update_demo_request', {
+      'p_id': ROW_ID,
+      'p_changes': {'status': 'approved'},
+      'p_notification_message': 'Your demo request has been approved.'
+    })
+    client.table.assert_not_called()
+
+  def test_other_changes_send_no_notification(self):
+    """Test edits that leave the status alone do not notify."""
+    client = rpc_returning([{'id': ROW_ID}])
+    self.put(client, {'company_name': 'Acme'})
+
+    self.assertIsNone(client.rpc.call_args[0][1]['p_notification_message'])
+
+  def test_missing_row_is_404(self):
+    """Test an empty RPC result means the demo request does not exist."""
+    self.assertEqual(self.put(rpc_returning([]), {'status': 'rejected'}).status_code, 404)
+
+  def test_non_admin_is_forbidden(self):
+    """Test only admins can update demo requests and no RPC is made otherwise."""
+    client = rpc_returning([{'id': ROW_ID}])
+
+    self.assertEqual(self.put(client, {'status': 'approved'}, user=INTERVIEWEE).status_code, 403)
+    client.rpc.assert_not_called()
+
+  def test_role_is_checked_before_the_body(self):
+    """Test a non-admin sending an invalid body is refused with 403, not told the schema."""
+    response = self.put(rpc_returning([]), {'status': 'archived', 'is_admin': True}, user=INTERVIEWEE)
+
+    self.assertEqual(response.status_code, 403)
+    self.assertNotIn('errors', response.get_json())
+
+  def test_empty_update_is_rejected(self):
+    """Test a body with nothing to change gets 400 and no RPC is made."""
+    client = rpc_returning([{'id': ROW_ID}])
+
+    for body in ({}, {'id': ROW_ID, 'created_at': '2026-01-01T00:00:00Z'}):
+      response = self.put(client, body)
+      self.assertEqual(response.status_code, 400)
+      self.assertEqual(response.get_json()['message'], 'No fields to update')
+    client.rpc.assert_not_called()
+
+class TestUpdateMockInterview(unittest.TestCase):
+  def setUp(self):
+    patcher = mock.patch.object(mock_interview_routes, 'notify_booking_changed')
+    self.notify = patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def put(self, client, body, user=INTERVIEWEE):
+    with mock.patch.object(mock_interview_routes, 'supabase', client):
+      return app.app.test_client().put(f'/api/mock-interviews/{ROW_ID}', json=body, environ_base={AUTHENTICATED_USER_ENVIRON_KEY: user})
+
+  def test_completion_is_one_call_scoped_to_the_owner(self):
+    """Test the transition to completed is one RPC carrying the interviewee's user id."""
+    updated = {'id': ROW_ID, 'status': 'completed'}
+    client = rpc_returning([{'mock_interview': updated, 'previous_status': 'scheduled', 'authorized': True}])
+    response = self.put(client, {'status': 'completed'})
+
+    self.assertEqual(response.status_code, 200)
+    self.assertEqual(response.get_json()['data'], updated)
+    client.rpc.assert_called_once_with('update_mock_interview', {
+      'p_id': ROW_ID, 'p_changes': {'status': 'completed'}, 'p_user_id': INTERVIEWEE['id']
+    })
+    self.notify.assert_called_once_with('mock_interview', updated)
+
+  def test_admin_is_not_scoped(self):
+    """Test admins update any mock interview."""
+    client = rpc_returning([{'mock_interview': {'id': ROW_ID}, 'previous_status': 'scheduled', 'authorized': True}])
+    self.put(client, {'status': 'cancelled'}, user=ADMIN)
+
+    self.assertIsNone(client.rpc.call_args[0][1]['p_user_id'])
+
+  def test_someone_elses_mock_interview_is_forbidden(self):
+    """Test authorized = false becomes a 403 and nothing is rescheduled."""
+    client = rpc_returning([{'mock_interview': None, 'previous_status': 'scheduled', 'authorized': False}])
+
+    self.assertEqual(self.put(client, {'status': 'completed'}).status_code, 403)
+    self.notify.assert_not_called()
+
+  def test_missing_row_is_404(self):
+    """Test an empty RPC result means the mock interview does not exist."""
+    self.assertEqual(self.put(rpc_returning([]), {'status': 'completed'}).status_code, 404)
+    self.notify.assert_not_called()
+
+  def test_other_roles_are_forbidden(self):
+    """Test interviewers and organizations cannot update mock interviews."""
+    client = rpc_returning([])
+
+    self.assertEqual(self.put(client, {'status': 'completed'}, user={**INTERVIEWEE, 'role': 'interviewer'}).status_code, 403)
+    client.rpc.assert_not_called()
+
+  def test_role_is_checked_before_the_body(self):
+    """Test other roles get 403 for an invalid body too."""
+    response = self.put(rpc_returning([]), {'duration': 'soon'}, user={**INTERVIEWEE, 'role': 'interviewer'})
+
+    self.assertEqual(response.status_code, 403)
+
+if __name__ == '__main__':
+  unittest.main()
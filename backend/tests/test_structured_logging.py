@@ -0,0 +1,76 @@
+
+import json
+import logging
+import queue
+import unittest
+import app
+from utils import structured_logging
+
+def make_record(message, *args, level=logging.INFO, name='app', lineno=10, extra=None):
+  record = logging.LogRecord(name, level, __file__, lineno, message, args, None)
+  for key, value in (extra or {}).items():
+    setattr(record, key, value)
+  return record
+
+class TestStructuredLogging(unittest.TestCase):
+  def test_redact_masks_fields_and_truncates(self):
+    """Test sensitive keys are masked at any depth and long strings are cut short."""
+    redacted = structured_logging.redact({
+      'name': 'Ada',
+      'password': 'secret',
+      'nested': {'Authorization': 'Bearer x', 'notes': 'n' * 5000}
+    })
+
+    self.assertEqual(redacted['name'], 'Ada')
+    self.assertEqual(redacted['password'], structured_logging.REDACTED)
+    self.assertEqual(redacted['nested']['Authorization'], structured_logging.REDACTED)
+    self.assertLess(len(redacted['nested']['notes']), 600)
+
+  def test_redact_text_masks_inline_secrets(self):
+    """Test secrets embedded in message text are masked."""
+    text = structured_logging.redact_text("login failed for {'password': 'hunter2'} token=abc")
+    self.assertNotIn('hunter2', text)
+    self.assertNotIn('abc', text)
+
+  def test_rate_limit_per_call_site(self):
+    """Test a call site is capped per window and the suppressed count rides on the next record."""
+    sampling = structured_logging.SamplingFilter(sample_rates={}, rate_limit=2, window=60)
+    kept = [sampling.filter(make_record('noisy')) for _ in range(5)]
+    self.assertEqual(kept, [True, True, False, False, False])
+    self.assertTrue(sampling.filter(make_record('elsewhere', lineno=20)))
+
+    sampling._sites[(__file__, 10)][0] -= 60
+    record = make_record('noisy')
+    self.assertTrue(sampling.filter(record))
+    self.assertEqual(record.suppressed, 3)
+
+  def test_sampling_spares_warnings(self):
+    """Test sampled loggers drop info records but never warnings or errors."""
+    sampling = structured_logging.SamplingFilter(sample_rates={'werkzeug': 0.0}, rate_limit=0)
+    self.assertFalse(sampling.filter(make_record('GET /', name='werkzeug')))
+    self.assertTrue(sampling.filter(make_record('GET /', name='werkzeug', level=logging.WARNING)))
+    self.assertTrue(sampling.filter(make_record('hello', name='app')))
+
+  def test_full_queue_drops_instead_of_blocking(self):
+    """Test records are dropped when the writer falls behind and the count is reported later."""
+    handler = structured_logging.NonBlockingQueueHandler(queue.Queue(1))
+    handler.handle(make_record('first'))
+    handler.handle(make_record('second'))
+    handler.handle(make_record('third'))
+
+    first = handler.queue.get_nowait()
+    handler.handle(make_record('fourth'))
+    self.assertEqual(first.getMessage(), 'first')
+    self.assertEqual(handler.queue.get_nowait().dropped, 2)
+
+  def test_json_formatter(self):
+    """Test records become JSON with the lazy message, context and redacted extra fields."""
+    record = make_record('Stored %s', 'demo', extra={'request_id': 'abc', 'payload': {'email': 'a@b.c'}})
+    entry = json.loads(structured_logging.JsonFormatter().format(record))
+
+    self.assertEqual(entry['message'], 'Stored demo')
+    self.assertEqual(entry['request_id'], 'abc')
+    self.assertEqual(entry['payload'], {'email': structured_logging.REDACTED})
+
+if __name__ == '__main__':
+  unittest.main()
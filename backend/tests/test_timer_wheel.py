@@ -0,0 +1,43 @@
+
+import random
+import unittest
+from utils.timer_wheel import TimerWheel
+
+class TestTimerWheel(unittest.TestCase):
+  def test_timer_fires_at_expiry(self):
+    """Test a timer fires on the first advance at or after its time."""
+    wheel = TimerWheel(tick=1.0, slots=8, levels=2)
+    wheel.schedule('a', 5.0, 'payload')
+
+    self.assertEqual(wheel.advance(4.0), [])
+    self.assertEqual(wheel.advance(5.0), [('a', 'payload')])
+    self.assertEqual(len(wheel), 0)
+
+  def test_cancel_and_reschedule(self):
+    """Test cancelled timers never fire and rescheduling replaces the old time."""
+    wheel = TimerWheel(tick=1.0, slots=8, levels=2)
+    wheel.schedule('a', 3.0)
+    wheel.schedule('b', 3.0)
+    self.assertTrue(wheel.cancel('a'))
+    self.assertFalse(wheel.cancel('a'))
+    wheel.schedule('b', 20.0)
+
+    self.assertEqual(wheel.advance(10.0), [])
+    self.assertEqual(wheel.advance(20.0), [('b', None)])
+
+  def test_far_timers_cascade_in_order(self):
+    """Test timers past every level, including the overflow, fire at their tick."""
+    wheel = TimerWheel(tick=1.0, slots=4, levels=2)
+    rng = random.Random(7)
+    expected = {f'timer-{i}': rng.randint(1, 100) for i in range(200)}
+    for key, when in expected.items():
+      wheel.schedule(key, when)
+
+    fired = {}
+    for now in range(1, 101):
+      for key, _ in wheel.advance(now):
+        fired[key] = now
+    self.assertEqual(fired, expected)
+
+if __name__ == '__main__':
+  unittest.main()
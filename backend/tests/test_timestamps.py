@@ -0,0 +1,18 @@
+import unittest
+from datetime import datetime, timezone
+from utils.timestamps import parse_timestamp
+
+class TestTimestamps(unittest.TestCase):
+  def test_trimmed_fractions_parse(self):
+    """Test fractional seconds of any length parse, as PostgREST trims trailing zeros."""
+    self.assertEqual(parse_timestamp('2024-05-01T10:00:00.12345+00:00'), datetime(2024, 5, 1, 10, 0, 0, 123450, timezone.utc))
+    self.assertEqual(parse_timestamp('2024-05-01T10:00:00.1+00:00').microsecond, 100000)
+    self.assertEqual(parse_timestamp('2024-05-01T10:00:00.1234567+00:00').microsecond, 123456)
+
+  def test_z_suffix_and_whole_seconds(self):
+    """Test a Z suffix means UTC and timestamps without a fraction still parse."""
+    self.assertEqual(parse_timestamp('2024-05-01T10:00:00Z'), datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc))
+    self.assertEqual(parse_timestamp('2024-05-01T12:00:00+02:00'), datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc))
+
+if __name__ == '__main__':
+  unittest.main()
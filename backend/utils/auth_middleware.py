@@ -1,47 +1,111 @@
 
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, g
 import jwt
 import os
 
+def get_bearer_token():
+    # Check if token is in headers
+    if 'Authorization' in request.headers:
+        auth_header = request.headers['Authorization']
+        if auth_header.startswith('Bearer '):
+            return auth_header.split(' ')[1]
+    return None
+
+def get_token_user():
+    """Return the user from a valid bearer token, or None; for hooks that run before token_required."""
+    token = get_bearer_token()
+    if not token:
+        return None
+    
+    try:
+        data = jwt.decode(token, os.getenv('FLASK_SECRET_KEY'), algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+    
+    return {
+        'id': data['user_id'],
+        'email': data['email'],
+        'role': data['role']
+    }
+
+# Internal sub-requests dispatched by the batch endpoint carry the user authenticated
+# by the outer request here; clients cannot set WSGI environ keys
+AUTHENTICATED_USER_ENVIRON_KEY = 'hirevantage.current_user'
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
+        current_user = request.environ.get(AUTHENTICATED_USER_ENVIRON_KEY)
         
-        # Check if token is in headers
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-        
-        if not token:
-            return jsonify({
-                'status': 'error',
-                'message': 'Token is missing'
-            }), 401
-        
-        try:
-            # Decode the token
-            data = jwt.decode(token, os.getenv('FLASK_SECRET_KEY'), algorithms=['HS256'])
-            current_user = {
-                'id': data['user_id'],
-                'email': data['email'],
-                'role': data['role']
-            }
+        if current_user is None:
+            token = get_bearer_token()
             
-        except jwt.ExpiredSignatureError:
-            return jsonify({
-                'status': 'error',
-                'message': 'Token has expired'
-            }), 401
-        except jwt.InvalidTokenError:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid token'
-            }), 401
+            if not token:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Token is missing'
+                }), 401
+            
+            try:
+                # Decode the token
+                data = jwt.decode(token, os.getenv('FLASK_SECRET_KEY'), algorithms=['HS256'])
+                current_user = {
+                    'id': data['user_id'],
+                    'email': data['email'],
+                    'role': data['role']
+                }
+                
+            except jwt.ExpiredSignatureError:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Token has expired'
+                }), 401
+            except jwt.InvalidTokenError:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Invalid token'
+                }), 401
+        
+        # Keep the current user on the request context for other decorators and hooks
+        g.current_user = current_user
         
         # Pass the current user to the route
         return f(current_user, *args, **kwargs)
     
     return decorated
+
+def roles_required(*roles):
+    """Reject users outside roles with 403; goes after token_required and before validate_body,
+    so callers who may not use an endpoint never learn its schema."""
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            if current_user['role'] not in roles:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Unauthorized access'
+                }), 403
+            
+            return f(current_user, *args, **kwargs)
+        
+        return decorated
+    
+    return decorator
+
+def owner_or_roles_required(user_id_arg, *roles):
+    """Like roles_required, but also lets through the user whose id is in the URL argument user_id_arg."""
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, *args, **kwargs):
+            if current_user['id'] != kwargs.get(user_id_arg) and current_user['role'] not in roles:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Unauthorized access'
+                }), 403
+            
+            return f(current_user, *args, **kwargs)
+        
+        return decorated
+    
+    return decorator
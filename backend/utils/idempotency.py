@@ -0,0 +1,205 @@
+
+from collections import OrderedDict
+from functools import wraps
+from flask import request, jsonify, g, make_response
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from utils.rate_limiter import get_client_ip
+
+# 'memory' keeps keys per worker, any other value is a SQLite file path shared by all workers
+IDEMPOTENCY_STORE = os.getenv('IDEMPOTENCY_STORE', 'memory')
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', '86400'))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv('IDEMPOTENCY_MAX_KEYS', '10000'))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Results of begin()
+NEW = 'new'
+REPLAY = 'replay'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'
+
+
+class MemoryIdempotencyStore:
+    """Recent idempotency keys and their responses, bounded by TTL and size (LRU)."""
+
+    def __init__(self, ttl=IDEMPOTENCY_TTL, max_keys=IDEMPOTENCY_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, key, fingerprint, now=None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry['expires'] <= now:
+                del self._entries[key]
+                entry = None
+
+            if entry:
+                self._entries.move_to_end(key)
+                if entry['fingerprint'] != fingerprint:
+                    return MISMATCH, None
+                if entry['response'] is None:
+                    return IN_PROGRESS, None
+                return REPLAY, entry['response']
+
+            self._entries[key] = {'fingerprint': fingerprint, 'response': None, 'expires': now + self.ttl}
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+            return NEW, None
+
+    def complete(self, key, response):
+        # response is a (status_code, body, content_type) tuple
+        with self._lock:
+            if key in self._entries:
+                self._entries[key]['response'] = response
+
+    def abandon(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class SQLiteIdempotencyStore:
+    """Idempotency keys in a local SQLite file so a retry can land on any gunicorn worker."""
+
+    SWEEP_EVERY = 256
+
+    def __init__(self, path, ttl=IDEMPOTENCY_TTL, max_keys=IDEMPOTENCY_MAX_KEYS):
+        self.path = path
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._calls = 0
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS idempotency_keys '
+            '(key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, status_code INTEGER, '
+            'body BLOB, content_type TEXT, expires REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def begin(self, key, fingerprint, now=None):
+        now = now if now is not None else time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._calls += 1
+            if self._calls % self.SWEEP_EVERY == 0:
+                self._sweep(conn, now)
+
+            row = conn.execute(
+                'SELECT fingerprint, status_code, body, content_type, expires FROM idempotency_keys WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row and row[4] > now:
+                conn.execute('COMMIT')
+                if row[0] != fingerprint:
+                    return MISMATCH, None
+                if row[1] is None:
+                    return IN_PROGRESS, None
+                return REPLAY, (row[1], row[2], row[3])
+
+            conn.execute(
+                'INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, expires) VALUES (?, ?, ?)',
+                (key, fingerprint, now + self.ttl)
+            )
+            conn.execute('COMMIT')
+            return NEW, None
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _sweep(self, conn, now):
+        conn.execute('DELETE FROM idempotency_keys WHERE expires <= ?', (now,))
+        conn.execute(
+            'DELETE FROM idempotency_keys WHERE key IN '
+            '(SELECT key FROM idempotency_keys ORDER BY expires DESC LIMIT -1 OFFSET ?)',
+            (self.max_keys,)
+        )
+
+    def complete(self, key, response):
+        status_code, body, content_type = response
+        self._connection().execute(
+            'UPDATE idempotency_keys SET status_code = ?, body = ?, content_type = ? WHERE key = ?',
+            (status_code, body, content_type, key)
+        )
+
+    def abandon(self, key):
+        self._connection().execute('DELETE FROM idempotency_keys WHERE key = ?', (key,))
+
+
+def _create_store():
+    if IDEMPOTENCY_STORE == 'memory':
+        return MemoryIdempotencyStore()
+    return SQLiteIdempotencyStore(IDEMPOTENCY_STORE)
+
+
+idempotency_store = _create_store()
+
+
+def _request_fingerprint():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode('utf-8'))
+    digest.update(request.path.encode('utf-8'))
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def idempotent(f):
+    """Replay the stored response when a request is retried with the same Idempotency-Key.
+
+    Keys are scoped to the caller (user id, or client IP for public routes) and the
+    endpoint. Server errors are not stored, so a retry after a 5xx runs the handler again.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if not idempotency_key:
+            return f(*args, **kwargs)
+
+        if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return jsonify({"status": "error", "message": "Idempotency-Key is too long"}), 400
+
+        current_user = g.get('current_user')
+        scope = f"user:{current_user['id']}" if current_user else f"ip:{get_client_ip()}"
+        key = f"{scope}:{request.endpoint}:{idempotency_key}"
+
+        state, stored = idempotency_store.begin(key, _request_fingerprint())
+        if state == MISMATCH:
+            return jsonify({"status": "error", "message": "Idempotency-Key was already used for a different request"}), 422
+        if state == IN_PROGRESS:
+            response = jsonify({"status": "error", "message": "A request with this Idempotency-Key is still being processed"})
+            response.status_code = 409
+            response.headers['Retry-After'] = '1'
+            return response
+        if state == REPLAY:
+            status_code, body, content_type = stored
+            response = make_response(body, status_code)
+            response.content_type = content_type
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            idempotency_store.abandon(key)
+            raise
+
+        if response.status_code >= 500:
+            idempotency_store.abandon(key)
+        else:
+            idempotency_store.complete(key, (response.status_code, response.get_data(), response.content_type))
+        return response
+
+    return decorated
@@ -0,0 +1,309 @@
+
+import csv
+import io
+import os
+import numpy as np
+
+from app import supabase
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+STATUSES = ['scheduled', 'completed', 'cancelled']
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+SCHEDULED, COMPLETED, CANCELLED = range(len(STATUSES))
+
+# Interviews fetched per round-trip; each chunk comes back as a single row of arrays
+ANALYTICS_CHUNK_SIZE = int(os.getenv('ANALYTICS_CHUNK_SIZE', '100000'))
+TIME_TO_FEEDBACK_PERCENTILES = [50, 90]
+
+EXPORT_DATASETS = ['interviews', 'interviewer_performance']
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.file',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def _factorize(values):
+    """Return (labels, codes): the distinct values in first-seen order and each value's index."""
+    labels = list(dict.fromkeys(values))
+    lookup = {value: code for code, value in enumerate(labels)}
+    codes = np.fromiter(map(lookup.__getitem__, values), dtype=np.int32, count=len(values))
+    return labels, codes
+
+
+class InterviewColumns:
+    """An organization's interviews as parallel NumPy arrays.
+
+    Interviewers and interviewees are stored as integer codes into their label
+    lists, statuses as codes into STATUSES and times as epoch seconds, with NaN
+    for interviews that have no feedback yet.
+    """
+
+    def __init__(self, interviewer_ids, interviewee_ids, statuses, scheduled_at, feedback_at):
+        self.interviewers, self.interviewer_codes = _factorize(interviewer_ids)
+        self.interviewees, self.interviewee_codes = _factorize(interviewee_ids)
+        self.status_codes = np.fromiter((STATUS_CODES[s] for s in statuses), dtype=np.int8, count=len(statuses))
+        self.scheduled_at = np.array(scheduled_at, dtype=np.float64)
+        self.feedback_at = np.array(feedback_at, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.status_codes)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        def concat(name):
+            return [value for chunk in chunks for value in chunk[name]]
+
+        return cls(
+            concat('interviewer_ids'),
+            concat('interviewee_ids'),
+            concat('statuses'),
+            concat('scheduled_epochs'),
+            concat('feedback_epochs')
+        )
+
+
+def load_interview_columns(organization_id, chunk_size=ANALYTICS_CHUNK_SIZE):
+    chunks = []
+    after = None
+    while True:
+        response = supabase.rpc('interview_analytics_chunk', {
+            'p_organization_id': organization_id,
+            'p_after': after,
+            'p_limit': chunk_size
+        }).execute()
+        chunk = response.data[0] if response.data else None
+        if not chunk or not chunk['row_count']:
+            break
+        chunks.append(chunk)
+        if chunk['row_count'] < chunk_size:
+            break
+        after = chunk['last_id']
+    return InterviewColumns.from_chunks(chunks)
+
+
+def status_counts(columns):
+    counts = np.bincount(columns.status_codes, minlength=len(STATUSES)).tolist()
+    return {status: counts[code] for code, status in enumerate(STATUSES)}
+
+
+def _grouped_percentiles(codes, values, groups, percentiles):
+    """Percentiles (linear interpolation) of values within each group code, in one sort."""
+    counts = np.bincount(codes, minlength=groups)
+    result = {p: np.full(groups, np.nan) for p in percentiles}
+    if not len(values):
+        return counts, result
+
+    order = np.lexsort((values, codes))
+    values = values[order]
+    starts = np.cumsum(counts) - counts
+    present = counts > 0
+    for p in percentiles:
+        position = starts + (counts - 1) * (p / 100.0)
+        lower = np.clip(np.floor(position).astype(np.int64), 0, len(values) - 1)
+        upper = np.clip(np.ceil(position).astype(np.int64), 0, len(values) - 1)
+        interpolated = values[lower] + (values[upper] - values[lower]) * (position - np.floor(position))
+        result[p][present] = interpolated[present]
+    return counts, result
+
+
+def _time_to_feedback_hours(columns):
+    hours = (columns.feedback_at - columns.scheduled_at) / 3600.0
+    # Feedback entered before the interview's time is a data entry artefact, not a duration
+    valid = (columns.status_codes == COMPLETED) & ~np.isnan(hours) & (hours >= 0)
+    return valid, hours
+
+
+def interviewer_performance_arrays(columns):
+    """Per-interviewer counts, completion rate and time-to-feedback stats as arrays indexed by interviewer code."""
+    groups = len(columns.interviewers)
+    codes = columns.interviewer_codes
+    by_status = np.bincount(
+        codes.astype(np.int64) * len(STATUSES) + columns.status_codes,
+        minlength=groups * len(STATUSES)
+    ).reshape(groups, len(STATUSES))
+
+    completed = by_status[:, COMPLETED]
+    cancelled = by_status[:, CANCELLED]
+    resolved = completed + cancelled
+    completion_rate = np.divide(completed, resolved, out=np.full(groups, np.nan), where=resolved > 0)
+
+    valid, hours = _time_to_feedback_hours(columns)
+    feedback_codes = codes[valid]
+    feedback_hours = hours[valid]
+    feedback_counts, percentiles = _grouped_percentiles(
+        feedback_codes, feedback_hours, groups, TIME_TO_FEEDBACK_PERCENTILES
+    )
+    total_hours = np.bincount(feedback_codes, weights=feedback_hours, minlength=groups)
+    mean_hours = np.divide(total_hours, feedback_counts, out=np.full(groups, np.nan), where=feedback_counts > 0)
+
+    arrays = {
+        'interviewer_id': np.array(columns.interviewers, dtype=object),
+        'total_interviews': by_status.sum(axis=1),
+        'scheduled': by_status[:, SCHEDULED],
+        'completed': completed,
+        'cancelled': cancelled,
+        'completion_rate': completion_rate,
+        'feedback_count': feedback_counts,
+        'mean_hours_to_feedback': mean_hours
+    }
+    for p, values in percentiles.items():
+        arrays[f'p{p}_hours_to_feedback'] = values
+    return arrays
+
+
+def _round(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def interviewer_performance(columns):
+    arrays = interviewer_performance_arrays(columns)
+    lists = {name: values.tolist() for name, values in arrays.items()}
+    performance = []
+    for index, interviewer_id in enumerate(lists['interviewer_id']):
+        if interviewer_id is None:
+            continue
+        performance.append({
+            'interviewer_id': interviewer_id,
+            'total_interviews': lists['total_interviews'][index],
+            'scheduled': lists['scheduled'][index],
+            'completed': lists['completed'][index],
+            'cancelled': lists['cancelled'][index],
+            'completion_rate': _round(arrays['completion_rate'][index]),
+            'time_to_feedback_hours': {
+                'count': lists['feedback_count'][index],
+                'mean': _round(arrays['mean_hours_to_feedback'][index]),
+                **{
+                    f'p{p}': _round(arrays[f'p{p}_hours_to_feedback'][index])
+                    for p in TIME_TO_FEEDBACK_PERCENTILES
+                }
+            }
+        })
+    performance.sort(key=lambda entry: entry['total_interviews'], reverse=True)
+    return performance
+
+
+def candidate_status(columns):
+    """How many candidates are in each status, judged by their latest interview."""
+    if not len(columns):
+        return [{'status': status, 'count': 0} for status in STATUSES]
+
+    # Walk interviews oldest first; with repeated indices the last assignment wins,
+    # which leaves each candidate's latest interview
+    order = np.argsort(columns.scheduled_at, kind='stable')
+    latest = np.empty(len(columns.interviewees), dtype=np.int64)
+    latest[columns.interviewee_codes[order]] = order
+    counts = np.bincount(columns.status_codes[latest], minlength=len(STATUSES)).tolist()
+    return [{'status': status, 'count': counts[code]} for code, status in enumerate(STATUSES)]
+
+
+def candidate_funnel(columns):
+    """Candidates reaching each stage: interviewed at all, completed an interview, received feedback."""
+    candidates = len(columns.interviewees)
+    completed = columns.status_codes == COMPLETED
+    with_feedback, _ = _time_to_feedback_hours(columns)
+
+    def reached(mask):
+        return int(np.count_nonzero(np.bincount(columns.interviewee_codes[mask], minlength=candidates)))
+
+    stages = [
+        ('scheduled', candidates),
+        ('completed', reached(completed)),
+        ('feedback', reached(with_feedback))
+    ]
+    funnel = []
+    previous = None
+    for stage, count in stages:
+        funnel.append({
+            'stage': stage,
+            'candidates': count,
+            'conversion_rate': round(count / previous, 4) if previous else None
+        })
+        previous = count
+    return funnel
+
+
+def compute_organization_analytics(columns):
+    counts = status_counts(columns)
+    return {
+        'stats': {
+            'total_interviews': len(columns),
+            'completed_interviews': counts['completed'],
+            'scheduled_interviews': counts['scheduled'],
+            'cancelled_interviews': counts['cancelled']
+        },
+        'interviewer_performance': interviewer_performance(columns),
+        'candidate_status': candidate_status(columns),
+        'funnel': candidate_funnel(columns)
+    }
+
+
+def _epoch_to_datetime64(seconds):
+    missing = np.isnan(seconds)
+    values = np.where(missing, 0, np.round(seconds * 1e6)).astype(np.int64).astype('datetime64[us]')
+    values[missing] = np.datetime64('NaT')
+    return values
+
+
+def export_dataset(columns, dataset):
+    """Return the dataset as {column name: array}, ready for CSV or Arrow."""
+    if dataset == 'interviewer_performance':
+        return interviewer_performance_arrays(columns)
+
+    return {
+        'interviewer_id': np.array(columns.interviewers, dtype=object)[columns.interviewer_codes],
+        'interviewee_id': np.array(columns.interviewees, dtype=object)[columns.interviewee_codes],
+        'status': np.array(STATUSES, dtype=object)[columns.status_codes],
+        'scheduled_at': _epoch_to_datetime64(columns.scheduled_at),
+        'feedback_at': _epoch_to_datetime64(columns.feedback_at)
+    }
+
+
+def _csv_column(values):
+    if np.issubdtype(values.dtype, np.datetime64):
+        text = np.datetime_as_string(values, unit='s', timezone='UTC').astype(object)
+        text[np.isnat(values)] = ''
+        return text.tolist()
+    if np.issubdtype(values.dtype, np.floating):
+        return ['' if np.isnan(v) else v for v in np.round(values, 4).tolist()]
+    return ['' if v is None else v for v in values.tolist()]
+
+
+def to_csv(table, rows_per_chunk=10000):
+    """Yield the table as CSV text in chunks, for a streamed response."""
+    names = list(table)
+    columns = [_csv_column(table[name]) for name in names]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    rows = zip(*columns)
+    while True:
+        chunk = [row for _, row in zip(range(rows_per_chunk), rows)]
+        if not chunk:
+            break
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def to_arrow_bytes(table, format):
+    """Serialize the table as an Arrow IPC file or Parquet; needs pyarrow."""
+    arrow_table = pyarrow.table({
+        name: pyarrow.array(values, from_pandas=True) for name, values in table.items()
+    })
+    sink = io.BytesIO()
+    if format == 'parquet':
+        pyarrow.parquet.write_table(arrow_table, sink)
+    else:
+        with pyarrow.ipc.new_file(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+    return sink.getvalue()
@@ -0,0 +1,93 @@
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+from flask import current_app, g, jsonify
+
+from app import supabase
+
+# exact runs count(*); planned reads the planner's row estimate; estimated is
+# exact up to PostgREST's max-rows and planned beyond it
+COUNT_METHODS = ['exact', 'planned', 'estimated']
+DEFAULT_COUNT_METHOD = 'exact'
+
+# Group counts run concurrently; the pool is shared by all requests in the worker
+COUNT_WORKERS = int(os.getenv('COUNT_WORKERS', '8'))
+
+_executor = ThreadPoolExecutor(max_workers=COUNT_WORKERS, thread_name_prefix='counts')
+
+
+def parse_count_request(args, method, groups):
+    """Return (count method, group column) when the request only wants totals, else (None, None).
+
+    A HEAD request, or a GET with ?count=, asks for totals. `groups` maps each
+    column that ?group_by= accepts to its possible values. Raises ValueError on
+    bad input.
+    """
+    count = args.get('count')
+    if count is None and method != 'HEAD':
+        return None, None
+    count = count or DEFAULT_COUNT_METHOD
+    if count not in COUNT_METHODS:
+        raise ValueError(f"count must be one of {', '.join(COUNT_METHODS)}")
+
+    group_by = args.get('group_by')
+    if group_by is not None and group_by not in groups:
+        raise ValueError(f"group_by must be one of {', '.join(groups)}")
+    return count, group_by
+
+
+def count_rows(table, count, apply_filters=None):
+    """Number of rows of table matching the filters, counted by the database; no rows are sent back."""
+    query = supabase.table(table).select('id', count=count)
+    if apply_filters is not None:
+        query = apply_filters(query)
+    # PostgREST answers limit=0 with an empty list and the total in Content-Range
+    return query.limit(0).execute().count or 0
+
+
+def _count_in_context(app, deadline, table, count, apply_filters):
+    # Pool threads have no app context of their own, so each count runs in one
+    # carrying the request's deadline for the resilience layer to enforce
+    with app.app_context():
+        g.deadline = deadline
+        return count_rows(table, count, apply_filters)
+
+
+def count_groups(table, count, column, values, apply_filters=None):
+    """Counts per value of column, one zero-row query per value, all in flight at once.
+
+    PostgREST cannot group, and a GROUP BY function could not take the
+    endpoint's filters or honour planned counts, so the queries are kept
+    separate and only their round-trips overlap.
+    """
+    def filtered(value):
+        def apply(query):
+            query = apply_filters(query) if apply_filters is not None else query
+            return query.eq(column, value)
+        return apply
+
+    app = current_app._get_current_object()
+    deadline = g.get('deadline')
+    futures = {value: _executor.submit(_count_in_context, app, deadline, table, count, filtered(value))
+               for value in values}
+    return {value: future.result() for value, future in futures.items()}
+
+
+def count_response(count, total, groups=None):
+    """Totals as JSON and as headers, so a HEAD request gets them without a body."""
+    data = {'count': total, 'count_method': count}
+    if groups is not None:
+        data['groups'] = groups
+    response = jsonify({"status": "success", "data": data})
+    response.headers['Content-Range'] = f"*/{total}"
+    response.headers['X-Total-Count'] = str(total)
+    if groups is not None:
+        response.headers['X-Group-Counts'] = ','.join(f"{value}={number}" for value, number in groups.items())
+    return response
+
+
+def respond_with_counts(table, count, group_by, groups, apply_filters=None):
+    if group_by is None:
+        return count_response(count, count_rows(table, count, apply_filters))
+    counts = count_groups(table, count, group_by, groups[group_by], apply_filters)
+    return count_response(count, sum(counts.values()), counts)
@@ -0,0 +1,256 @@
+
+from flask import request, g
+import gc
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+
+# Start tracemalloc when the worker boots; 0 leaves it off until an admin turns it on
+MEMORY_TRACE_FRAMES = int(os.getenv('MEMORY_TRACE_FRAMES', '0'))
+# Shared by the workers of one host, outside the source tree
+MEMORY_SNAPSHOT_DIR = os.getenv('MEMORY_SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'hirevantage-memory'))
+MEMORY_MAX_SNAPSHOTS = int(os.getenv('MEMORY_MAX_SNAPSHOTS', '10'))
+# How often each worker publishes its stats for the other workers to report
+MEMORY_REPORT_SECONDS = float(os.getenv('MEMORY_REPORT_SECONDS', '30'))
+MEMORY_TOP_N = 25
+
+SNAPSHOT_ID_PATTERN = re.compile(r'^\d+-[0-9a-f]{12}$')
+GROUP_BY = ['lineno', 'filename', 'traceback']
+# Allocations made by the tracing machinery itself are noise
+IGNORED_FRAMES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+]
+
+_started_at = time.time()
+_lock = threading.Lock()
+_endpoint_peaks = {}
+_last_report = 0.0
+
+
+def _proc_status():
+    # Linux only; other platforms fall back to getrusage for the peak
+    values = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('VmRSS', 'VmHWM'):
+                    values[name] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return values
+
+
+def process_memory(count_objects=False):
+    status = _proc_status()
+    peak = status.get('VmHWM')
+    if peak is None:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    stats = {
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - _started_at, 1),
+        'rss_bytes': status.get('VmRSS'),
+        'peak_rss_bytes': peak,
+        'python_allocated_blocks': sys.getallocatedblocks(),
+        'gc_counts': gc.get_count(),
+        'tracing': tracemalloc.is_tracing()
+    }
+    if count_objects:
+        # Walks every tracked object, so only on demand
+        stats['gc_objects'] = len(gc.get_objects())
+    if tracemalloc.is_tracing():
+        current, traced_peak = tracemalloc.get_traced_memory()
+        stats.update({
+            'traced_bytes': current,
+            'traced_peak_bytes': traced_peak,
+            'trace_frames': tracemalloc.get_traceback_limit(),
+            'tracemalloc_overhead_bytes': tracemalloc.get_tracemalloc_memory()
+        })
+    return stats
+
+
+def endpoint_peaks():
+    with _lock:
+        peaks = [{'endpoint': endpoint, **stats} for endpoint, stats in _endpoint_peaks.items()]
+    for entry in peaks:
+        entry['mean_peak_bytes'] = entry.pop('total_peak_bytes') // entry['requests']
+    return sorted(peaks, key=lambda entry: entry['max_peak_bytes'], reverse=True)
+
+
+def set_tracing(enabled, frames=1):
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+        with _lock:
+            _endpoint_peaks.clear()
+
+
+def _stat_entry(stat, group_by):
+    frames = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    entry = {
+        'location': frames[0] if frames else None,
+        'size_bytes': stat.size,
+        'count': stat.count
+    }
+    if group_by == 'traceback':
+        entry['traceback'] = frames
+    if hasattr(stat, 'size_diff'):
+        entry['size_diff_bytes'] = stat.size_diff
+        entry['count_diff'] = stat.count_diff
+    return entry
+
+
+def _snapshot_path(snapshot_id):
+    return os.path.join(MEMORY_SNAPSHOT_DIR, f"{snapshot_id}.snap")
+
+
+def _prune_snapshots():
+    # Keep the newest snapshots of this worker only; other workers prune their own
+    prefix = f"{os.getpid()}-"
+    own = sorted(
+        (entry for entry in os.scandir(MEMORY_SNAPSHOT_DIR) if entry.name.startswith(prefix) and entry.name.endswith('.snap')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in own[:max(0, len(own) - MEMORY_MAX_SNAPSHOTS)]:
+        os.remove(entry.path)
+
+
+def take_snapshot(group_by='lineno', top=MEMORY_TOP_N):
+    """Dump a tracemalloc snapshot for this worker and return its id and top allocation sites."""
+    snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED_FRAMES)
+    snapshot_id = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+    os.makedirs(MEMORY_SNAPSHOT_DIR, exist_ok=True)
+    snapshot.dump(_snapshot_path(snapshot_id))
+    _prune_snapshots()
+    return {'id': snapshot_id, **summarize_snapshot(snapshot, group_by, top)}
+
+
+def load_snapshot(snapshot_id):
+    if not SNAPSHOT_ID_PATTERN.match(snapshot_id) or not os.path.isfile(_snapshot_path(snapshot_id)):
+        return None
+    return tracemalloc.Snapshot.load(_snapshot_path(snapshot_id))
+
+
+def list_snapshots():
+    if not os.path.isdir(MEMORY_SNAPSHOT_DIR):
+        return []
+    snapshots = [
+        {
+            'id': entry.name[:-len('.snap')],
+            'pid': int(entry.name.split('-')[0]),
+            'file_bytes': entry.stat().st_size,
+            'created_at': entry.stat().st_mtime
+        }
+        for entry in os.scandir(MEMORY_SNAPSHOT_DIR) if entry.name.endswith('.snap')
+    ]
+    return sorted(snapshots, key=lambda snapshot: snapshot['created_at'], reverse=True)
+
+
+def summarize_snapshot(snapshot, group_by='lineno', top=MEMORY_TOP_N):
+    stats = snapshot.statistics(group_by)
+    return {
+        'total_bytes': sum(stat.size for stat in stats),
+        'top': [_stat_entry(stat, group_by) for stat in stats[:top]]
+    }
+
+
+def diff_snapshots(old, new, group_by='lineno', top=MEMORY_TOP_N):
+    """Allocation sites that grew the most between two snapshots of the same worker."""
+    stats = new.compare_to(old, group_by)
+    return {
+        'size_diff_bytes': sum(stat.size_diff for stat in stats),
+        'top': [_stat_entry(stat, group_by) for stat in stats[:top]]
+    }
+
+
+def _worker_report_path(pid):
+    return os.path.join(MEMORY_SNAPSHOT_DIR, 'workers', f"{pid}.json")
+
+
+def publish_worker_stats(force=False):
+    """Write this worker's stats where the other workers can read them; at most every MEMORY_REPORT_SECONDS."""
+    global _last_report
+    now = time.monotonic()
+    with _lock:
+        if not force and now - _last_report < MEMORY_REPORT_SECONDS:
+            return
+        _last_report = now
+    report = {**process_memory(), 'reported_at': time.time(), 'endpoints': endpoint_peaks()[:MEMORY_TOP_N]}
+    path = _worker_report_path(os.getpid())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A temporary file per thread, so a forced publish racing the periodic one cannot tear the report
+    temporary = f"{path}.{threading.get_ident()}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(report, f)
+    os.replace(temporary, path)
+
+
+def worker_reports():
+    """Last published stats of every live worker."""
+    directory = os.path.join(MEMORY_SNAPSHOT_DIR, 'workers')
+    if not os.path.isdir(directory):
+        return []
+    reports = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith('.json') or not entry.name[:-len('.json')].isdigit():
+            continue
+        pid = int(entry.name[:-len('.json')])
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            continue
+        except PermissionError:
+            pass
+        # The worker may exit, or its file be replaced, between the listing and the read
+        try:
+            with open(entry.path) as f:
+                reports.append(json.load(f))
+        except (FileNotFoundError, ValueError):
+            continue
+    return sorted(reports, key=lambda report: report['pid'])
+
+
+def init_memory_diagnostics(app):
+    if MEMORY_TRACE_FRAMES:
+        set_tracing(True, MEMORY_TRACE_FRAMES)
+
+    @app.before_request
+    def start_peak_tracking():
+        if tracemalloc.is_tracing():
+            # The traced peak is process-wide, so with threaded workers a request's
+            # peak also includes whatever concurrent requests allocated
+            g.memory_baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+    @app.after_request
+    def record_peak(response):
+        baseline = g.pop('memory_baseline', None)
+        if baseline is not None and tracemalloc.is_tracing():
+            peak = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+            endpoint = request.endpoint or 'unmatched'
+            with _lock:
+                stats = _endpoint_peaks.setdefault(endpoint, {'requests': 0, 'max_peak_bytes': 0, 'total_peak_bytes': 0})
+                stats['requests'] += 1
+                stats['total_peak_bytes'] += peak
+                stats['max_peak_bytes'] = max(stats['max_peak_bytes'], peak)
+                stats['last_peak_bytes'] = peak
+        try:
+            publish_worker_stats()
+        except OSError as e:
+            app.logger.error("Error publishing memory stats: %s", e)
+        return response
@@ -0,0 +1,231 @@
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+import os
+import re
+import time
+
+from app import supabase
+from utils.timestamps import parse_timestamp
+
+# Most pending mock interviews matched per run, and how far ahead a run looks
+MATCHING_BATCH_LIMIT = int(os.getenv('MATCHING_BATCH_LIMIT', '5000'))
+MATCHING_HORIZON_DAYS = int(os.getenv('MATCHING_HORIZON_DAYS', '30'))
+# Load cap per interviewer per (UTC) day
+MATCHING_MAX_PER_DAY = int(os.getenv('MATCHING_MAX_PER_DAY', '6'))
+MATCHING_PAGE_SIZE = 1000
+ASSIGNMENT_CHUNK_SIZE = 500
+DEFAULT_DURATION_MINUTES = 60
+
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(h|hrs?|hours?|m|mins?|minutes?)?', re.IGNORECASE)
+
+
+def parse_duration_minutes(value):
+    """Minutes in a duration such as 60, '45', '45 min', '1 hour', '1.5 hours' or '1h30m'; None if unreadable."""
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+    parts = DURATION_PATTERN.findall(str(value or ''))
+    if not parts:
+        return None
+    minutes = sum(float(number) * (60 if unit.lower().startswith('h') else 1) for number, unit in parts)
+    return int(round(minutes)) if minutes > 0 else None
+
+
+def parse_skills(value):
+    """Normalized skills from a list or a 'Python, React' style string."""
+    items = value if isinstance(value, (list, tuple)) else re.split(r'[,/;]', value or '')
+    return {item.strip().lower() for item in items if item and item.strip()}
+
+
+def _epoch(value):
+    return parse_timestamp(value).timestamp()
+
+
+def _day(epoch):
+    return int(epoch // 86400)
+
+
+class MatchingEngine:
+    """Assigns mock interviews to interviewers who have the skills and a free slot.
+
+    Interviewers are indexed by skill, and each one's availability windows and
+    bookings are kept as sorted interval lists, so checking whether someone can
+    take a slot is a couple of binary searches. Requests are matched greedily,
+    most constrained first (fewest skilled interviewers, then earliest), and
+    each goes to the eligible interviewer with the lightest load.
+    """
+
+    def __init__(self, interviewers, windows, bookings, max_per_day=MATCHING_MAX_PER_DAY):
+        self.max_per_day = max_per_day
+        self._by_skill = defaultdict(set)
+        for interviewer in interviewers:
+            for skill in parse_skills(interviewer.get('skills')):
+                self._by_skill[skill].add(interviewer['id'])
+
+        # Merge each interviewer's windows so one window covers any free span
+        spans = defaultdict(list)
+        for window in windows:
+            spans[window['interviewer_id']].append((_epoch(window['starts_at']), _epoch(window['ends_at'])))
+        self._window_starts, self._window_ends = {}, {}
+        for interviewer_id, intervals in spans.items():
+            merged = []
+            for start, end in sorted(intervals):
+                if merged and start <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            self._window_starts[interviewer_id] = [start for start, _ in merged]
+            self._window_ends[interviewer_id] = [end for _, end in merged]
+
+        self._booked = defaultdict(list)
+        self._load = Counter()
+        self._daily = Counter()
+        for booking in bookings:
+            start = _epoch(booking['date_time'])
+            minutes = parse_duration_minutes(booking.get('duration')) or DEFAULT_DURATION_MINUTES
+            self._book(booking['interviewer_id'], start, start + minutes * 60)
+
+    def candidates(self, skills):
+        """Interviewers with every one of the skills."""
+        if not skills:
+            return set()
+        sets = sorted((self._by_skill.get(skill, set()) for skill in skills), key=len)
+        return set(sets[0]).intersection(*sets[1:])
+
+    def _available(self, interviewer_id, start, end):
+        starts = self._window_starts.get(interviewer_id)
+        if not starts:
+            return False
+        index = bisect_right(starts, start) - 1
+        return index >= 0 and self._window_ends[interviewer_id][index] >= end
+
+    def _free(self, interviewer_id, start, end):
+        booked = self._booked[interviewer_id]
+        index = bisect_left(booked, (start, end))
+        if index > 0 and booked[index - 1][1] > start:
+            return False
+        return index == len(booked) or booked[index][0] >= end
+
+    def _book(self, interviewer_id, start, end):
+        insort(self._booked[interviewer_id], (start, end))
+        self._load[interviewer_id] += 1
+        self._daily[(interviewer_id, _day(start))] += 1
+
+    def match(self, requests):
+        """Return (assignments, unmatched) for the given pending mock interviews."""
+        unmatched = []
+        prepared = []
+        for mock_interview in requests:
+            minutes = parse_duration_minutes(mock_interview.get('duration'))
+            if minutes is None:
+                unmatched.append({'mock_interview_id': mock_interview['id'], 'reason': 'invalid_duration'})
+                continue
+            candidates = self.candidates(parse_skills(mock_interview.get('technology')))
+            if not candidates:
+                unmatched.append({'mock_interview_id': mock_interview['id'], 'reason': 'no_skilled_interviewer'})
+                continue
+            start = _epoch(mock_interview['date_time'])
+            prepared.append((len(candidates), start, start + minutes * 60, mock_interview, candidates))
+
+        prepared.sort(key=lambda entry: (entry[0], entry[1], entry[3]['id']))
+        assignments = []
+        for _, start, end, mock_interview, candidates in prepared:
+            day = _day(start)
+            best = None
+            for interviewer_id in candidates:
+                if self._daily[(interviewer_id, day)] >= self.max_per_day:
+                    continue
+                if not self._available(interviewer_id, start, end) or not self._free(interviewer_id, start, end):
+                    continue
+                rank = (self._load[interviewer_id], self._daily[(interviewer_id, day)], interviewer_id)
+                if best is None or rank < best:
+                    best = rank
+            if best is None:
+                unmatched.append({'mock_interview_id': mock_interview['id'], 'reason': 'no_availability'})
+                continue
+            interviewer_id = best[2]
+            self._book(interviewer_id, start, end)
+            assignments.append({
+                'mock_interview_id': mock_interview['id'],
+                'interviewer_id': interviewer_id,
+                'date_time': mock_interview['date_time']
+            })
+        return assignments, unmatched
+
+
+def _fetch_all(build_query):
+    rows = []
+    while True:
+        page = build_query().range(len(rows), len(rows) + MATCHING_PAGE_SIZE).execute().data
+        rows.extend(page)
+        if len(page) < MATCHING_PAGE_SIZE:
+            return rows
+
+
+def load_pending(start, end, limit=MATCHING_BATCH_LIMIT):
+    pending = []
+    while len(pending) < limit:
+        page_size = min(MATCHING_PAGE_SIZE, limit - len(pending))
+        page = supabase.table('mock_interviews').select('id,interviewee_id,technology,duration,date_time') \
+            .is_('interviewer_id', 'null').eq('status', 'scheduled') \
+            .gte('date_time', start.isoformat()).lt('date_time', end.isoformat()) \
+            .order('date_time,id').range(len(pending), len(pending) + page_size).execute().data
+        pending.extend(page)
+        if len(page) < page_size:
+            break
+    return pending
+
+
+def build_engine(start, end):
+    interviewers = [
+        interviewer for interviewer in _fetch_all(
+            lambda: supabase.table('interviewers').select('id,skills,availability_status').order('id')
+        )
+        if interviewer.get('skills') and interviewer.get('availability_status') != 'busy'
+    ]
+    windows = _fetch_all(
+        lambda: supabase.table('interviewer_availability').select('interviewer_id,starts_at,ends_at')
+            .gt('ends_at', start.isoformat()).lt('starts_at', end.isoformat()).order('id')
+    )
+    # Bookings that started up to a day before the horizon can still overlap it
+    bookings = _fetch_all(
+        lambda: supabase.table('mock_interviews').select('interviewer_id,duration,date_time')
+            .not_.is_('interviewer_id', 'null').eq('status', 'scheduled')
+            .gte('date_time', (start - timedelta(days=1)).isoformat()).lt('date_time', end.isoformat())
+            .order('id')
+    )
+    return MatchingEngine(interviewers, windows, bookings)
+
+
+def run_matching(dry_run=False, limit=MATCHING_BATCH_LIMIT, start=None, end=None):
+    """Match pending mock interviews in [start, end) and, unless dry_run, store the assignments."""
+    now = datetime.now(timezone.utc)
+    start = max(start or now, now)
+    end = end or start + timedelta(days=MATCHING_HORIZON_DAYS)
+
+    pending = load_pending(start, end, limit)
+    engine = build_engine(start, end)
+
+    started = time.perf_counter()
+    assignments, unmatched = engine.match(pending)
+    match_seconds = time.perf_counter() - started
+
+    applied = 0
+    if not dry_run:
+        for index in range(0, len(assignments), ASSIGNMENT_CHUNK_SIZE):
+            chunk = assignments[index:index + ASSIGNMENT_CHUNK_SIZE]
+            applied += len(supabase.rpc('assign_mock_interviews', {'p_assignments': chunk}).execute().data)
+
+    return {
+        'dry_run': dry_run,
+        'window': {'from': start.isoformat(), 'to': end.isoformat()},
+        'pending': len(pending),
+        'matched': len(assignments),
+        # Lower than matched when some mock interviews changed while matching
+        'applied': applied,
+        'unmatched': dict(Counter(entry['reason'] for entry in unmatched)),
+        'match_seconds': round(match_seconds, 4),
+        'assignments': assignments,
+        'unmatched_requests': unmatched
+    }
@@ -0,0 +1,221 @@
+
+from datetime import datetime, timedelta, timezone
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+
+from app import supabase, logger
+
+# Read notifications older than this are moved out of the hot table
+NOTIFICATION_READ_TTL_DAYS = int(os.getenv('NOTIFICATION_READ_TTL_DAYS', '90'))
+# 'table' moves rows into notifications_archive, 'files' writes gzipped JSON lines locally
+NOTIFICATION_ARCHIVE_TARGET = os.getenv('NOTIFICATION_ARCHIVE_TARGET', 'table')
+NOTIFICATION_ARCHIVE_DIR = os.getenv('NOTIFICATION_ARCHIVE_DIR', 'archive/notifications')
+NOTIFICATION_ARCHIVE_BATCH_SIZE = int(os.getenv('NOTIFICATION_ARCHIVE_BATCH_SIZE', '1000'))
+# Archived notifications older than this are dropped by compaction; 0 keeps them forever
+NOTIFICATION_ARCHIVE_RETENTION_DAYS = int(os.getenv('NOTIFICATION_ARCHIVE_RETENTION_DAYS', '730'))
+
+_run_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+retention_metrics = {
+    'running': False,
+    'target': NOTIFICATION_ARCHIVE_TARGET,
+    'archive': {},
+    'compaction': {}
+}
+
+
+def _update_metrics(section, **values):
+    with _metrics_lock:
+        retention_metrics[section].update(values)
+
+
+def _start_metrics(section, **values):
+    with _metrics_lock:
+        retention_metrics[section] = {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'finished_at': None,
+            'error': None,
+            **values
+        }
+
+
+def get_retention_metrics():
+    with _metrics_lock:
+        return json.loads(json.dumps(retention_metrics))
+
+
+def _archive_chunk_to_table(cutoff, batch_size):
+    response = supabase.rpc('archive_notifications', {
+        'p_cutoff': cutoff.isoformat(),
+        'p_batch_size': batch_size
+    }).execute()
+    return response.data[0]['moved_count'] if response.data else 0
+
+
+def _archive_chunk_to_files(cutoff, batch_size):
+    response = supabase.table('notifications').select('*') \
+        .eq('status', 'read').lt('date', cutoff.isoformat()) \
+        .order('date').limit(batch_size).execute()
+    rows = response.data or []
+    if not rows:
+        return 0
+
+    # Rows are only deleted once they are safely on disk
+    os.makedirs(NOTIFICATION_ARCHIVE_DIR, exist_ok=True)
+    chunk_name = f"chunk-{time.time_ns()}.jsonl.gz"
+    path = os.path.join(NOTIFICATION_ARCHIVE_DIR, chunk_name)
+    with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+    os.replace(path + '.tmp', path)
+
+    ids = [row['id'] for row in rows]
+    supabase.table('notifications').delete(returning='minimal').in_('id', ids).execute()
+    return len(rows)
+
+
+def archive_notifications(now=None, max_batches=None):
+    """Move read notifications older than the TTL out of the hot table in chunks."""
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=NOTIFICATION_READ_TTL_DAYS)
+    archive_chunk = _archive_chunk_to_files if NOTIFICATION_ARCHIVE_TARGET == 'files' else _archive_chunk_to_table
+
+    _start_metrics('archive', cutoff=cutoff.isoformat(), batches=0, rows_archived=0, rows_per_second=0.0)
+    started = time.monotonic()
+    batches = 0
+    rows_archived = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            moved = archive_chunk(cutoff, NOTIFICATION_ARCHIVE_BATCH_SIZE)
+            if moved == 0:
+                break
+
+            batches += 1
+            rows_archived += moved
+            elapsed = time.monotonic() - started
+            _update_metrics(
+                'archive',
+                batches=batches,
+                rows_archived=rows_archived,
+                rows_per_second=round(rows_archived / elapsed, 1) if elapsed else 0.0
+            )
+            if moved < NOTIFICATION_ARCHIVE_BATCH_SIZE:
+                break
+    except Exception as e:
+        logger.error("Error archiving notifications: %s", e)
+        _update_metrics('archive', error=str(e))
+        raise
+    finally:
+        _update_metrics('archive', finished_at=datetime.now(timezone.utc).isoformat())
+
+    return rows_archived
+
+
+def _compact_files(archive_cutoff):
+    # Fold chunk files into one file per month; gzip members can simply be appended
+    chunk_paths = sorted(glob.glob(os.path.join(NOTIFICATION_ARCHIVE_DIR, 'chunk-*.jsonl.gz')))
+    _update_metrics('compaction', chunks_total=len(chunk_paths), chunks_compacted=0, rows_compacted=0, files_dropped=[])
+
+    rows_compacted = 0
+    for index, chunk_path in enumerate(chunk_paths, start=1):
+        by_month = {}
+        with gzip.open(chunk_path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                by_month.setdefault(row['date'][:7], []).append(line)
+
+        for month, lines in by_month.items():
+            month_path = os.path.join(NOTIFICATION_ARCHIVE_DIR, f"notifications-{month}.jsonl.gz")
+            with gzip.open(month_path, 'at', encoding='utf-8') as f:
+                f.writelines(lines)
+            rows_compacted += len(lines)
+
+        os.remove(chunk_path)
+        _update_metrics('compaction', chunks_compacted=index, rows_compacted=rows_compacted)
+
+    dropped = []
+    if archive_cutoff:
+        for month_path in glob.glob(os.path.join(NOTIFICATION_ARCHIVE_DIR, 'notifications-*.jsonl.gz')):
+            month = os.path.basename(month_path)[len('notifications-'):-len('.jsonl.gz')]
+            month_end = (datetime.strptime(month, '%Y-%m') + timedelta(days=32)).replace(day=1).date()
+            if month_end <= archive_cutoff:
+                os.remove(month_path)
+                dropped.append(os.path.basename(month_path))
+    _update_metrics('compaction', files_dropped=dropped)
+
+
+def _compact_table(archive_cutoff):
+    dropped = []
+    if archive_cutoff:
+        response = supabase.rpc('drop_notification_archive_partitions', {
+            'p_before': archive_cutoff.isoformat()
+        }).execute()
+        dropped = [row['dropped_partition'] for row in response.data or []]
+    _update_metrics('compaction', partitions_dropped=dropped)
+
+
+def compact_archive(now=None):
+    """Merge archive chunks and drop archived months past the archive retention."""
+    now = now or datetime.now(timezone.utc)
+    archive_cutoff = None
+    if NOTIFICATION_ARCHIVE_RETENTION_DAYS:
+        archive_cutoff = (now - timedelta(days=NOTIFICATION_ARCHIVE_RETENTION_DAYS)).date()
+
+    _start_metrics('compaction', archive_cutoff=archive_cutoff.isoformat() if archive_cutoff else None)
+    try:
+        if NOTIFICATION_ARCHIVE_TARGET == 'files':
+            _compact_files(archive_cutoff)
+        else:
+            _compact_table(archive_cutoff)
+    except Exception as e:
+        logger.error("Error compacting notification archive: %s", e)
+        _update_metrics('compaction', error=str(e))
+        raise
+    finally:
+        _update_metrics('compaction', finished_at=datetime.now(timezone.utc).isoformat())
+
+
+def _run_holding_lock(max_batches):
+    # The caller has acquired _run_lock; it is released here once the run ends
+    try:
+        with _metrics_lock:
+            retention_metrics['running'] = True
+        archive_notifications(max_batches=max_batches)
+        compact_archive()
+    finally:
+        with _metrics_lock:
+            retention_metrics['running'] = False
+        _run_lock.release()
+
+
+def run_retention(max_batches=None):
+    """Archive then compact; returns False if another run is already in progress."""
+    if not _run_lock.acquire(blocking=False):
+        return False
+    _run_holding_lock(max_batches)
+    return True
+
+
+def start_retention_run(max_batches=None):
+    """Run retention on a background thread; returns False if a run is already in progress."""
+    # Taken here rather than in the thread, so two concurrent callers cannot both start a run
+    if not _run_lock.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            _run_holding_lock(max_batches)
+        except Exception:
+            # Already logged and recorded in the metrics
+            pass
+
+    try:
+        threading.Thread(target=run, name='notification-retention', daemon=True).start()
+    except Exception:
+        _run_lock.release()
+        raise
+    return True
@@ -0,0 +1,283 @@
+
+from collections import Counter
+from flask import request, g, jsonify
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+
+from utils.auth_middleware import get_token_user
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'true').lower() == 'true'
+# Fraction of all requests profiled with the sampling profiler and stored, e.g. 0.01
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '200'))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.005'))
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '25'))
+
+# Where the time went, matched on the file a frame belongs to, in priority order
+CATEGORIES = [
+    ('bcrypt', ('/bcrypt/',)),
+    ('json_encoding', ('/json/', '/flask/json/')),
+    ('supabase_io', ('/postgrest/', '/supabase/', '/httpx/', '/httpcore/', '/h11/', '/h2/', '/ssl.py', '/socket.py', '/selectors.py')),
+    ('handler', ('/routes/', '/utils/'))
+]
+
+
+# cProfile takes over from whatever profiler is active, silently before Python 3.12,
+# which corrupts both profiles; so only one runs per process
+_cprofile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def categorize(filename):
+    filename = filename.replace('\\', '/')
+    for category, patterns in CATEGORIES:
+        if any(pattern in filename for pattern in patterns):
+            return category
+    return 'framework'
+
+
+def _function_label(filename, lineno, name):
+    return f"{os.path.basename(filename)}:{lineno}({name})"
+
+
+class DeterministicProfiler:
+    """cProfile for the request thread; exact call counts, higher overhead."""
+
+    kind = 'cprofile'
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+        self._running = False
+
+    def start(self):
+        if not _cprofile_lock.acquire(blocking=False):
+            raise ProfilerBusy("Another request is already being profiled in this worker")
+        try:
+            self._profile.enable()
+        except Exception:
+            _cprofile_lock.release()
+            raise
+        self._running = True
+
+    def stop(self):
+        if self._running:
+            self._profile.disable()
+            self._running = False
+            _cprofile_lock.release()
+
+    def report(self):
+        stats = pstats.Stats(self._profile)
+        split = Counter()
+        functions = []
+        for (filename, lineno, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            split[categorize(filename)] += tottime
+            functions.append({
+                'function': _function_label(filename, lineno, name),
+                'calls': ncalls,
+                'self_seconds': round(tottime, 6),
+                'cumulative_seconds': round(cumtime, 6)
+            })
+        functions.sort(key=lambda f: f['cumulative_seconds'], reverse=True)
+        return {
+            'time_split_seconds': {category: round(seconds, 6) for category, seconds in split.items()},
+            'top_functions': functions[:PROFILE_TOP_N]
+        }
+
+    def dump(self, path):
+        self._profile.dump_stats(path)
+
+
+class SamplingProfiler:
+    """Samples the request thread's stack from a helper thread; cheap enough to leave on."""
+
+    kind = 'sampling'
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+        self.samples = 0
+        self._self_counts = Counter()
+        self._cumulative_counts = Counter()
+        self._split = Counter()
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+
+            # The innermost frame that matches a category decides where the sample goes,
+            # so a socket read under postgrest counts as Supabase I/O, not handler code
+            category = None
+            seen = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                label = _function_label(code.co_filename, code.co_firstlineno, code.co_name)
+                if leaf:
+                    self._self_counts[label] += 1
+                    leaf = False
+                if label not in seen:
+                    self._cumulative_counts[label] += 1
+                    seen.add(label)
+                if category is None:
+                    frame_category = categorize(code.co_filename)
+                    if frame_category != 'framework':
+                        category = frame_category
+                frame = frame.f_back
+            self._split[category or 'framework'] += 1
+
+    def report(self):
+        functions = [
+            {
+                'function': label,
+                'self_seconds': round(self._self_counts[label] * self.interval, 6),
+                'cumulative_seconds': round(count * self.interval, 6)
+            }
+            for label, count in self._cumulative_counts.most_common(PROFILE_TOP_N)
+        ]
+        return {
+            'samples': self.samples,
+            'sample_interval_seconds': self.interval,
+            'time_split_seconds': {
+                category: round(count * self.interval, 6) for category, count in self._split.items()
+            },
+            'top_functions': functions
+        }
+
+    def dump(self, path):
+        pass
+
+
+def _prune_profiles():
+    reports = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.json')),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in reports[:max(0, len(reports) - PROFILE_MAX_FILES)]:
+        profile_id = entry.name[:-len('.json')]
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def store_profile(profile_id, profiler, report):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), 'w') as f:
+        json.dump(report, f, indent=2)
+    profiler.dump(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+    _prune_profiles()
+
+
+def _requested_profile():
+    # Header or query flag: 1/store keeps the profile on disk, download returns it instead
+    # of the response; the mode picks the profiler (cprofile by default, or sample)
+    flag = request.headers.get('X-Profile') or request.args.get('profile')
+    if not flag:
+        return None
+
+    user = get_token_user()
+    if not user or user['role'] != 'admin':
+        return None
+
+    options = set(flag.lower().split(','))
+    return {
+        'download': 'download' in options,
+        'profiler': SamplingProfiler if 'sample' in options else DeterministicProfiler
+    }
+
+
+def init_profiling(app):
+    @app.before_request
+    def start_profiling():
+        if not PROFILING_ENABLED or request.method == 'OPTIONS':
+            return None
+
+        requested = _requested_profile()
+        if requested:
+            profiler = requested['profiler']()
+            download = requested['download']
+        elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            profiler = SamplingProfiler()
+            download = False
+        else:
+            return None
+
+        try:
+            profiler.start()
+        except (ProfilerBusy, ValueError):
+            # ValueError: a profiler outside this module (e.g. a debugger) is active, on Python 3.12+
+            if requested:
+                return jsonify({"status": "error", "message": "Another profile is already running in this worker"}), 409
+            return None
+
+        g.profile = {
+            'id': uuid.uuid4().hex,
+            'profiler': profiler,
+            'download': download,
+            'started': time.perf_counter()
+        }
+
+    @app.after_request
+    def finish_profiling(response):
+        profile = g.pop('profile', None)
+        if not profile:
+            return response
+
+        profiler = profile['profiler']
+        profiler.stop()
+        report = {
+            'id': profile['id'],
+            'profiler': profiler.kind,
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status_code': response.status_code,
+            'wall_seconds': round(time.perf_counter() - profile['started'], 6),
+            **profiler.report()
+        }
+
+        try:
+            store_profile(profile['id'], profiler, report)
+        except OSError as e:
+            app.logger.error("Error storing profile %s: %s", profile['id'], e)
+
+        if profile['download']:
+            download = jsonify(report)
+            download.headers['Content-Disposition'] = f"attachment; filename=profile-{profile['id']}.json"
+            return download
+
+        response.headers['X-Profile-Id'] = profile['id']
+        return response
+
+    @app.teardown_request
+    def abandon_profiling(exc=None):
+        # after_request is skipped when the handler raised
+        profile = g.pop('profile', None)
+        if profile:
+            profile['profiler'].stop()
@@ -0,0 +1,250 @@
+
+from functools import wraps
+from flask import request, jsonify, g
+import math
+import os
+import sqlite3
+import threading
+import time
+
+# Rate limiting is on by default; set RATE_LIMIT_ENABLED=false to disable it
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+# 'memory' keeps buckets per worker, any other value is a SQLite file path shared by all workers
+RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', 'memory')
+# Only trust X-Forwarded-For when running behind a known reverse proxy
+RATE_LIMIT_TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', 'false').lower() == 'true'
+
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '8'))
+ADMISSION_MAX_PUBLIC_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_PUBLIC_IN_FLIGHT', '3'))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '1'))
+
+_PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400
+}
+
+
+def parse_rate(rate):
+    """Parse a rate such as '5/minute' into (capacity, tokens per second)."""
+    count, _, period = rate.partition('/')
+    seconds = _PERIODS[period.strip().rstrip('s')]
+    capacity = int(count)
+    return capacity, capacity / seconds
+
+
+class MemoryBucketStore:
+    """Token buckets kept in this worker's memory."""
+
+    SWEEP_EVERY = 1024
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def consume(self, limits, cost=1, now=None):
+        # limits is a list of (key, capacity, refill_rate); tokens are only taken
+        # when every bucket can pay, so a rejected request costs nothing
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+
+            states = []
+            retry_after = 0.0
+            for key, capacity, refill_rate in limits:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated) * refill_rate)
+                if tokens < cost:
+                    retry_after = max(retry_after, (cost - tokens) / refill_rate)
+                states.append((key, tokens))
+
+            allowed = retry_after == 0.0
+            for key, tokens in states:
+                self._buckets[key] = (tokens - cost if allowed else tokens, now)
+            return allowed, retry_after
+
+    def _sweep(self, now):
+        # Buckets untouched for an hour are full again and can be forgotten
+        stale = [key for key, (_, updated) in self._buckets.items() if now - updated > 3600]
+        for key in stale:
+            del self._buckets[key]
+
+
+class SQLiteBucketStore:
+    """Token buckets in a local SQLite file so gunicorn workers share budgets."""
+
+    SWEEP_EVERY = 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS rate_limit_buckets '
+            '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def consume(self, limits, cost=1, now=None):
+        # Wall clock time, since monotonic clocks are not comparable across processes
+        now = now if now is not None else time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._calls += 1
+            if self._calls % self.SWEEP_EVERY == 0:
+                conn.execute('DELETE FROM rate_limit_buckets WHERE updated < ?', (now - 3600,))
+
+            states = []
+            retry_after = 0.0
+            for key, capacity, refill_rate in limits:
+                row = conn.execute(
+                    'SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?', (key,)
+                ).fetchone()
+                tokens, updated = row if row else (capacity, now)
+                tokens = min(capacity, tokens + max(0.0, now - updated) * refill_rate)
+                if tokens < cost:
+                    retry_after = max(retry_after, (cost - tokens) / refill_rate)
+                states.append((key, tokens))
+
+            allowed = retry_after == 0.0
+            conn.executemany(
+                'INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                [(key, tokens - cost if allowed else tokens, now) for key, tokens in states]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+
+def _create_store():
+    if RATE_LIMIT_STORE == 'memory':
+        return MemoryBucketStore()
+    return SQLiteBucketStore(RATE_LIMIT_STORE)
+
+
+bucket_store = _create_store()
+
+
+def get_client_ip():
+    if RATE_LIMIT_TRUST_PROXY and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or 'unknown'
+
+
+def too_many_requests(retry_after, message='Too many requests, please try again later'):
+    response = jsonify({"status": "error", "message": message})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, int(math.ceil(retry_after))))
+    return response
+
+
+def rate_limit(per_ip=None, per_route=None):
+    """Token-bucket limit for a public endpoint, e.g. @rate_limit(per_ip='5/minute', per_route='100/minute').
+
+    The per-IP budget stops a single client from hammering the route, while the
+    per-route budget caps the total work the route may cause across all clients.
+    """
+    ip_limit = parse_rate(per_ip) if per_ip else None
+    route_limit = parse_rate(per_route) if per_route else None
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED or request.method == 'OPTIONS':
+                return f(*args, **kwargs)
+
+            route = request.endpoint
+            limits = []
+            if ip_limit:
+                limits.append((f"ip:{get_client_ip()}:{route}",) + ip_limit)
+            if route_limit:
+                limits.append((f"route:{route}",) + route_limit)
+
+            allowed, retry_after = bucket_store.consume(limits)
+            if not allowed:
+                return too_many_requests(retry_after)
+
+            return f(*args, **kwargs)
+
+        # Lets admission control tell public endpoints apart from authenticated ones
+        decorated.public_endpoint = True
+        return decorated
+
+    return decorator
+
+
+class AdmissionController:
+    """Caps concurrent requests per worker, with a smaller share for public endpoints.
+
+    Public traffic can only ever occupy max_public slots, so the remaining capacity
+    stays available to authenticated users while the public endpoints are under abuse.
+    """
+
+    def __init__(self, max_in_flight, max_public_in_flight):
+        self.max_in_flight = max_in_flight
+        self.max_public_in_flight = min(max_public_in_flight, max_in_flight)
+        self.in_flight = 0
+        self.public_in_flight = 0
+        self.shed_count = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, public):
+        with self._lock:
+            if self.in_flight >= self.max_in_flight or (public and self.public_in_flight >= self.max_public_in_flight):
+                self.shed_count += 1
+                return False
+            self.in_flight += 1
+            if public:
+                self.public_in_flight += 1
+            return True
+
+    def release(self, public):
+        with self._lock:
+            self.in_flight -= 1
+            if public:
+                self.public_in_flight -= 1
+
+
+admission_controller = AdmissionController(ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_PUBLIC_IN_FLIGHT)
+
+
+def release_admission():
+    """Give the current request's slot back early, e.g. while it only waits on sub-requests holding their own."""
+    if 'admission_public' in g:
+        admission_controller.release(g.pop('admission_public'))
+
+
+def init_admission_control(app):
+    @app.before_request
+    def admit_request():
+        # Batch sub-requests are admitted like any other request, so a batch
+        # cannot run more handlers, or more public ones, than the caps allow
+        if request.method == 'OPTIONS':
+            return None
+
+        view = app.view_functions.get(request.endpoint)
+        public = getattr(view, 'public_endpoint', False)
+        if not admission_controller.try_acquire(public):
+            return too_many_requests(ADMISSION_RETRY_AFTER, 'Server is busy, please try again later')
+
+        g.admission_public = public
+
+    @app.teardown_request
+    def release_request(exc=None):
+        release_admission()
@@ -0,0 +1,323 @@
+
+from datetime import datetime, timedelta, timezone
+import os
+import sys
+import threading
+import time
+
+from app import supabase, logger
+from utils.timestamps import parse_timestamp
+
+SNAPSHOT_ENABLED = os.getenv('SNAPSHOT_ENABLED', 'true').lower() == 'true'
+# How often each worker asks for rows changed since its high-water mark
+SNAPSHOT_POLL_SECONDS = float(os.getenv('SNAPSHOT_POLL_SECONDS', '5'))
+# A snapshot that has not been refreshed for this long is bypassed until it catches up
+SNAPSHOT_MAX_STALENESS_SECONDS = float(os.getenv('SNAPSHOT_MAX_STALENESS_SECONDS', '30'))
+# updated_at is a transaction's start time, so a long transaction can commit rows older
+# than ones already seen; each poll re-reads this much before its high-water mark
+SNAPSHOT_POLL_OVERLAP_SECONDS = float(os.getenv('SNAPSHOT_POLL_OVERLAP_SECONDS', '60'))
+# Full reloads as a safety net for anything polling missed
+SNAPSHOT_RELOAD_SECONDS = float(os.getenv('SNAPSHOT_RELOAD_SECONDS', '300'))
+SNAPSHOT_PAGE_SIZE = int(os.getenv('SNAPSHOT_PAGE_SIZE', '1000'))
+
+# Only columns that rarely change are kept; counters stay in the database
+SNAPSHOT_TABLES = {
+    'organizations': {
+        'table': 'organizations',
+        'columns': ['id', 'user_id', 'name', 'updated_at'],
+        'indexes': ['user_id']
+    },
+    'interviewers': {
+        'table': 'interviewers',
+        'columns': ['id', 'user_id', 'updated_at'],
+        'indexes': ['user_id']
+    },
+    'interviewees': {
+        'table': 'interviewees',
+        'columns': ['id', 'user_id', 'updated_at'],
+        'indexes': ['user_id']
+    },
+    'admins': {
+        'table': 'admins',
+        'columns': ['id', 'user_id', 'updated_at'],
+        'indexes': ['user_id']
+    },
+    'admin_users': {
+        'table': 'users',
+        'columns': ['id', 'name', 'email', 'role', 'updated_at'],
+        'indexes': [],
+        'filters': {'role': 'admin'}
+    }
+}
+
+
+def _deep_size(value):
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_deep_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class TableSnapshot:
+    """One table held in memory as tuples keyed by id, with unique secondary indexes.
+
+    Rows outside the table's filters are dropped when a change brings them in,
+    so e.g. a demoted admin leaves the admin list on the next poll. Deleted rows
+    are dropped from the tombstones the reference_deletions table keeps.
+    """
+
+    def __init__(self, name, table, columns, indexes, filters=None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.indexes = indexes
+        self.filters = filters or {}
+        self._positions = {column: position for position, column in enumerate(columns)}
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._index = {column: {} for column in indexes}
+        self.high_water = None
+        self.deletions_high_water = None
+        self.loaded_at = None
+        self.refreshed_at = None
+        self.metrics = {'loads': 0, 'polls': 0, 'changes': 0, 'deletions': 0, 'hits': 0, 'misses': 0, 'stale_reads': 0}
+
+    def _query(self):
+        query = supabase.table(self.table).select(','.join(self.columns))
+        for column, value in self.filters.items():
+            query = query.eq(column, value)
+        return query
+
+    def _matches(self, row):
+        return all(row.get(column) == value for column, value in self.filters.items())
+
+    def _to_dict(self, values):
+        return dict(zip(self.columns, values))
+
+    def _put(self, rows, index, row):
+        values = tuple(row.get(column) for column in self.columns)
+        previous = rows.get(row['id'])
+        if previous is not None:
+            for column in self.indexes:
+                index[column].pop(previous[self._positions[column]], None)
+        rows[row['id']] = values
+        for column in self.indexes:
+            if row.get(column) is not None:
+                index[column][row[column]] = row['id']
+
+    def _remove(self, rows, index, row_id):
+        previous = rows.pop(row_id, None)
+        if previous is not None:
+            for column in self.indexes:
+                index[column].pop(previous[self._positions[column]], None)
+
+    def _advance_high_water(self, rows):
+        for row in rows:
+            if row.get('updated_at'):
+                updated_at = parse_timestamp(row['updated_at'])
+                if self.high_water is None or updated_at > self.high_water:
+                    self.high_water = updated_at
+
+    def load(self):
+        """Reload the whole table and swap it in at once."""
+        rows, index = {}, {column: {} for column in self.indexes}
+        started = datetime.now(timezone.utc)
+        start = 0
+        while True:
+            page = self._query().order('id').range(start, start + SNAPSHOT_PAGE_SIZE).execute().data
+            for row in page:
+                self._put(rows, index, row)
+            self._advance_high_water(page)
+            if len(page) < SNAPSHOT_PAGE_SIZE:
+                break
+            start += SNAPSHOT_PAGE_SIZE
+
+        with self._lock:
+            self._rows, self._index = rows, index
+            # Rows changed or deleted while the load was paging are picked up by the next poll
+            self.high_water = min(self.high_water or started, started)
+            self.deletions_high_water = started
+            self.loaded_at = self.refreshed_at = time.monotonic()
+            self.metrics['loads'] += 1
+
+    def _overlapped(self, high_water):
+        return high_water - timedelta(seconds=SNAPSHOT_POLL_OVERLAP_SECONDS) if high_water else None
+
+    def _poll_pages(self, build_query, time_column, since, apply):
+        # Pages by time from `since`, which rows seen again simply re-apply; returns the newest time seen
+        newest = since
+        while True:
+            query = build_query()
+            if since is not None:
+                # gte rather than gt: rows sharing the mark's timestamp may have been missed
+                query = query.gte(time_column, since.isoformat())
+            page = query.order(time_column).limit(SNAPSHOT_PAGE_SIZE).execute().data
+            apply(page)
+            times = [parse_timestamp(row[time_column]) for row in page if row.get(time_column)]
+            last = max(times) if times else since
+            if last is not None and (newest is None or last > newest):
+                newest = last
+            if len(page) < SNAPSHOT_PAGE_SIZE or last == since:
+                return newest
+            since = last
+
+    def poll(self):
+        """Apply rows changed or deleted since the high-water marks."""
+        def apply_changes(page):
+            with self._lock:
+                for row in page:
+                    if self._matches(row):
+                        self._put(self._rows, self._index, row)
+                    else:
+                        self._remove(self._rows, self._index, row['id'])
+                self.metrics['changes'] += len(page)
+
+        def apply_deletions(page):
+            with self._lock:
+                for row in page:
+                    self._remove(self._rows, self._index, row['row_id'])
+                self.metrics['deletions'] += len(page)
+
+        # Without the filters, so rows that stopped matching are seen and dropped
+        newest = self._poll_pages(
+            lambda: supabase.table(self.table).select(','.join(self.columns)),
+            'updated_at', self._overlapped(self.high_water), apply_changes
+        )
+        newest_deletion = self._poll_pages(
+            lambda: supabase.table('reference_deletions').select('row_id,deleted_at').eq('table_name', self.table),
+            'deleted_at', self._overlapped(self.deletions_high_water), apply_deletions
+        )
+
+        with self._lock:
+            self.high_water = max(filter(None, [self.high_water, newest]), default=None)
+            self.deletions_high_water = max(filter(None, [self.deletions_high_water, newest_deletion]), default=None)
+            self.refreshed_at = time.monotonic()
+            self.metrics['polls'] += 1
+
+    def record(self, row):
+        """Add a row this worker just read from or wrote to the database."""
+        if all(column in row for column in self.columns) and self._matches(row):
+            with self._lock:
+                self._put(self._rows, self._index, row)
+
+    def is_fresh(self):
+        return self.refreshed_at is not None and \
+            time.monotonic() - self.refreshed_at <= SNAPSHOT_MAX_STALENESS_SECONDS
+
+    def get(self, column, value):
+        """Return the row whose column equals value, or None when it is not in the snapshot."""
+        if column == 'id':
+            values = self._rows.get(value)
+        else:
+            row_id = self._index[column].get(value)
+            values = self._rows.get(row_id) if row_id is not None else None
+        return self._to_dict(values) if values is not None else None
+
+    def all(self):
+        return [self._to_dict(values) for values in list(self._rows.values())]
+
+    def stats(self):
+        with self._lock:
+            rows = list(self._rows.values())
+            index_sizes = {column: len(entries) for column, entries in self._index.items()}
+            memory = sys.getsizeof(self._rows) + sum(_deep_size(values) for values in rows) + \
+                sum(sys.getsizeof(entries) for entries in self._index.values())
+        now = time.monotonic()
+        return {
+            'rows': len(rows),
+            'indexes': index_sizes,
+            'memory_bytes': memory,
+            'fresh': self.is_fresh(),
+            'seconds_since_refresh': round(now - self.refreshed_at, 3) if self.refreshed_at else None,
+            'seconds_since_load': round(now - self.loaded_at, 3) if self.loaded_at else None,
+            'high_water': self.high_water.isoformat() if self.high_water else None,
+            'deletions_high_water': self.deletions_high_water.isoformat() if self.deletions_high_water else None,
+            **self.metrics
+        }
+
+
+class ReferenceSnapshot:
+    """Per-worker copies of the small reference tables behind role and ownership checks.
+
+    Lookups are served from memory while the table is fresh. A miss, or any read
+    while the snapshot is stale or still loading, goes to the database, so a
+    snapshot can only make a lookup faster, never wrong for longer than the
+    staleness bound.
+    """
+
+    def __init__(self, tables=SNAPSHOT_TABLES):
+        self.tables = {name: TableSnapshot(name, **config) for name, config in tables.items()}
+        self._stop = threading.Event()
+
+    def lookup(self, name, column, value):
+        """Return the row of table `name` whose `column` equals value, or None."""
+        snapshot = self.tables[name]
+        if snapshot.is_fresh():
+            row = snapshot.get(column, value)
+            if row is not None:
+                snapshot.metrics['hits'] += 1
+                return row
+            snapshot.metrics['misses'] += 1
+        else:
+            snapshot.metrics['stale_reads'] += 1
+
+        # Not trusted to be absent: new rows appear in the snapshot only after a poll
+        response = snapshot._query().eq(column, value).limit(1).execute()
+        if not response.data:
+            return None
+        snapshot.record(response.data[0])
+        return response.data[0]
+
+    def rows(self, name):
+        """Return every row of table `name`."""
+        snapshot = self.tables[name]
+        if snapshot.is_fresh():
+            snapshot.metrics['hits'] += 1
+            return snapshot.all()
+        snapshot.metrics['stale_reads'] += 1
+        return snapshot._query().execute().data
+
+    def refresh(self, reload=False):
+        for snapshot in self.tables.values():
+            try:
+                if reload or snapshot.loaded_at is None:
+                    snapshot.load()
+                else:
+                    snapshot.poll()
+            except Exception as e:
+                logger.error("Error refreshing %s snapshot: %s", snapshot.name, e)
+
+    def run(self):
+        self.refresh(reload=True)
+        last_reload = time.monotonic()
+        while not self._stop.wait(SNAPSHOT_POLL_SECONDS):
+            reload = time.monotonic() - last_reload >= SNAPSHOT_RELOAD_SECONDS
+            self.refresh(reload=reload)
+            if reload:
+                last_reload = time.monotonic()
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name='reference-snapshot', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        tables = {name: snapshot.stats() for name, snapshot in self.tables.items()}
+        return {
+            'enabled': SNAPSHOT_ENABLED,
+            'max_staleness_seconds': SNAPSHOT_MAX_STALENESS_SECONDS,
+            'memory_bytes': sum(table['memory_bytes'] for table in tables.values()),
+            'tables': tables
+        }
+
+
+reference_snapshot = ReferenceSnapshot()
+
+
+def init_reference_snapshot(app):
+    # Each worker process loads its own copy in the background; until the first
+    # load finishes every lookup simply goes to the database
+    if SNAPSHOT_ENABLED:
+        reference_snapshot.start()
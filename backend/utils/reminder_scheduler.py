@@ -0,0 +1,287 @@
+
+from datetime import datetime, timedelta, timezone
+import click
+import os
+import threading
+import time
+
+from app import supabase, logger
+from utils.timer_wheel import TimerWheel
+from utils.timestamps import parse_timestamp
+
+# Run the scheduler inside the web process; with several gunicorn workers prefer
+# a single dedicated process started with `flask reminders run`
+REMINDER_SCHEDULER_ENABLED = os.getenv('REMINDER_SCHEDULER_ENABLED', 'false').lower() == 'true'
+# How long before a booking each reminder goes out
+REMINDER_OFFSETS_MINUTES = [int(m) for m in os.getenv('REMINDER_OFFSETS_MINUTES', '1440,60').split(',') if m]
+REMINDER_TICK_SECONDS = float(os.getenv('REMINDER_TICK_SECONDS', '5'))
+# How often changed bookings are picked up and the loaded window is extended
+REMINDER_POLL_SECONDS = float(os.getenv('REMINDER_POLL_SECONDS', '60'))
+# Each poll re-reads this far before the newest change seen: updated_at is the
+# transaction's start time, so a long transaction can commit rows older than the mark
+REMINDER_POLL_OVERLAP_SECONDS = float(os.getenv('REMINDER_POLL_OVERLAP_SECONDS', '60'))
+REMINDER_PAGE_SIZE = int(os.getenv('REMINDER_PAGE_SIZE', '1000'))
+
+# Booking tables and who gets reminded for each
+BOOKING_TYPES = {
+    'interview': {
+        'table': 'interviews_schedule',
+        'time_column': 'scheduled_at',
+        'owner_table': 'interviewers',
+        'owner_column': 'interviewer_id',
+        'label': 'interview'
+    },
+    'mock_interview': {
+        'table': 'mock_interviews',
+        'time_column': 'date_time',
+        'owner_table': 'interviewees',
+        'owner_column': 'interviewee_id',
+        'label': 'mock interview'
+    }
+}
+
+
+def _parse_time(value):
+    return parse_timestamp(value).astimezone(timezone.utc)
+
+
+def _describe_offset(minutes):
+    if minutes % 1440 == 0:
+        days = minutes // 1440
+        return f"{days} day{'s' if days != 1 else ''}"
+    if minutes % 60 == 0:
+        hours = minutes // 60
+        return f"{hours} hour{'s' if hours != 1 else ''}"
+    return f"{minutes} minutes"
+
+
+class ReminderScheduler:
+    """Keeps upcoming bookings' reminders in a timer wheel and delivers them in batches.
+
+    Only bookings inside the lookahead window are loaded, by an indexed range query
+    on the booking time that is extended slice by slice as time passes. Bookings
+    created or changed after that are picked up from the create/update handlers in
+    this process, and from an updated_at high-water mark for the other workers.
+    """
+
+    def __init__(self, offsets=REMINDER_OFFSETS_MINUTES, tick=REMINDER_TICK_SECONDS):
+        self.offsets = sorted(set(offsets), reverse=True)
+        self.wheel = TimerWheel(tick=tick, start=time.time())
+        self.lookahead = timedelta(minutes=max(self.offsets), seconds=REMINDER_POLL_SECONDS * 2)
+        self._lock = threading.Lock()
+        self._booking_keys = {}
+        self._loaded_until = None
+        self._high_water = {}
+        self._stop = threading.Event()
+        self.metrics = {
+            'pending_reminders': 0,
+            'bookings_loaded': 0,
+            'changes_applied': 0,
+            'reminders_due': 0,
+            'reminders_sent': 0,
+            'reminders_skipped': 0,
+            'last_tick': None,
+            'last_error': None
+        }
+
+    def booking_changed(self, booking_type, booking):
+        """(Re)schedule the reminders for one booking row, or drop them if it is no longer upcoming."""
+        booking_id = booking['id']
+        with self._lock:
+            for key in self._booking_keys.pop((booking_type, booking_id), []):
+                self.wheel.cancel(key)
+
+            status = (booking.get('status') or '').lower()
+            booking_time = booking.get(BOOKING_TYPES[booking_type]['time_column'])
+            if status != 'scheduled' or not booking_time:
+                return
+
+            starts_at = _parse_time(booking_time)
+            now = time.time()
+            keys = []
+            for offset in self.offsets:
+                fire_at = starts_at.timestamp() - offset * 60
+                if fire_at <= now:
+                    continue
+                key = (booking_type, booking_id, offset)
+                self.wheel.schedule(key, fire_at, {
+                    'booking_type': booking_type,
+                    'booking_id': booking_id,
+                    'owner_id': booking.get(BOOKING_TYPES[booking_type]['owner_column']),
+                    'offset_minutes': offset,
+                    'scheduled_for': starts_at.isoformat()
+                })
+                keys.append(key)
+            if keys:
+                self._booking_keys[(booking_type, booking_id)] = keys
+            self.metrics['pending_reminders'] = len(self.wheel)
+
+    def _pages(self, build_query, page_column):
+        # Offset paging is fine here: each window is small and ordered by an indexed column,
+        # with id breaking ties so rows sharing a time are not split across pages
+        start = 0
+        while True:
+            rows = build_query().order(f'{page_column},id').range(start, start + REMINDER_PAGE_SIZE).execute().data
+            yield rows
+            if len(rows) < REMINDER_PAGE_SIZE:
+                return
+            start += REMINDER_PAGE_SIZE
+
+    def _load(self, booking_type, build_query, page_column):
+        loaded = 0
+        for rows in self._pages(build_query, page_column):
+            for row in rows:
+                self.booking_changed(booking_type, row)
+            loaded += len(rows)
+        return loaded
+
+    def extend_window(self, now):
+        """Load bookings whose time has just come within the lookahead window."""
+        window_start = self._loaded_until or now
+        window_end = now + self.lookahead
+        if window_end <= window_start:
+            return
+
+        for booking_type, config in BOOKING_TYPES.items():
+            table, time_column = config['table'], config['time_column']
+            self.metrics['bookings_loaded'] += self._load(
+                booking_type,
+                lambda: supabase.table(table).select('*')
+                    .gte(time_column, window_start.isoformat())
+                    .lt(time_column, window_end.isoformat()),
+                time_column
+            )
+        self._loaded_until = window_end
+
+    def poll_changes(self, now):
+        """Apply bookings created or changed by other processes since the last poll.
+
+        Rows inside the overlap are read again; booking_changed replaces their
+        reminders, so that is harmless.
+        """
+        overlap = timedelta(seconds=REMINDER_POLL_OVERLAP_SECONDS)
+        for booking_type, config in BOOKING_TYPES.items():
+            table = config['table']
+            high_water = self._high_water.get(booking_type, now)
+            since = (high_water - overlap).isoformat()
+            for rows in self._pages(lambda: supabase.table(table).select('*').gte('updated_at', since), 'updated_at'):
+                for row in rows:
+                    self.booking_changed(booking_type, row)
+                    high_water = max(high_water, _parse_time(row['updated_at']))
+                self.metrics['changes_applied'] += len(rows)
+            self._high_water[booking_type] = high_water
+
+    def deliver(self, due):
+        """Claim due reminders in reminder_deliveries, then notify for the ones this call claimed.
+
+        A reminder is claimed before its notification is sent and never claimed twice,
+        so delivery is at most once even with several schedulers running.
+        """
+        self.metrics['reminders_due'] += len(due)
+        claims = [{
+            'booking_type': payload['booking_type'],
+            'booking_id': payload['booking_id'],
+            'offset_minutes': payload['offset_minutes'],
+            'scheduled_for': payload['scheduled_for']
+        } for _, payload in due]
+        claimed = supabase.table('reminder_deliveries').upsert(
+            claims,
+            ignore_duplicates=True,
+            on_conflict='booking_type,booking_id,offset_minutes,scheduled_for'
+        ).execute().data
+        claimed_keys = {(c['booking_type'], c['booking_id'], c['offset_minutes']) for c in claimed}
+        payloads = [p for _, p in due if (p['booking_type'], p['booking_id'], p['offset_minutes']) in claimed_keys]
+        self.metrics['reminders_skipped'] += len(due) - len(payloads)
+
+        # Resolve the recipients' user ids with one query per booking type
+        notifications = []
+        for booking_type, config in BOOKING_TYPES.items():
+            typed = [p for p in payloads if p['booking_type'] == booking_type and p['owner_id']]
+            if not typed:
+                continue
+            owners = supabase.table(config['owner_table']).select('id, user_id') \
+                .in_('id', list({p['owner_id'] for p in typed})).execute().data
+            user_ids = {owner['id']: owner['user_id'] for owner in owners}
+            for payload in typed:
+                if payload['owner_id'] not in user_ids:
+                    continue
+                starts_at = _parse_time(payload['scheduled_for']).strftime('%Y-%m-%d %H:%M UTC')
+                notifications.append({
+                    'user_id': user_ids[payload['owner_id']],
+                    'message': f"Reminder: your {config['label']} starts in "
+                               f"{_describe_offset(payload['offset_minutes'])} ({starts_at})"
+                })
+
+        if notifications:
+            supabase.table('notifications').insert(notifications, returning='minimal').execute()
+        self.metrics['reminders_sent'] += len(notifications)
+
+    def run(self):
+        now = datetime.now(timezone.utc)
+        self._high_water = {booking_type: now for booking_type in BOOKING_TYPES}
+        self.extend_window(now)
+        last_poll = time.monotonic()
+
+        while not self._stop.wait(self.wheel.tick):
+            try:
+                if time.monotonic() - last_poll >= REMINDER_POLL_SECONDS:
+                    now = datetime.now(timezone.utc)
+                    self.poll_changes(now)
+                    self.extend_window(now)
+                    last_poll = time.monotonic()
+
+                with self._lock:
+                    due = self.wheel.advance(time.time())
+                    for booking_type, booking_id, offset in (key for key, _ in due):
+                        keys = self._booking_keys.get((booking_type, booking_id))
+                        if keys and (booking_type, booking_id, offset) in keys:
+                            keys.remove((booking_type, booking_id, offset))
+                    self.metrics['pending_reminders'] = len(self.wheel)
+                if due:
+                    self.deliver(due)
+                self.metrics['last_tick'] = datetime.now(timezone.utc).isoformat()
+            except Exception as e:
+                logger.error("Error in reminder scheduler: %s", e)
+                self.metrics['last_error'] = str(e)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name='reminder-scheduler', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+# The scheduler running in this process, if any
+reminder_scheduler = None
+
+
+def notify_booking_changed(booking_type, booking):
+    """Called by the create/update handlers so changes are scheduled without waiting for a poll."""
+    if reminder_scheduler is None or not booking:
+        return
+    try:
+        reminder_scheduler.booking_changed(booking_type, booking)
+    except Exception as e:
+        logger.error("Error scheduling reminders for %s %s: %s", booking_type, booking.get('id'), e)
+
+
+def init_reminder_scheduler(app):
+    global reminder_scheduler
+
+    @app.cli.group('reminders')
+    def reminders_cli():
+        """Interview and mock interview reminders."""
+
+    @reminders_cli.command('run')
+    def run_command():
+        """Run the reminder scheduler in the foreground."""
+        global reminder_scheduler
+        reminder_scheduler = ReminderScheduler()
+        click.echo(f"Sending reminders {REMINDER_OFFSETS_MINUTES} minutes before bookings")
+        reminder_scheduler.run()
+
+    if REMINDER_SCHEDULER_ENABLED:
+        reminder_scheduler = ReminderScheduler()
+        reminder_scheduler.start()
@@ -0,0 +1,205 @@
+
+from functools import wraps
+from flask import request, jsonify
+import json
+import os
+import re
+from utils.timestamps import parse_timestamp
+
+# Hard cap on any request body, checked from Content-Length before anything is read
+REQUEST_MAX_BODY_BYTES = int(os.getenv('REQUEST_MAX_BODY_BYTES', str(1024 * 1024)))
+# Default cap for endpoints with a schema; each schema can set its own
+SCHEMA_MAX_BODY_BYTES = int(os.getenv('SCHEMA_MAX_BODY_BYTES', str(16 * 1024)))
+
+UUID_PATTERN = re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Python types accepted for each kind; bools are only accepted as 'boolean', not as numbers
+KIND_TYPES = {
+    'string': (str,),
+    'uuid': (str,),
+    'email': (str,),
+    'datetime': (str,),
+    'integer': (int,),
+    'number': (int, float),
+    'boolean': (bool,),
+    'object': (dict,),
+    'array': (list,)
+}
+KIND_NAMES = {
+    'string': 'a string',
+    'uuid': 'a UUID',
+    'email': 'an email address',
+    'datetime': 'an ISO 8601 datetime',
+    'integer': 'an integer',
+    'number': 'a number',
+    'boolean': 'true or false',
+    'object': 'an object',
+    'array': 'a list'
+}
+
+
+def _is_datetime(value):
+    try:
+        parse_timestamp(value)
+        return True
+    except ValueError:
+        return False
+
+
+# Format checks applied after the type check for the string kinds
+KIND_CHECKS = {
+    'uuid': UUID_PATTERN.match,
+    'email': EMAIL_PATTERN.match,
+    'datetime': _is_datetime
+}
+
+
+class Field:
+    """One body field. Its checks are compiled into a single function when the schema is built."""
+
+    def __init__(self, kind, required=False, max_length=None, choices=None, minimum=None, maximum=None,
+                 check=None, coerce=None, message=None):
+        self.kinds = kind if isinstance(kind, tuple) else (kind,)
+        self.required = required
+        self.max_length = max_length
+        self.choices = choices
+        self.minimum = minimum
+        self.maximum = maximum
+        self.check = check
+        self.coerce = coerce
+        self.message = message
+
+    def compile(self, name):
+        """Return a function value -> (value, error) that runs only the checks this field needs."""
+        types = tuple({python_type for kind in self.kinds for python_type in KIND_TYPES[kind]})
+        accepts_bool = 'boolean' in self.kinds
+        type_error = f"{name} must be {' or '.join(KIND_NAMES[kind] for kind in self.kinds)}"
+        # A plain 'string' kind accepts any text, so format checks only apply without it
+        format_checks = [] if 'string' in self.kinds else [KIND_CHECKS[kind] for kind in self.kinds if kind in KIND_CHECKS]
+        choices = frozenset(self.choices) if self.choices else None
+        max_length, minimum, maximum = self.max_length, self.minimum, self.maximum
+        check, coerce = self.check, self.coerce
+        message = self.message or f"{name} is invalid"
+        required = self.required
+
+        def validate(value):
+            if not isinstance(value, types) or (isinstance(value, bool) and not accepts_bool):
+                return None, type_error
+            if isinstance(value, str):
+                if required and not value.strip():
+                    return None, f"Missing required field: {name}"
+                if max_length is not None and len(value) > max_length:
+                    return None, f"{name} must be at most {max_length} characters"
+                if format_checks and not any(format_check(value) for format_check in format_checks):
+                    return None, type_error
+            elif isinstance(value, (list, dict)) and max_length is not None and len(value) > max_length:
+                return None, f"{name} must have at most {max_length} items"
+            if choices is not None and value not in choices:
+                return None, f"{name} must be one of {', '.join(sorted(map(str, choices)))}"
+            if minimum is not None and isinstance(value, (int, float)) and value < minimum:
+                return None, f"{name} must be at least {minimum}"
+            if maximum is not None and isinstance(value, (int, float)) and value > maximum:
+                return None, f"{name} must be at most {maximum}"
+            if check is not None and not check(value):
+                return None, message
+            return (coerce(value) if coerce else value), None
+
+        return validate
+
+
+class Schema:
+    """A whitelist of body fields compiled once, when the route module is imported.
+
+    Unknown fields are rejected rather than dropped, so a client sending a
+    misspelt or protected column finds out instead of being silently ignored.
+    With partial=True (updates) nothing is required but at least one field is.
+    `ignored` fields are dropped without an error, for clients that send back
+    whole rows including columns they cannot change.
+    """
+
+    def __init__(self, fields, max_bytes=SCHEMA_MAX_BODY_BYTES, partial=False, ignored=()):
+        self.max_bytes = max_bytes
+        self.partial = partial
+        self.allowed = frozenset(fields)
+        self.ignored = frozenset(ignored)
+        # Required fields may be left out of an update, but never set to null
+        self.not_null = frozenset(name for name, field in fields.items() if field.required)
+        self.required = [] if partial else [name for name, field in fields.items() if field.required]
+        self._validators = {name: field.compile(name) for name, field in fields.items()}
+
+    def validate(self, data):
+        """Return (clean data, list of errors) for a decoded JSON body."""
+        if not isinstance(data, dict):
+            return None, ["Request body must be a JSON object"]
+
+        errors = [f"Missing required field: {name}" for name in self.required if data.get(name) is None]
+        unknown = data.keys() - self.allowed
+        if unknown - self.ignored:
+            errors.append(f"Unknown fields: {', '.join(sorted(map(str, unknown - self.ignored)))}")
+
+        clean = {}
+        for name, value in data.items():
+            if name in unknown:
+                continue
+            if value is None:
+                if name in self.not_null:
+                    if self.partial:
+                        errors.append(f"{name} cannot be null")
+                    continue
+                # An explicit null clears an optional column
+                clean[name] = None
+                continue
+            value, error = self._validators[name](value)
+            if error:
+                errors.append(error)
+            else:
+                clean[name] = value
+        # An update of only ignored fields, or of nothing, would send an empty PATCH
+        if self.partial and not clean and not errors:
+            errors.append("No fields to update")
+        return clean, errors
+
+
+def _error(message, code, errors=None):
+    body = {"status": "error", "message": message}
+    if errors:
+        body["errors"] = errors
+    return jsonify(body), code
+
+
+def validate_body(schema):
+    """Check the JSON body against schema before the handler runs; the handler gets it as `data`.
+
+    Oversized bodies are refused from the Content-Length header before reading
+    them, so junk costs neither a full parse nor a database round-trip.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.content_length is None:
+                return _error("Content-Length is required", 411)
+            if request.content_length > schema.max_bytes:
+                return _error(f"Request body must be at most {schema.max_bytes} bytes", 413)
+            if not request.is_json:
+                return _error("Request body must be JSON", 415)
+
+            try:
+                data = json.loads(request.get_data(cache=True))
+            except (ValueError, RecursionError):
+                return _error("Request body is not valid JSON", 400)
+
+            data, errors = schema.validate(data)
+            if errors:
+                return _error(errors[0], 400, errors)
+            return f(*args, data=data, **kwargs)
+        return decorated
+    return decorator
+
+
+def init_request_limits(app):
+    @app.before_request
+    def reject_oversized_body():
+        # Applies to every route, with or without a schema
+        if request.content_length is not None and request.content_length > REQUEST_MAX_BODY_BYTES:
+            return _error(f"Request body must be at most {REQUEST_MAX_BODY_BYTES} bytes", 413)
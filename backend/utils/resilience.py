@@ -0,0 +1,363 @@
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from json import JSONDecodeError
+from flask import g, has_app_context, request
+import httpx
+import os
+import threading
+import time
+
+from postgrest.base_request_builder import APIResponse
+from postgrest.exceptions import APIError, generate_default_error_message
+from pydantic import ValidationError
+
+# Longest a single Supabase call may take, and the whole request's budget for them
+SUPABASE_CALL_TIMEOUT_SECONDS = float(os.getenv('SUPABASE_CALL_TIMEOUT_SECONDS', '5'))
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '15'))
+# Circuit breaker: trip when at least this many calls in the window failed at this rate
+BREAKER_WINDOW_SECONDS = float(os.getenv('BREAKER_WINDOW_SECONDS', '30'))
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', '20'))
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', '0.5'))
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', '15'))
+# Hedged reads: send a duplicate select when the first is slower than the p95 so far
+HEDGE_READS = os.getenv('HEDGE_READS', 'false').lower() == 'true'
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv('HEDGE_MIN_DELAY_SECONDS', '0.05'))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WORKERS = int(os.getenv('HEDGE_WORKERS', '16'))
+
+# Only reads are safe to send twice
+HEDGED_METHODS = {'GET', 'HEAD'}
+OPERATIONS = {'GET': 'select', 'HEAD': 'count', 'POST': 'insert', 'PATCH': 'update', 'DELETE': 'delete'}
+LATENCY_SAMPLES = 256
+
+
+class UpstreamUnavailable(Exception):
+    """A Supabase call was not made or did not finish in time."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    pass
+
+
+class CircuitOpen(UpstreamUnavailable):
+    pass
+
+
+class _ServerError(Exception):
+    # A 5xx from PostgREST; counts against the breaker, surfaces as the usual APIError
+    def __init__(self, api_error):
+        super().__init__(str(api_error))
+        self.api_error = api_error
+
+
+class CircuitBreaker:
+    """Closed -> open when the failure rate in the window spikes -> half-open after a cooldown.
+
+    While half-open a single probe call is let through; its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._outcomes = deque()
+        self.state = 'closed'
+        self._opened_at = None
+        self._probing = False
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.metrics = {
+            'calls': 0, 'failures': 0, 'timeouts': 0, 'trips': 0, 'rejected': 0,
+            'hedges': 0, 'hedge_wins': 0
+        }
+
+    def _prune(self, now):
+        while self._outcomes and self._outcomes[0][0] < now - BREAKER_WINDOW_SECONDS:
+            self._outcomes.popleft()
+
+    def allow(self):
+        """Return None if the call may go ahead, else the seconds until it may be retried."""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == 'open':
+                remaining = self._opened_at + BREAKER_OPEN_SECONDS - now
+                if remaining > 0:
+                    self.metrics['rejected'] += 1
+                    return remaining
+                self.state = 'half_open'
+            if self.state == 'half_open':
+                if self._probing:
+                    self.metrics['rejected'] += 1
+                    return 1
+                self._probing = True
+            return None
+
+    def record(self, ok, latency=None, timed_out=False):
+        now = time.monotonic()
+        with self._lock:
+            self.metrics['calls'] += 1
+            if not ok:
+                self.metrics['failures'] += 1
+            if timed_out:
+                self.metrics['timeouts'] += 1
+            if ok and latency is not None:
+                self._latencies.append(latency)
+
+            if self.state == 'half_open':
+                self._probing = False
+                self._outcomes.clear()
+                if ok:
+                    self.state = 'closed'
+                else:
+                    self._trip(now)
+                return
+
+            self._outcomes.append((now, ok))
+            self._prune(now)
+            failures = sum(1 for _, outcome in self._outcomes if not outcome)
+            if self.state == 'closed' and len(self._outcomes) >= BREAKER_MIN_CALLS \
+                    and failures / len(self._outcomes) >= BREAKER_FAILURE_RATE:
+                self._trip(now)
+
+    def count(self, metric):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def _trip(self, now):
+        self.state = 'open'
+        self._opened_at = now
+        self.metrics['trips'] += 1
+
+    def latency_percentile(self, percentile):
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+    def stats(self):
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        with self._lock:
+            self._prune(time.monotonic())
+            window = len(self._outcomes)
+            failures = sum(1 for _, outcome in self._outcomes if not outcome)
+            return {
+                'state': self.state,
+                'window_calls': window,
+                'window_failure_rate': round(failures / window, 4) if window else 0.0,
+                'p50_seconds': round(p50, 4) if p50 is not None else None,
+                'p95_seconds': round(p95, 4) if p95 is not None else None,
+                **self.metrics
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='hedge')
+
+
+def get_breaker(name):
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def get_resilience_metrics():
+    return {
+        'call_timeout_seconds': SUPABASE_CALL_TIMEOUT_SECONDS,
+        'request_deadline_seconds': REQUEST_DEADLINE_SECONDS,
+        'hedge_reads': HEDGE_READS,
+        'breakers': {name: breaker.stats() for name, breaker in sorted(_breakers.items())}
+    }
+
+
+def _remaining_budget():
+    """Seconds left for the next call: the per-call timeout, cut short by the request's deadline."""
+    timeout = SUPABASE_CALL_TIMEOUT_SECONDS
+    if has_app_context():
+        deadline = g.get('deadline')
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+    return timeout
+
+
+def _send(builder, timeout):
+    # Same as the builder's execute(), but with a timeout on the HTTP request
+    try:
+        r = builder.session.request(
+            builder.http_method,
+            builder.path,
+            json=builder.json,
+            params=builder.params,
+            headers=builder.headers,
+            timeout=timeout
+        )
+    except httpx.TimeoutException:
+        raise DeadlineExceeded(f"Supabase call timed out after {timeout:.2f}s")
+    try:
+        if 200 <= r.status_code <= 299:
+            return APIResponse.from_http_request_response(r)
+        error = APIError(r.json())
+    except ValidationError:
+        error = APIError(r.json())
+    except JSONDecodeError:
+        error = APIError(generate_default_error_message(r))
+    if r.status_code >= 500:
+        raise _ServerError(error)
+    raise error
+
+
+def _timed_send(builder, timeout):
+    started = time.monotonic()
+    return _send(builder, timeout), time.monotonic() - started
+
+
+def _hedged_send(builder, breaker, timeout):
+    """Send the read, and a duplicate if the first has not answered within the p95; first success wins."""
+    delay = breaker.latency_percentile(95)
+    if delay is None or delay + HEDGE_MIN_DELAY_SECONDS >= timeout:
+        return _timed_send(builder, timeout)
+
+    delay = max(delay, HEDGE_MIN_DELAY_SECONDS)
+    started = time.monotonic()
+    primary = _hedge_executor.submit(_timed_send, builder, timeout)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    breaker.count('hedges')
+    hedge = _hedge_executor.submit(_timed_send, builder, timeout - (time.monotonic() - started))
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            if future is hedge:
+                breaker.count('hedge_wins')
+            return result
+    raise error
+
+
+def execute(builder, name):
+    """Run a postgrest builder under the request deadline, the per-call timeout and the breaker for `name`."""
+    timeout = _remaining_budget()
+    if timeout <= 0:
+        note_upstream_failure(None)
+        raise DeadlineExceeded("Request deadline exceeded before the Supabase call")
+
+    breaker = get_breaker(name)
+    retry_after = breaker.allow()
+    if retry_after is not None:
+        note_upstream_failure(retry_after)
+        raise CircuitOpen(f"Supabase {name} is failing; circuit open", retry_after)
+
+    try:
+        if HEDGE_READS and builder.http_method in HEDGED_METHODS:
+            response, latency = _hedged_send(builder, breaker, timeout)
+        else:
+            response, latency = _timed_send(builder, timeout)
+    except DeadlineExceeded:
+        breaker.record(False, timed_out=True)
+        note_upstream_failure(None)
+        raise
+    except _ServerError as e:
+        breaker.record(False)
+        raise e.api_error
+    except httpx.TransportError as e:
+        breaker.record(False)
+        note_upstream_failure(None)
+        raise UpstreamUnavailable(f"Supabase unreachable: {str(e)}")
+    except APIError:
+        # A 4xx means the request was wrong, not that Supabase is unhealthy
+        breaker.record(True)
+        raise
+    except Exception:
+        breaker.record(False)
+        raise
+
+    breaker.record(True, latency)
+    return response
+
+
+def note_upstream_failure(retry_after):
+    # Lets the after_request hook turn the handler's generic 500 into a 503/504
+    if has_app_context():
+        g.upstream_failure = {'retry_after': retry_after}
+
+
+class _ResilientBuilder:
+    """Wraps a postgrest builder so the final execute() goes through the resilience layer."""
+
+    def __init__(self, builder, name):
+        self._builder = builder
+        self._name = name
+
+    def _wrap(self, value):
+        if hasattr(value, 'execute') and hasattr(value, 'http_method'):
+            return _ResilientBuilder(value, self._name)
+        return value
+
+    def __getattr__(self, attribute):
+        value = getattr(self._builder, attribute)
+        if callable(value) and not hasattr(value, 'execute'):
+            def call(*args, **kwargs):
+                return self._wrap(value(*args, **kwargs))
+            return call
+        return self._wrap(value)
+
+    def execute(self):
+        operation = OPERATIONS.get(self._builder.http_method, self._builder.http_method.lower())
+        return execute(self._builder, f"{self._name}.{operation}")
+
+
+class ResilientClient:
+    """Drop-in wrapper for the Supabase client; everything but table/rpc passes straight through."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, attribute):
+        return getattr(self._client, attribute)
+
+    def table(self, table_name):
+        return _ResilientBuilder(self._client.table(table_name), table_name)
+
+    from_ = table
+
+    def rpc(self, fn, params):
+        return _ResilientBuilder(self._client.rpc(fn, params), f"rpc:{fn}")
+
+
+def init_resilience(app):
+    @app.before_request
+    def set_deadline():
+        # Clients may ask for a tighter budget, never a looser one
+        budget = REQUEST_DEADLINE_SECONDS
+        try:
+            budget = min(budget, float(request.headers.get('X-Request-Timeout', budget)))
+        except ValueError:
+            pass
+        g.deadline = time.monotonic() + budget
+
+    @app.after_request
+    def report_upstream_failure(response):
+        failure = g.pop('upstream_failure', None)
+        if failure and response.status_code == 500:
+            if failure['retry_after'] is not None:
+                response.status_code = 503
+                response.headers['Retry-After'] = str(max(1, int(failure['retry_after'] + 0.999)))
+            else:
+                response.status_code = 504
+        return response
@@ -0,0 +1,111 @@
+
+from flask import g, has_app_context, request
+import threading
+import time
+
+from utils.resilience import REQUEST_DEADLINE_SECONDS, DeadlineExceeded, UpstreamUnavailable, note_upstream_failure
+
+
+def _wait_budget():
+    # A waiter gives up when its own request's deadline passes
+    deadline = g.get('deadline') if has_app_context() else None
+    return REQUEST_DEADLINE_SECONDS if deadline is None else deadline - time.monotonic()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapses identical concurrent calls into one execution whose result every caller gets.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for it instead of running it again, and receive the same
+    result or exception. Nothing is cached: once the call finishes, the next
+    caller for the key runs it afresh. Only for reads whose result is the same
+    for every caller sharing the key.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.metrics = {'executions': 0, 'coalesced': 0, 'errors': 0, 'wait_timeouts': 0}
+
+    def do(self, key, fn):
+        """Return (result, shared), where shared is True if another caller's execution was reused."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.metrics['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.metrics['executions'] += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(max(0.0, _wait_budget())):
+                with self._lock:
+                    self.metrics['wait_timeouts'] += 1
+                note_upstream_failure(None)
+                raise DeadlineExceeded(f"Timed out waiting for a shared {self.name} call")
+            if call.error is not None:
+                if isinstance(call.error, UpstreamUnavailable):
+                    # So this request also answers 503/504 rather than 500
+                    note_upstream_failure(call.error.retry_after)
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.metrics['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'waiting': sum(call.waiters for call in self._calls.values()),
+                **self.metrics
+            }
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name):
+    with _flights_lock:
+        return _flights.setdefault(name, SingleFlight(name))
+
+
+def get_coalescing_metrics():
+    return {name: flight.stats() for name, flight in sorted(_flights.items())}
+
+
+def request_key(scope=None):
+    """Key for the current request: endpoint, path and query parameters, plus the caller's authorization scope.
+
+    Pass a scope whenever the response depends on who is asking beyond the
+    authorization check that already ran, e.g. the user id for per-user data.
+    """
+    return (
+        request.endpoint,
+        tuple(sorted((request.view_args or {}).items())),
+        tuple(sorted(request.args.items(multi=True))),
+        scope
+    )
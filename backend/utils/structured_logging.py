@@ -0,0 +1,247 @@
+
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# 'json' for one JSON object per line, 'text' for a readable line when developing locally
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+# Records waiting for the writer thread; once full, new records are dropped instead of blocking
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Share of DEBUG/INFO records kept per logger, e.g. 'werkzeug=0.1,app=1'; warnings and errors are never sampled
+LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '')
+# Records kept per call site per window; the rest are counted and reported on the next one let through
+LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '100'))
+LOG_RATE_WINDOW_SECONDS = float(os.getenv('LOG_RATE_WINDOW_SECONDS', '60'))
+LOG_MAX_FIELD_LENGTH = int(os.getenv('LOG_MAX_FIELD_LENGTH', '512'))
+LOG_REDACT_FIELDS = os.getenv(
+    'LOG_REDACT_FIELDS',
+    'password,password_hash,token,access_token,refresh_token,secret,authorization,api_key,email,phone'
+)
+
+REQUEST_ID_HEADER = 'X-Request-Id'
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{8,64}$')
+REDACTED = '[REDACTED]'
+MAX_DEPTH = 4
+MAX_ITEMS = 50
+
+REDACT_FIELDS = {field.strip().lower() for field in LOG_REDACT_FIELDS.split(',') if field.strip()}
+# Catches "password': 'x'" or "token=x" inside messages built with f-strings
+REDACT_PATTERN = re.compile(
+    r"""(?i)(['"]?(?:%s)['"]?\s*[:=]\s*)(['"]?)[^'",\s}]+""" % '|'.join(re.escape(field) for field in REDACT_FIELDS)
+) if REDACT_FIELDS else None
+
+# Attributes every LogRecord has; anything else came in through `extra`
+RESERVED_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+CONTEXT_ATTRIBUTES = ['request_id', 'method', 'path', 'suppressed', 'dropped']
+
+
+def _parse_sample_rates(value):
+    rates = {}
+    for entry in value.split(','):
+        name, _, rate = entry.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+def _truncate(text, limit=LOG_MAX_FIELD_LENGTH):
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+def redact(value, depth=0):
+    """A JSON-safe copy of value with sensitive fields masked and long strings and collections cut short."""
+    if isinstance(value, dict):
+        if depth >= MAX_DEPTH:
+            return '{...}'
+        items = list(value.items())
+        result = {
+            str(key): REDACTED if str(key).lower() in REDACT_FIELDS else redact(item, depth + 1)
+            for key, item in items[:MAX_ITEMS]
+        }
+        if len(items) > MAX_ITEMS:
+            result['...'] = f"{len(items) - MAX_ITEMS} more keys"
+        return result
+    if isinstance(value, (list, tuple, set)):
+        if depth >= MAX_DEPTH:
+            return '[...]'
+        items = list(value)
+        result = [redact(item, depth + 1) for item in items[:MAX_ITEMS]]
+        if len(items) > MAX_ITEMS:
+            result.append(f"... {len(items) - MAX_ITEMS} more items")
+        return result
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return redact_text(str(value))
+
+
+def redact_text(text):
+    if REDACT_PATTERN is not None:
+        text = REDACT_PATTERN.sub(lambda match: f"{match.group(1)}{match.group(2)}{REDACTED}", text)
+    return _truncate(text)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request id, method and path, on the thread that logged them."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a share of DEBUG/INFO records per logger and caps how often any one call site can log."""
+
+    def __init__(self, sample_rates=None, rate_limit=LOG_RATE_LIMIT, window=LOG_RATE_WINDOW_SECONDS):
+        super().__init__()
+        self.sample_rates = sample_rates if sample_rates is not None else _parse_sample_rates(LOG_SAMPLE_RATES)
+        self.rate_limit = rate_limit
+        self.window = window
+        self._lock = threading.Lock()
+        # (pathname, lineno) -> [window start, records kept, records suppressed]
+        self._sites = {}
+
+    def _sample_rate(self, name):
+        # The most specific configured logger wins: 'app.routes' falls back to 'app'
+        while name:
+            if name in self.sample_rates:
+                return self.sample_rates[name]
+            name = name.rpartition('.')[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING and random.random() >= self._sample_rate(record.name):
+            return False
+        if not self.rate_limit:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get((record.pathname, record.lineno))
+            if site is None or now - site[0] >= self.window:
+                site = self._sites[(record.pathname, record.lineno)] = [now, 0, site[2] if site else 0]
+            if site[1] >= self.rate_limit:
+                site[2] += 1
+                return False
+            site[1] += 1
+            suppressed, site[2] = site[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without formatting them, and drops them when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self._dropped = 0
+
+    def prepare(self, record):
+        # The queue stays in this process, so the record needs no pickling: message
+        # formatting and JSON encoding are left to the writer thread. Only `extra`
+        # containers are copied, since the caller may keep changing them
+        for name in vars(record).keys() - RESERVED_ATTRIBUTES:
+            value = getattr(record, name)
+            if isinstance(value, (dict, list)):
+                setattr(record, name, value.copy())
+        return record
+
+    def enqueue(self, record):
+        if self._dropped:
+            record.dropped, self._dropped = self._dropped, 0
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._dropped += 1 + getattr(record, 'dropped', 0)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with `extra` fields redacted and truncated."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact_text(record.getMessage()),
+            'source': f"{record.module}:{record.lineno}"
+        }
+        for name in CONTEXT_ATTRIBUTES:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        for name, value in vars(record).items():
+            if name not in RESERVED_ATTRIBUTES and name not in entry:
+                entry[name] = redact(value)
+        if record.exc_info:
+            entry['exception'] = _truncate(self.formatException(record.exc_info), LOG_MAX_FIELD_LENGTH * 8)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        request_id = getattr(record, 'request_id', None)
+        return f"{line} [{request_id}]" if request_id else line
+
+
+_listener = None
+
+
+def configure_logging():
+    """Route all logging through a bounded queue to a single writer thread; replaces logging.basicConfig."""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter())
+    handler.addFilter(RequestContextFilter())
+
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(TextFormatter() if LOG_FORMAT == 'text' else JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued when the worker exits
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+
+
+def init_request_ids(app):
+    @app.before_request
+    def assign_request_id():
+        # Keep the caller's id (e.g. from a proxy) when it looks sane, so logs can be joined up
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = request_id if REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex
+
+    @app.after_request
+    def return_request_id(response):
+        if g.get('request_id'):
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
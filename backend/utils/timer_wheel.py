@@ -0,0 +1,96 @@
+
+import math
+
+
+class TimerWheel:
+    """Hierarchical timer wheel.
+
+    Level 0 has one slot per tick; each higher level's slots span a whole
+    rotation of the level below. Timers are placed on the lowest level whose
+    range covers them and cascade down as time advances, so scheduling,
+    cancelling and firing are O(1) per timer no matter how many are pending.
+    Timers beyond the top level's range wait in an overflow map.
+    """
+
+    def __init__(self, tick=1.0, slots=64, levels=4, start=0.0):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.current_tick = int(start // tick)
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._overflow = {}
+        self._ready = {}
+        # key -> where the timer lives, for O(1) cancel
+        self._locations = {}
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, key):
+        return key in self._locations
+
+    def schedule(self, key, when, payload=None):
+        """Fire payload at time `when`; replaces any timer already scheduled under key."""
+        self.cancel(key)
+        self._insert(key, int(math.ceil(when / self.tick)), payload)
+
+    def cancel(self, key):
+        location = self._locations.pop(key, None)
+        if location is None:
+            return False
+        location.pop(key, None)
+        return True
+
+    def _insert(self, key, expires, payload):
+        delta = expires - self.current_tick
+        if delta <= 0:
+            bucket = self._ready
+        else:
+            bucket = self._overflow
+            for level in range(self.levels):
+                if delta < self.slots ** (level + 1):
+                    slot = (expires // self.slots ** level) % self.slots
+                    bucket = self._wheels[level][slot]
+                    break
+        bucket[key] = (expires, payload)
+        self._locations[key] = bucket
+
+    def _cascade(self, level):
+        slot = (self.current_tick // self.slots ** level) % self.slots
+        bucket = self._wheels[level][slot]
+        self._wheels[level][slot] = {}
+        for key, (expires, payload) in bucket.items():
+            self._insert(key, expires, payload)
+
+    def _pull_overflow(self):
+        overflow = self._overflow
+        self._overflow = {}
+        for key, (expires, payload) in overflow.items():
+            self._insert(key, expires, payload)
+
+    def advance(self, now):
+        """Move the wheel to time `now` and return [(key, payload)] for every timer that fired."""
+        target = int(now // self.tick)
+        while self.current_tick < target:
+            self.current_tick += 1
+
+            # Cascade higher levels whose slot boundary we just crossed, top-down
+            for level in range(self.levels - 1, 0, -1):
+                if self.current_tick % self.slots ** level == 0:
+                    if level == self.levels - 1 and self._overflow:
+                        self._pull_overflow()
+                    self._cascade(level)
+
+            slot = self.current_tick % self.slots
+            bucket = self._wheels[0][slot]
+            if bucket:
+                self._wheels[0][slot] = {}
+                self._ready.update(bucket)
+                for key in bucket:
+                    self._locations[key] = self._ready
+
+        fired = [(key, payload) for key, (_, payload) in self._ready.items()]
+        for key, _ in fired:
+            del self._locations[key]
+        self._ready = {}
+        return fired
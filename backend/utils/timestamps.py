@@ -0,0 +1,14 @@
+
+from datetime import datetime
+import re
+
+# PostgREST trims trailing zeros from fractional seconds, e.g. '10:00:00.12345+00:00'.
+# Before Python 3.11 fromisoformat only accepts 3 or 6 digits, so pad to microseconds
+_FRACTION_PATTERN = re.compile(r'\.(\d+)')
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp as returned by PostgREST, on every supported Python version."""
+    value = value.replace('Z', '+00:00')
+    value = _FRACTION_PATTERN.sub(lambda match: '.' + match.group(1)[:6].ljust(6, '0'), value, count=1)
+    return datetime.fromisoformat(value)
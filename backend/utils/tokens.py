@@ -0,0 +1,33 @@
+
+from datetime import datetime, timedelta, timezone
+import hashlib
+import jwt
+import os
+import secrets
+
+# Access tokens are verified statelessly, so keep them short-lived
+ACCESS_TOKEN_TTL_MINUTES = int(os.getenv('ACCESS_TOKEN_TTL_MINUTES', '15'))
+REFRESH_TOKEN_TTL_DAYS = int(os.getenv('REFRESH_TOKEN_TTL_DAYS', '30'))
+
+
+def create_access_token(user):
+    return jwt.encode({
+        'user_id': user['id'],
+        'email': user['email'],
+        'role': user['role'],
+        'type': 'access',
+        'exp': datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_TTL_MINUTES)
+    }, os.getenv('FLASK_SECRET_KEY'), algorithm='HS256')
+
+
+def hash_refresh_token(token):
+    # Refresh tokens are 256 random bits, so a fast hash is enough (no bcrypt needed)
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def new_refresh_token():
+    """Return (token, token_hash, expires_at) for a new refresh token."""
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_TTL_DAYS)
+    return token, hash_refresh_token(token), expires_at
+
@@ -0,0 +1,30 @@
+-- Batch read-state updates for notifications.
+--
+-- Marks the caller's notifications matching either a list of ids or everything
+-- dated at or before a cursor in a single UPDATE, with ownership enforced in the
+-- predicate, and returns only the number of rows changed.
+
+create index if not exists notifications_user_status_date_idx
+  on public.notifications (user_id, status, date desc);
+
+create or replace function public.mark_notifications_read(
+  p_user_id uuid,
+  p_ids uuid[] default null,
+  p_before timestamptz default null,
+  p_status public.notification_status default 'read'
+)
+returns table (updated_count integer)
+language sql
+as $$
+  with updated as (
+    update public.notifications
+       set status = p_status,
+           updated_at = now()
+     where user_id = p_user_id
+       and status <> p_status
+       and (p_ids is null or id = any (p_ids))
+       and (p_before is null or date <= p_before)
+    returning 1
+  )
+  select count(*)::integer from updated;
+$$;
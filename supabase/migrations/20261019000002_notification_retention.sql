@@ -0,0 +1,120 @@
+-- Notification retention.
+--
+-- Read notifications older than the retention TTL are moved out of the hot
+-- notifications table into notifications_archive, which is range partitioned by
+-- month so whole months can be dropped once they age out of the archive.
+
+create index if not exists notifications_user_date_idx
+  on public.notifications (user_id, date desc);
+
+-- Lets the archiver find the oldest read rows without scanning every user
+create index if not exists notifications_status_date_idx
+  on public.notifications (status, date);
+
+create table if not exists public.notifications_archive (
+  id uuid not null,
+  user_id uuid not null,
+  message text not null,
+  status public.notification_status not null,
+  date timestamptz not null,
+  created_at timestamptz not null,
+  updated_at timestamptz not null,
+  archived_at timestamptz not null default now(),
+  primary key (id, date)
+) partition by range (date);
+
+create index if not exists notifications_archive_user_date_idx
+  on public.notifications_archive (user_id, date desc);
+
+create or replace function public.ensure_notification_archive_partition(p_month date)
+returns void
+language plpgsql
+as $$
+begin
+  execute format(
+    'create table if not exists public.%I partition of public.notifications_archive for values from (%L) to (%L)',
+    'notifications_archive_' || to_char(p_month, 'YYYY_MM'),
+    p_month,
+    (p_month + interval '1 month')::date
+  );
+end;
+$$;
+
+-- Moves one chunk of read notifications dated before p_cutoff, oldest first.
+-- Call repeatedly until it returns 0; skip locked keeps concurrent runs apart.
+create or replace function public.archive_notifications(
+  p_cutoff timestamptz,
+  p_batch_size integer default 1000
+)
+returns table (moved_count integer)
+language plpgsql
+as $$
+declare
+  v_oldest timestamptz;
+  v_month date;
+  v_moved integer;
+begin
+  select min(date) into v_oldest
+    from public.notifications
+   where status = 'read'
+     and date < p_cutoff;
+
+  if v_oldest is null then
+    return query select 0;
+    return;
+  end if;
+
+  v_month := date_trunc('month', v_oldest)::date;
+  while v_month <= date_trunc('month', p_cutoff)::date loop
+    perform public.ensure_notification_archive_partition(v_month);
+    v_month := (v_month + interval '1 month')::date;
+  end loop;
+
+  with batch as (
+    select id
+      from public.notifications
+     where status = 'read'
+       and date < p_cutoff
+     order by date
+     limit p_batch_size
+       for update skip locked
+  ), moved as (
+    delete from public.notifications n
+     using batch
+     where n.id = batch.id
+    returning n.id, n.user_id, n.message, n.status, n.date, n.created_at, n.updated_at
+  ), inserted as (
+    insert into public.notifications_archive (id, user_id, message, status, date, created_at, updated_at)
+    select id, user_id, message, status, date, created_at, updated_at from moved
+    returning 1
+  )
+  select count(*)::integer into v_moved from inserted;
+
+  return query select v_moved;
+end;
+$$;
+
+-- Drops archive partitions whose whole month ends on or before p_before.
+create or replace function public.drop_notification_archive_partitions(p_before date)
+returns table (dropped_partition text)
+language plpgsql
+as $$
+declare
+  r record;
+begin
+  for r in
+    select c.relname
+      from pg_inherits i
+      join pg_class c on c.oid = i.inhrelid
+      join pg_class p on p.oid = i.inhparent
+     where p.relname = 'notifications_archive'
+       and c.relname ~ '^notifications_archive_[0-9]{4}_[0-9]{2}$'
+  loop
+    if to_date(substr(r.relname, 23), 'YYYY_MM') + interval '1 month' <= p_before then
+      execute format('drop table public.%I', r.relname);
+      dropped_partition := r.relname;
+      return next;
+    end if;
+  end loop;
+end;
+$$;
@@ -0,0 +1,84 @@
+-- Single round-trip status transitions.
+--
+-- Each function applies a patch and its side effects in one statement from the
+-- API's point of view. Patches go through jsonb_populate_record over the current
+-- row, so keys that are not listed in the SET clause are ignored.
+
+create or replace function public.update_demo_request(
+  p_id uuid,
+  p_changes jsonb,
+  p_notification_message text default null
+)
+returns setof public.demo_requests
+language plpgsql
+as $$
+declare
+  v_row public.demo_requests;
+begin
+  update public.demo_requests d
+     set (name, email, company_name, message, status, user_id, updated_at) =
+         (select r.name, r.email, r.company_name, r.message, r.status, r.user_id, now()
+            from jsonb_populate_record(d, p_changes) r)
+   where d.id = p_id
+  returning d.* into v_row;
+
+  if not found then
+    return;
+  end if;
+
+  if p_notification_message is not null and v_row.user_id is not null then
+    insert into public.notifications (user_id, message)
+    values (v_row.user_id, p_notification_message);
+  end if;
+
+  return next v_row;
+end;
+$$;
+
+-- p_user_id restricts the update to mock interviews owned by that interviewee
+-- user; pass null for admins. A row with authorized = false means the mock
+-- interview exists but belongs to someone else; no row means it does not exist.
+create or replace function public.update_mock_interview(
+  p_id uuid,
+  p_changes jsonb,
+  p_user_id uuid default null
+)
+returns table (mock_interview jsonb, previous_status public.interview_status, authorized boolean)
+language plpgsql
+as $$
+declare
+  v_old public.mock_interviews;
+  v_new public.mock_interviews;
+begin
+  select * into v_old
+    from public.mock_interviews
+   where id = p_id
+     for update;
+
+  if not found then
+    return;
+  end if;
+
+  if p_user_id is not null and not exists (
+    select 1 from public.interviewees where id = v_old.interviewee_id and user_id = p_user_id
+  ) then
+    return query select null::jsonb, v_old.status, false;
+    return;
+  end if;
+
+  update public.mock_interviews m
+     set (technology, duration, date_time, status, payment_status, updated_at) =
+         (select r.technology, r.duration, r.date_time, r.status, r.payment_status, now()
+            from jsonb_populate_record(m, p_changes) r)
+   where m.id = p_id
+  returning m.* into v_new;
+
+  if v_new.status = 'completed' and v_old.status <> 'completed' then
+    update public.interviewees
+       set scheduled_mock_interviews = greatest(0, coalesce(scheduled_mock_interviews, 0) - 1)
+     where id = v_old.interviewee_id;
+  end if;
+
+  return query select to_jsonb(v_new), v_old.status, true;
+end;
+$$;
@@ -0,0 +1,37 @@
+-- Server-side interview search.
+--
+-- Composite indexes for the equality filters combined with the date_time range
+-- and sort, a trigram index for candidate name prefix matches and a generated
+-- tsvector for full-text search over candidate, position and feedback text.
+
+create extension if not exists pg_trgm;
+
+create index if not exists interviews_date_time_idx
+  on public.interviews (date_time desc, id);
+
+create index if not exists interviews_organization_date_time_idx
+  on public.interviews (organization_id, date_time desc);
+
+create index if not exists interviews_interviewer_date_time_idx
+  on public.interviews (interviewer_id, date_time desc);
+
+create index if not exists interviews_interviewee_date_time_idx
+  on public.interviews (interviewee_id, date_time desc);
+
+create index if not exists interviews_status_date_time_idx
+  on public.interviews (status, date_time desc);
+
+create index if not exists interviews_candidate_name_trgm_idx
+  on public.interviews using gin (candidate_name gin_trgm_ops);
+
+alter table public.interviews
+  add column if not exists search_vector tsvector
+  generated always as (
+    to_tsvector(
+      'english',
+      coalesce(candidate_name, '') || ' ' || coalesce(position_title, '') || ' ' || coalesce(feedback, '')
+    )
+  ) stored;
+
+create index if not exists interviews_search_vector_idx
+  on public.interviews using gin (search_vector);
@@ -0,0 +1,95 @@
+-- Refresh token sessions.
+--
+-- Refresh tokens are random strings; only their SHA-256 hash is stored. Every
+-- refresh rotates the token within its family, and presenting an already
+-- rotated token revokes the whole family, since it means the token leaked.
+
+create table if not exists public.sessions (
+  id uuid primary key default gen_random_uuid(),
+  user_id uuid not null references public.users (id) on delete cascade,
+  family_id uuid not null default gen_random_uuid(),
+  token_hash text not null unique,
+  expires_at timestamptz not null,
+  revoked_at timestamptz,
+  last_used_at timestamptz,
+  created_at timestamptz not null default now()
+);
+
+create index if not exists sessions_family_idx on public.sessions (family_id);
+create index if not exists sessions_user_idx on public.sessions (user_id);
+
+create or replace function public.rotate_session(
+  p_token_hash text,
+  p_new_token_hash text,
+  p_expires_at timestamptz
+)
+returns table (user_id uuid, email text, role public.user_role, result text)
+language plpgsql
+as $$
+declare
+  v_session public.sessions;
+begin
+  select * into v_session
+    from public.sessions s
+   where s.token_hash = p_token_hash
+     for update;
+
+  if not found then
+    return query select null::uuid, null::text, null::public.user_role, 'invalid'::text;
+    return;
+  end if;
+
+  if v_session.revoked_at is not null then
+    update public.sessions s
+       set revoked_at = now()
+     where s.family_id = v_session.family_id
+       and s.revoked_at is null;
+    return query select null::uuid, null::text, null::public.user_role, 'reused'::text;
+    return;
+  end if;
+
+  if v_session.expires_at <= now() then
+    return query select null::uuid, null::text, null::public.user_role, 'expired'::text;
+    return;
+  end if;
+
+  update public.sessions s
+     set revoked_at = now(),
+         last_used_at = now()
+   where s.id = v_session.id;
+
+  insert into public.sessions (user_id, family_id, token_hash, expires_at)
+  values (v_session.user_id, v_session.family_id, p_new_token_hash, p_expires_at);
+
+  return query
+  select u.id, u.email::text, u.role, 'ok'::text
+    from public.users u
+   where u.id = v_session.user_id;
+end;
+$$;
+
+create or replace function public.revoke_session_family(p_token_hash text)
+returns table (revoked_count integer)
+language sql
+as $$
+  with revoked as (
+    update public.sessions s
+       set revoked_at = now()
+     where s.family_id = (select family_id from public.sessions where token_hash = p_token_hash)
+       and s.revoked_at is null
+    returning 1
+  )
+  select count(*)::integer from revoked;
+$$;
+
+-- Expired sessions are only useful for reuse detection until they expire
+create or replace function public.delete_expired_sessions()
+returns table (deleted_count integer)
+language sql
+as $$
+  with deleted as (
+    delete from public.sessions where expires_at < now() - interval '1 day'
+    returning 1
+  )
+  select count(*)::integer from deleted;
+$$;
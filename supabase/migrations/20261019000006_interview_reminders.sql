@@ -0,0 +1,50 @@
+-- Interview and mock interview reminders.
+--
+-- The scheduler claims each reminder here before notifying, and the unique key
+-- makes a second claim a no-op, so a reminder is sent at most once even when
+-- several schedulers run. scheduled_for is part of the key so a rescheduled
+-- booking gets fresh reminders.
+
+create table if not exists public.reminder_deliveries (
+  id uuid primary key default gen_random_uuid(),
+  booking_type text not null check (booking_type in ('interview', 'mock_interview')),
+  booking_id uuid not null,
+  offset_minutes integer not null,
+  scheduled_for timestamptz not null,
+  sent_at timestamptz not null default now(),
+  unique (booking_type, booking_id, offset_minutes, scheduled_for)
+);
+
+create index if not exists reminder_deliveries_sent_at_idx on public.reminder_deliveries (sent_at);
+
+-- The scheduler polls for changed bookings by updated_at
+alter table public.interviews_schedule
+  add column if not exists updated_at timestamptz not null default now();
+alter table public.mock_interviews
+  add column if not exists updated_at timestamptz not null default now();
+
+create or replace function public.touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+drop trigger if exists interviews_schedule_touch_updated_at on public.interviews_schedule;
+create trigger interviews_schedule_touch_updated_at
+  before update on public.interviews_schedule
+  for each row execute function public.touch_updated_at();
+
+drop trigger if exists mock_interviews_touch_updated_at on public.mock_interviews;
+create trigger mock_interviews_touch_updated_at
+  before update on public.mock_interviews
+  for each row execute function public.touch_updated_at();
+
+-- Window loads are range scans on the booking time; change polls on updated_at
+create index if not exists interviews_schedule_scheduled_at_idx on public.interviews_schedule (scheduled_at, id);
+create index if not exists interviews_schedule_updated_at_idx on public.interviews_schedule (updated_at);
+create index if not exists mock_interviews_date_time_idx on public.mock_interviews (date_time, id);
+create index if not exists mock_interviews_updated_at_idx on public.mock_interviews (updated_at);
@@ -0,0 +1,53 @@
+-- Columnar interview export for organization analytics.
+--
+-- Returns one chunk of an organization's interviews as parallel arrays, in id
+-- order, so the API can load them straight into NumPy columns. A chunk is a
+-- single row, which keeps it clear of PostgREST's max-rows cap, and timestamps
+-- come back as epoch seconds so nothing has to be parsed per row.
+--
+-- There is no separate feedback timestamp; updated_at of an interview that has
+-- feedback stands in for when the feedback was given.
+
+create or replace function public.interview_analytics_chunk(
+  p_organization_id uuid,
+  p_after uuid default null,
+  p_limit integer default 100000
+)
+returns table (
+  row_count integer,
+  last_id uuid,
+  interviewer_ids uuid[],
+  interviewee_ids uuid[],
+  statuses text[],
+  scheduled_epochs double precision[],
+  feedback_epochs double precision[]
+)
+language sql
+stable
+as $$
+  with chunk as (
+    select i.id,
+           i.interviewer_id,
+           i.interviewee_id,
+           i.status::text as status,
+           extract(epoch from i.date_time)::double precision as scheduled_epoch,
+           case when i.feedback is not null
+                then extract(epoch from i.updated_at)::double precision
+           end as feedback_epoch
+      from public.interviews i
+     where i.organization_id = p_organization_id
+       and (p_after is null or i.id > p_after)
+     order by i.id
+     limit p_limit
+  )
+  select count(*)::integer,
+         (array_agg(c.id order by c.id desc))[1],
+         coalesce(array_agg(c.interviewer_id order by c.id), '{}'),
+         coalesce(array_agg(c.interviewee_id order by c.id), '{}'),
+         coalesce(array_agg(c.status order by c.id), '{}'),
+         coalesce(array_agg(c.scheduled_epoch order by c.id), '{}'),
+         coalesce(array_agg(c.feedback_epoch order by c.id), '{}')
+    from chunk c;
+$$;
+
+create index if not exists interviews_organization_id_id_idx on public.interviews (organization_id, id);
@@ -0,0 +1,39 @@
+-- Change tracking for the reference tables workers keep in memory.
+--
+-- Workers poll each table for rows whose updated_at is at or after the newest
+-- one they have seen, so every table needs an updated_at that changes on every
+-- update, and an index to make the poll a range scan.
+
+alter table public.admins
+  add column if not exists updated_at timestamptz not null default now();
+
+drop trigger if exists organizations_touch_updated_at on public.organizations;
+create trigger organizations_touch_updated_at
+  before update on public.organizations
+  for each row execute function public.touch_updated_at();
+
+drop trigger if exists interviewers_touch_updated_at on public.interviewers;
+create trigger interviewers_touch_updated_at
+  before update on public.interviewers
+  for each row execute function public.touch_updated_at();
+
+drop trigger if exists interviewees_touch_updated_at on public.interviewees;
+create trigger interviewees_touch_updated_at
+  before update on public.interviewees
+  for each row execute function public.touch_updated_at();
+
+drop trigger if exists admins_touch_updated_at on public.admins;
+create trigger admins_touch_updated_at
+  before update on public.admins
+  for each row execute function public.touch_updated_at();
+
+drop trigger if exists users_touch_updated_at on public.users;
+create trigger users_touch_updated_at
+  before update on public.users
+  for each row execute function public.touch_updated_at();
+
+create index if not exists organizations_updated_at_idx on public.organizations (updated_at);
+create index if not exists interviewers_updated_at_idx on public.interviewers (updated_at);
+create index if not exists interviewees_updated_at_idx on public.interviewees (updated_at);
+create index if not exists admins_updated_at_idx on public.admins (updated_at);
+create index if not exists users_updated_at_idx on public.users (updated_at);
@@ -0,0 +1,133 @@
+-- Mock interview matching.
+--
+-- Interviewers list the technologies they can interview on and the windows
+-- they are available in; the matching engine assigns pending mock interviews
+-- (no interviewer yet) to an interviewer whose skills and availability cover
+-- them.
+
+alter table public.interviewers
+  add column if not exists skills text[] not null default '{}';
+
+create index if not exists interviewers_skills_idx on public.interviewers using gin (skills);
+
+create table if not exists public.interviewer_availability (
+  id uuid primary key default gen_random_uuid(),
+  interviewer_id uuid not null references public.interviewers (id) on delete cascade,
+  starts_at timestamptz not null,
+  ends_at timestamptz not null,
+  created_at timestamptz not null default now(),
+  check (ends_at > starts_at)
+);
+
+create index if not exists interviewer_availability_window_idx
+  on public.interviewer_availability (ends_at, starts_at);
+create index if not exists interviewer_availability_interviewer_idx
+  on public.interviewer_availability (interviewer_id, starts_at);
+
+alter table public.mock_interviews
+  add column if not exists interviewer_id uuid references public.interviewers (id) on delete set null;
+
+create index if not exists mock_interviews_interviewer_date_time_idx
+  on public.mock_interviews (interviewer_id, date_time);
+create index if not exists mock_interviews_unassigned_idx
+  on public.mock_interviews (date_time) where interviewer_id is null and status = 'scheduled';
+
+-- Apply a batch of assignments in one statement. A mock interview that was
+-- assigned, rescheduled or cancelled since the engine read it is skipped, so a
+-- stale batch never overwrites newer changes. Both sides get a notification.
+create or replace function public.assign_mock_interviews(p_assignments jsonb)
+returns table (mock_interview_id uuid, interviewer_id uuid)
+language plpgsql
+as $$
+#variable_conflict use_column
+begin
+  return query
+  with requested as (
+    select (a ->> 'mock_interview_id')::uuid as mock_interview_id,
+           (a ->> 'interviewer_id')::uuid as interviewer_id,
+           (a ->> 'date_time')::timestamptz as date_time
+      from jsonb_array_elements(p_assignments) a
+  ),
+  assigned as (
+    update public.mock_interviews m
+       set interviewer_id = r.interviewer_id,
+           updated_at = now()
+      from requested r
+     where m.id = r.mock_interview_id
+       and m.interviewer_id is null
+       and m.status = 'scheduled'
+       and m.date_time = r.date_time
+    returning m.id, m.interviewer_id, m.interviewee_id, m.technology, m.date_time
+  ),
+  notified as (
+    insert into public.notifications (user_id, message)
+    select u.user_id,
+           format('Mock interview on %s at %s UTC has been %s',
+                  a.technology,
+                  to_char(a.date_time at time zone 'UTC', 'YYYY-MM-DD HH24:MI'),
+                  u.verb)
+      from assigned a
+      cross join lateral (
+        select i.user_id, 'assigned to you' as verb from public.interviewers i where i.id = a.interviewer_id
+        union all
+        select e.user_id, 'matched with an interviewer' from public.interviewees e where e.id = a.interviewee_id
+      ) u
+  )
+  select a.id, a.interviewer_id from assigned a;
+end;
+$$;
+
+-- Rescheduling or changing the technology or duration of a mock interview
+-- releases its interviewer so it goes back to the matching queue.
+create or replace function public.update_mock_interview(
+  p_id uuid,
+  p_changes jsonb,
+  p_user_id uuid default null
+)
+returns table (mock_interview jsonb, previous_status public.interview_status, authorized boolean)
+language plpgsql
+as $$
+declare
+  v_old public.mock_interviews;
+  v_new public.mock_interviews;
+begin
+  select * into v_old
+    from public.mock_interviews
+   where id = p_id
+     for update;
+
+  if not found then
+    return;
+  end if;
+
+  if p_user_id is not null and not exists (
+    select 1 from public.interviewees where id = v_old.interviewee_id and user_id = p_user_id
+  ) then
+    return query select null::jsonb, v_old.status, false;
+    return;
+  end if;
+
+  update public.mock_interviews m
+     set (technology, duration, date_time, status, payment_status, updated_at) =
+         (select r.technology, r.duration, r.date_time, r.status, r.payment_status, now()
+            from jsonb_populate_record(m, p_changes) r)
+   where m.id = p_id
+  returning m.* into v_new;
+
+  if (v_new.technology, v_new.duration, v_new.date_time) is distinct from
+     (v_old.technology, v_old.duration, v_old.date_time) then
+    update public.mock_interviews
+       set interviewer_id = null
+     where id = p_id
+    returning * into v_new;
+  end if;
+
+  if v_new.status = 'completed' and v_old.status <> 'completed' then
+    update public.interviewees
+       set scheduled_mock_interviews = greatest(0, coalesce(scheduled_mock_interviews, 0) - 1)
+     where id = v_old.interviewee_id;
+  end if;
+
+  return query select to_jsonb(v_new), v_old.status, true;
+end;
+$$;
@@ -0,0 +1,13 @@
+-- One analytics row per organization.
+--
+-- Concurrent first views of an organization's analytics used to insert the
+-- default row more than once. The backend now inserts it with
+-- on conflict (organization_id) do nothing, which needs this unique index.
+
+-- Keep the oldest row of any organization that already has duplicates
+delete from public.analytics a
+ using public.analytics b
+ where a.organization_id = b.organization_id
+   and (a.created_at, a.id) > (b.created_at, b.id);
+
+create unique index if not exists analytics_organization_id_key on public.analytics (organization_id);
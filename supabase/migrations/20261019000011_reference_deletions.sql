@@ -0,0 +1,56 @@
+-- Deletes in the reference tables workers keep in memory.
+--
+-- Polling by updated_at cannot see a deleted row, so each delete leaves a
+-- tombstone here that workers poll alongside the table. Tombstones are only
+-- needed until every worker has polled past them; a worker that falls further
+-- behind reloads its tables in full anyway.
+
+create table if not exists public.reference_deletions (
+  id bigserial primary key,
+  table_name text not null,
+  row_id uuid not null,
+  deleted_at timestamptz not null default now()
+);
+
+create index if not exists reference_deletions_table_deleted_at_idx
+  on public.reference_deletions (table_name, deleted_at);
+
+create or replace function public.record_reference_deletion()
+returns trigger
+language plpgsql
+as $$
+begin
+  insert into public.reference_deletions (table_name, row_id)
+  values (tg_table_name, old.id);
+
+  delete from public.reference_deletions
+   where deleted_at < now() - interval '1 day';
+
+  return old;
+end;
+$$;
+
+drop trigger if exists organizations_record_deletion on public.organizations;
+create trigger organizations_record_deletion
+  after delete on public.organizations
+  for each row execute function public.record_reference_deletion();
+
+drop trigger if exists interviewers_record_deletion on public.interviewers;
+create trigger interviewers_record_deletion
+  after delete on public.interviewers
+  for each row execute function public.record_reference_deletion();
+
+drop trigger if exists interviewees_record_deletion on public.interviewees;
+create trigger interviewees_record_deletion
+  after delete on public.interviewees
+  for each row execute function public.record_reference_deletion();
+
+drop trigger if exists admins_record_deletion on public.admins;
+create trigger admins_record_deletion
+  after delete on public.admins
+  for each row execute function public.record_reference_deletion();
+
+drop trigger if exists users_record_deletion on public.users;
+create trigger users_record_deletion
+  after delete on public.users
+  for each row execute function public.record_reference_deletion();